@@ -3,6 +3,8 @@
 
 see https://pydantic-docs.helpmanual.io/
 """
+from typing import List
+
 from pydantic import BaseModel, Schema
 
 
@@ -27,3 +29,20 @@ class ApiSchema(BaseModel):
     version: str = Schema(
         None, description='API service version.',
         **{"example": "1.0.0"})
+
+
+class PredictionRequest(BaseModel):
+    images: List[str] = Schema(
+        ..., description='Base64 encoded image files, e.g. JPEG or PNG.')
+
+
+class DigitPredictionRequest(PredictionRequest):
+    imageType: int = Schema(
+        1, description='1: dark digit on white background, 2: bright digit on black background.')
+
+
+class PredictionSchema(BaseModel):
+    labels: List[int] = Schema(
+        ..., description='Predicted label of every image.')
+    probabilities: List[List[float]] = Schema(
+        ..., description='Probabilities of every class, for every image.')
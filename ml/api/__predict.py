@@ -0,0 +1,181 @@
+"""
+api/__predict.py
+
+Prediction routes, served through dynamic micro-batching.
+
+Models are registered in REGISTRY; with predict.reload_interval set, a
+replaced parameter file is reloaded without restarting workers, and every
+micro-batch runs on the version current when the batch started.
+"""
+import base64
+import binascii
+import os
+import threading
+import numpy as np
+
+from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from ml.api.__models import DigitPredictionRequest, PredictionRequest, PredictionSchema
+from ml.classifier import inference as cat_inference
+from ml.common.batcher import MicroBatcher
+from ml.common.model_registry import ModelRegistry
+from ml.common.parameters import PARAM_FILE, Parameters
+from ml.common.weight_store import STORE
+from ml.config import settings
+from ml.digit_recognizer import inference as digit_inference
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+ROUTER = APIRouter()
+
+MAX_BATCH_SIZE = int(settings('predict.max_batch_size', 64) or 64)
+MAX_WAIT = float(settings('predict.max_wait_ms', 5) or 0) / 1000.
+RELOAD_INTERVAL = float(settings('predict.reload_interval', 0) or 0)
+BATCHERS = {}  # model name: MicroBatcher, created on the first request
+BATCHERS_LOCK = threading.Lock()  # loads every model once, for concurrent first requests
+REGISTRY = ModelRegistry()  # current versions of models, hot-reloaded in every worker
+PACKAGES = {'digit': digit_inference.PWD, 'cat': cat_inference.PWD}
+
+
+def model_file(name):
+    """
+    @param name: model name, 'digit' or 'cat', strings
+    @return: path of the parameter file written by Parameters.save, watched for reloads;
+             it may not exist yet, while the legacy file is served, strings
+    """
+    return os.path.join(PACKAGES[name], 'datasets', PARAM_FILE)
+
+
+def load_model(name, param_file=None):
+    """
+    load the inference engine of a model.
+
+    @param name: model name, 'digit' or 'cat', strings
+    @param param_file: path of a parameter file to load, None for the saved parameters
+    @return: inference engine with a predict(x) method
+    """
+    network = None
+    if param_file is None:
+        # weights shared by the master process, if loaded there; otherwise loaded from disk
+        network = STORE.get(name)
+        parameters = None if network is None else network.to_parameters()
+    else:
+        parameters = Parameters(PACKAGES[name], file_name=param_file)  # an absolute path is kept as is
+        parameters.load()
+    if name == 'digit':
+        activations = None if network is None else network.activations
+        return digit_inference.InferenceEngine(parameters, activations=activations)
+    return cat_inference.InferenceEngine(parameters)
+
+
+def get_batcher(name):
+    """
+    get the micro-batcher of a model, loading the model once.
+
+    @param name: model name, 'digit' or 'cat', strings
+    @return: micro-batcher, ml.common.batcher.MicroBatcher
+    """
+    with BATCHERS_LOCK:
+        if name not in BATCHERS:
+            LOGGER.info('loading model: %s', name)
+            REGISTRY.register(name, model_file(name), lambda path: load_model(name, path), load_model(name))
+            if RELOAD_INTERVAL > 0:
+                REGISTRY.start(RELOAD_INTERVAL)
+            BATCHERS[name] = MicroBatcher(lambda x: predict_batch(name, x), MAX_BATCH_SIZE, MAX_WAIT)
+        return BATCHERS[name]
+
+
+def predict_batch(name, x):
+    """
+    predict a micro-batch with the current version of a model, kept until the batch is done.
+
+    @param name: model name, 'digit' or 'cat', strings
+    @param x: input X, numpy arrays (features, m)
+    @return: labels, numpy arrays (m,); and probabilities, numpy arrays (classes, m)
+    """
+    with REGISTRY.use(name) as engine:
+        return engine.predict(x)
+
+
+def decode_images(images, decode):
+    """
+    decode base64 encoded images into columns of one matrix.
+
+    @param images: base64 encoded image files, lists
+    @param decode: function of a list of image file contents (bytes) returning input X
+    @return: input X, numpy arrays (features, number of images)
+    """
+    if not images:
+        raise HTTPException(status_code=400, detail='no images')
+    try:
+        return decode([base64.b64decode(image, validate=True) for image in images])
+    except (binascii.Error, IOError, ValueError) as ex:
+        LOGGER.error('invalid image: %s', ex)
+        raise HTTPException(status_code=400, detail='invalid image: {}'.format(ex))
+
+
+def preprocess_digits(contents, image_type=1):
+    """
+    decode images of digits in the thread pool of the current digit engine, into one preallocated matrix.
+
+    @param contents: image file contents, lists of bytes
+    @param image_type: 1: white based, 2: black based, ints
+    @return: input X, numpy arrays (IMAGE_SIZE * IMAGE_SIZE, number of images)
+    """
+    get_batcher('digit')
+    with REGISTRY.use('digit') as engine:
+        return engine.preprocess_images(contents, image_type)
+
+
+def stack_cats(contents):
+    """
+    @param contents: image file contents, lists of bytes
+    @return: input X, numpy arrays (NUM_PX * NUM_PX * 3, number of images)
+    """
+    return np.stack([cat_inference.decode_image(content) for content in contents], axis=1)
+
+
+async def predict(name, x):
+    """
+    predict input X of a request within the next micro-batch of the model.
+
+    @param name: model name, 'digit' or 'cat', strings
+    @param x: input X, numpy arrays (features, number of images)
+    @return: labels and probabilities of every image, dictionaries
+    """
+    batcher = await run_in_threadpool(get_batcher, name)
+    labels, probas = await batcher.submit(x)
+    return {
+        "labels": labels.tolist(),
+        "probabilities": probas.T.tolist(),
+    }
+
+
+@ROUTER.post(
+    "/api/predict/digit",
+    response_model=PredictionSchema,
+    summary="Predict digits",
+    tags=["predict"])
+async def predict_digit(body: DigitPredictionRequest):
+    """
+    Predict digits of images.
+    """
+    def _decode(contents):
+        return preprocess_digits(contents, body.imageType)
+
+    x = await run_in_threadpool(decode_images, body.images, _decode)
+    return await predict('digit', x)
+
+
+@ROUTER.post(
+    "/api/predict/cat",
+    response_model=PredictionSchema,
+    summary="Predict cats",
+    tags=["predict"])
+async def predict_cat(body: PredictionRequest):
+    """
+    Predict whether images are cats (1) or not (0).
+    """
+    x = await run_in_threadpool(decode_images, body.images, stack_cats)
+    return await predict('cat', x)
@@ -6,6 +6,7 @@
 """
 import fastapi
 
+from ml.api.__predict import ROUTER as router_predict
 from ml.api.__route import ROUTER as router_info
 
 from ml.app_config import \
@@ -31,6 +32,8 @@
 
 app.router.redirect_slashes = True
 
+app.include_router(router_predict)
+
 # Note: router_info should be added at the last.
 app.include_router(router_info)
 
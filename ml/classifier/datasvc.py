@@ -6,11 +6,13 @@
 
 Services for loading data and pamrameters
 """
+import contextlib
 import numpy as np
 import os
 
 from ml.utils.logger import get_logger
 from ml.common.datasvc_abstract import DataSvcAbstract
+from ml.common.dataview import DataView
 
 LOGGER = get_logger(__name__)
 PWD = os.path.dirname(os.path.realpath(__file__))
@@ -21,28 +23,28 @@ class DataSvc(DataSvcAbstract):
     Class DataSvc for classifier
     """
 
-    def __init__(self, base_path=PWD):
+    def __init__(self, base_path=PWD, dtype=None):
         """
         Constructor of DataSvc
 
         :param base_path: base path, string
+        :param dtype: data type to standardize data into, None for the training default, string
         """
         path = base_path if os.path.isdir(base_path) else PWD
-        super().__init__(path)
+        super().__init__(path, dtype)
 
     def load(self):
         """
         load data for classifiers
         """
         LOGGER.info('Loading data sets ...')
-        train_dataset = super().load_dataset('train_catvnoncat', 'h5')
-        # print(type(train_dataset))
-        train_set_x_orig = np.array(train_dataset['train_set_x'][:])  # your train set features
-        train_set_y_orig = np.array(train_dataset['train_set_y'][:])  # your train set labels
+        train_dataset = super().load_cached_dataset('train_catvnoncat', 'h5')
+        train_set_x_orig = train_dataset['train_set_x']  # your train set features
+        train_set_y_orig = np.array(train_dataset['train_set_y'])  # your train set labels
 
-        test_dataset = super().load_dataset('test_catvnoncat', 'h5')
-        test_set_x_orig = np.array(test_dataset['test_set_x'][:])  # your test set features
-        test_set_y_orig = np.array(test_dataset['test_set_y'][:])  # your test set labels
+        test_dataset = super().load_cached_dataset('test_catvnoncat', 'h5')
+        test_set_x_orig = test_dataset['test_set_x']  # your test set features
+        test_set_y_orig = np.array(test_dataset['test_set_y'])  # your test set labels
 
         # classes = np.array(test_dataset['list_classes'][:])  # the list of classes NOT USING
 
@@ -58,3 +60,25 @@ def load(self):
             'y': test_set_y_orig,
         }
         LOGGER.info('Loading data sets - DONE')
+
+    @contextlib.contextmanager
+    def views(self, scale=255.):
+        """
+        open lazy views of data for classifiers, reading h5 slices on demand; files are closed on exit.
+
+        @param scale: maximum value of x to standardize by, None to keep values, floats
+        @return: context manager of train and tests sets, with x as ml.common.dataview.DataView
+        """
+        with self.open_h5_dataset('train_catvnoncat') as train_dataset, \
+                self.open_h5_dataset('test_catvnoncat') as test_dataset:
+            train_set_y = np.array(train_dataset['train_set_y'])
+            test_set_y = np.array(test_dataset['test_set_y'])
+            trainings = {
+                'x': DataView(train_dataset['train_set_x'], scale, self.dtype),
+                'y': train_set_y.reshape((1, train_set_y.shape[0])),
+            }
+            tests_set = {
+                'x': DataView(test_dataset['test_set_x'], scale, self.dtype),
+                'y': test_set_y.reshape((1, test_set_y.shape[0])),
+            }
+            yield trainings, tests_set
@@ -0,0 +1,76 @@
+"""
+inference.py
+
+Batched inference on pictures for the cat classifier, with parameters loaded once.
+"""
+import io
+import os
+import threading
+import numpy as np
+from PIL import Image
+
+from ml.common.mathEx import l_model_predict
+from ml.common.parameters import Parameters
+from ml.common.precision import INFERENCE_DTYPE, as_dtype
+from ml.common.workspace import PingPongBuffers
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+PWD = os.path.dirname(os.path.realpath(__file__))
+NUM_PX = 64
+
+
+def decode_image(image, dtype=INFERENCE_DTYPE):
+    """
+    decode an image into a standardized column of RGB pixels, flattened as the training set.
+
+    @param image: image file path, bytes, file object or PIL image
+    @param dtype: data type of the column, numpy dtypes
+    @return: pixels in [0, 1], numpy arrays (NUM_PX * NUM_PX * 3,)
+    """
+    if isinstance(image, bytes):
+        image = io.BytesIO(image)
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    pixels = np.asarray(image.convert('RGB').resize((NUM_PX, NUM_PX)), dtype=dtype).reshape(-1)
+    pixels /= 255.
+    return pixels
+
+
+class InferenceEngine:
+    """
+    InferenceEngine class predicts cat or non-cat of many images in one forward propagation.
+    """
+
+    def __init__(self, parameters=None, dtype=INFERENCE_DTYPE):
+        """
+        Constructor of InferenceEngine
+
+        @param parameters: trained parameters, dictionaries or ml.common.parameters.Parameters;
+                           None to load saved parameters of the classifier
+        @param dtype: data type of inference, numpy dtypes
+        """
+        if parameters is None:
+            parameters = Parameters(PWD)
+            parameters.load()
+        if not isinstance(parameters, dict):
+            parameters = parameters.get()
+        self.dtype = np.dtype(dtype)
+        self.parameters = as_dtype(parameters, self.dtype)
+        self._local = threading.local()  # ping-pong buffers of every predicting thread
+
+    def _buffers(self):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = PingPongBuffers.from_parameters(self.parameters, 0, self.dtype)
+        return buffers
+
+    def predict(self, x):
+        """
+        predict cat (1) or non-cat (0) of standardized inputs.
+
+        @param x: input X, numpy arrays (NUM_PX * NUM_PX * 3, m)
+        @return: labels, numpy arrays (m,); and probabilities of cat, numpy arrays (1, m)
+        """
+        probas = l_model_predict(x, self.parameters, self._buffers())
+        return (probas[0] > 0.5).astype(np.int64), probas.copy()
@@ -1,64 +1,70 @@
 """
 
 """
+import argparse
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 
-from ml.common.mathEx import \
-    compute_cost_with_l2_regularization, \
-    l_model_backward_with_l2, \
-    l_model_forward
 from ml.classifier.datasvc import DataSvc
+from ml.common.dataview import view_mini_batches
+from ml.common.mathEx import l_model_predict
 from ml.common.parameters import Parameters
+from ml.common.precision import get_dtype, standardize
+from ml.common.sweep import Sweep, grid_search
+from ml.common.trainer import Trainer, mini_batches
 
 
 PWD = os.path.dirname(os.path.realpath(__file__))
 NUM_ITERATIONS = 2000
 LAMBD = 0.7
 LEARNING_RATE = 0.0075
-
-
-def l_layer_model(x, y, layers_dims, learning_rate=0.009, num_iterations=2000, print_cost=False, lambd=0.7):
+LAZY_VIEWS = False  # read and standardize h5 slices per batch, for data sets larger than memory
+MINI_BATCH_SIZE = None
+LAYERS_DIMENSIONS = [12288, 20, 7, 5, 3, 1]  # 5-layer model
+SWEEP_SPACE = {
+    'hidden_layers': [[20, 7, 5, 3], [20, 7]],
+    'learning_rate': [0.0075, 0.015],
+    'lambd': [0., 0.7],
+}
+SWEEP_RESULTS = os.path.join(PWD, 'datasets', 'sweep_results.csv')
+_SWEEP_DATA = {}  # standardized train and dev sets, loaded before forking trials
+
+
+def l_layer_model(
+        x, y, layers_dims, learning_rate=0.009, num_iterations=2000, print_cost=False, lambd=0.7,
+        mini_batch_size=None, optimizer=None, use_workspace=False, dtype=None, data_source=None):
     """
 
     @param x:
     @param y:
     @param layers_dims:
     @param learning_rate:
-    @param num_iterations:
+    @param num_iterations: number of iterations (epochs with mini-batches)
     @param print_cost:
+    @param lambd:
+    @param mini_batch_size: size of mini-batches, None for full batch
+    @param optimizer: optimizer name, e.g. 'adam', None for gradient decent
+    @param use_workspace: whether propagate in preallocated per-layer buffers
+    @param dtype: data type of parameters, None for the training default
+    @param data_source: mini-batches to train on instead of x and y, e.g. from ml.common.dataview
     @return:
     """
 
     np.random.seed(1)
-    costs = []  # keep track of cost
-
-    parameters = Parameters(PWD)
-    parameters.initialize_parameters_deep_he(layers_dims)
-
-    for i in range(0, num_iterations):
-
-        # Forward propagation: [LINEAR -> RELU]*(L-1) -> LINEAR -> SIGMOID.
-        al, caches = l_model_forward(x, parameters.get())
-
-        # Compute costs
-        cost = compute_cost_with_l2_regularization(al, y, parameters.get(), lambd)
 
-        # Backward propagation.
-        grads = l_model_backward_with_l2(al, y, caches, lambd)
+    parameters = Parameters(PWD, optimizer=optimizer)
+    parameters.initialize_parameters_deep_he(layers_dims, dtype=dtype)
 
-        # Update parameters.
-        parameters.update(grads, learning_rate)
-
-        # Print the cost every 100 training example
-        if print_cost and i % 100 == 0:
-            print("Cost after iteration %i: %f" % (i, cost))
-        if print_cost and i % 100 == 0:
-            costs.append(cost)
+    trainer = Trainer(
+        parameters, learning_rate=learning_rate, lambd=lambd,
+        print_cost=print_cost, print_every=1 if mini_batch_size else 100, use_workspace=use_workspace)
+    if data_source is None:
+        data_source = mini_batches(x, y, mini_batch_size, seed=1)
+    trainer.train(data_source, num_epochs=num_iterations)
 
     # plot the cost
-    plt.plot(np.squeeze(costs))
+    plt.plot(np.squeeze(trainer.costs))
     plt.ylabel('cost')
     plt.xlabel('iterations (per tens)')
     plt.title("Learning rate =" + str(learning_rate))
@@ -73,24 +79,91 @@ def run():
     np.random.seed(1)
     print('Start training ...')
 
-    data_svc = DataSvc()
+    dtype = get_dtype()
+    data_svc = DataSvc(dtype=dtype)
+
+    layers_dims = LAYERS_DIMENSIONS
+
+    if LAZY_VIEWS:
+        with data_svc.views() as (trainings, _):
+            data_source = view_mini_batches(trainings['x'], trainings['y'], MINI_BATCH_SIZE, seed=1)
+            parameters = l_layer_model(
+                None, None, layers_dims,
+                learning_rate=LEARNING_RATE, num_iterations=NUM_ITERATIONS, print_cost=True, lambd=LAMBD,
+                mini_batch_size=MINI_BATCH_SIZE, use_workspace=True, dtype=dtype, data_source=data_source)
+    else:
+        data_svc.load()
+        train_x_orig, train_y = data_svc.trainings['x'], data_svc.trainings['y']
+        # Reshape the training and test examples (views of the cached data)
+        train_x_flatten = train_x_orig.reshape(train_x_orig.shape[0], -1).T
+
+        # Standardize data to have feature values between 0 and 1, in one copy.
+        train_x = standardize(train_x_flatten, dtype=dtype)
+
+        parameters = l_layer_model(
+            train_x, train_y, layers_dims,
+            learning_rate=LEARNING_RATE, num_iterations=NUM_ITERATIONS, print_cost=True, lambd=LAMBD,
+            mini_batch_size=MINI_BATCH_SIZE, use_workspace=True, dtype=dtype)
+    # print(type(parameters))
+    parameters.save()
+
+
+def prepare_sweep():
+    """
+    load and standardize the train and dev (test) sets once, to be shared by forked trials.
+    """
+    if _SWEEP_DATA:
+        return
+    dtype = get_dtype()
+    data_svc = DataSvc(dtype=dtype)
     data_svc.load()
-    train_x_orig, train_y = data_svc.trainings['x'], data_svc.trainings['y']
-    # Reshape the training and test examples
-    train_x_flatten = train_x_orig.reshape(train_x_orig.shape[0], -1).T
+    for name, data_set in (('train', data_svc.trainings), ('dev', data_svc.tests_set)):
+        x_orig = data_set['x']
+        _SWEEP_DATA[name + '_x'] = standardize(x_orig.reshape(x_orig.shape[0], -1).T, dtype=dtype)
+        _SWEEP_DATA[name + '_y'] = data_set['y']
 
-    # Standardize data to have feature values between 0 and 1.
-    train_x = train_x_flatten/255.
 
-    # CONSTANTS #
-    layers_dims = [12288, 20, 7, 5, 3, 1]  # 5-layer model
+def sweep_objective(config, budget):
+    """
+    objective of hyperparameter sweeps: error rate on the dev set.
 
+    @param config: hyperparameters, e.g. from SWEEP_SPACE, dictionaries
+    @param budget: number of iterations, ints
+    @return: error rate on the dev set, floats
+    """
+    prepare_sweep()
+    layers_dims = [LAYERS_DIMENSIONS[0]] + list(config.get('hidden_layers', LAYERS_DIMENSIONS[1:-1])) + [1]
     parameters = l_layer_model(
-        train_x, train_y, layers_dims,
-        learning_rate=LEARNING_RATE, num_iterations=NUM_ITERATIONS, print_cost=True, lambd=LAMBD)
-    # print(type(parameters))
-    parameters.save()
+        _SWEEP_DATA['train_x'], _SWEEP_DATA['train_y'], layers_dims,
+        learning_rate=config.get('learning_rate', LEARNING_RATE), num_iterations=budget,
+        lambd=config.get('lambd', LAMBD), mini_batch_size=config.get('mini_batch_size', MINI_BATCH_SIZE),
+        use_workspace=True, dtype=get_dtype())
+    al = l_model_predict(_SWEEP_DATA['dev_x'], parameters.get())
+    return float(np.mean((al > 0.5) != _SWEEP_DATA['dev_y']))
+
+
+def sweep(min_budget=250, max_budget=NUM_ITERATIONS, max_workers=None):
+    """
+    grid search of SWEEP_SPACE with successive halving; results are saved to SWEEP_RESULTS.
+
+    @param min_budget: iterations of the first rung, ints
+    @param max_budget: iterations of the last rung, ints
+    @param max_workers: number of trial processes, None for all CPU cores, ints
+    @return: best config, dictionaries
+    """
+    trials = Sweep(
+        sweep_objective, grid_search(SWEEP_SPACE), max_budget, min_budget,
+        max_workers=max_workers, prepare=prepare_sweep)
+    trials.run()
+    trials.save(SWEEP_RESULTS)
+    print('Best config: {}'.format(trials.best()))
+    return trials.best()
 
 
 if __name__ == '__main__':
-    run()
+    parser = argparse.ArgumentParser(description='Train the cat classifier.')
+    parser.add_argument('--sweep', action='store_true', help='run a hyperparameter sweep of SWEEP_SPACE')
+    if parser.parse_args().sweep:
+        sweep()
+    else:
+        run()
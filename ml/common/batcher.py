@@ -0,0 +1,102 @@
+"""
+common.batcher.py
+
+Dynamic micro-batching of concurrent prediction requests.
+"""
+import asyncio
+import numpy as np
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class MicroBatcher:
+    """
+    MicroBatcher class coalesces concurrent requests into micro-batches.
+
+    requests wait in an async queue; a worker task takes requests until the
+    batch holds max_batch_size samples or max_wait seconds have passed since
+    the first one, then runs one vectorized prediction for the whole batch
+    in a thread, so the event loop keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, predict, max_batch_size=64, max_wait=0.005):
+        """
+        Constructor of MicroBatcher
+
+        @param predict: function of input X (features, m) returning labels (m,) and probabilities (classes, m)
+        @param max_batch_size: maximum number of samples per batch, ints
+        @param max_wait: maximum seconds to wait for more requests after the first one, floats
+        """
+        if max_batch_size <= 0:
+            LOGGER.error('invalid max batch size: %s', max_batch_size)
+            raise ValueError('max batch size must be positive: {}'.format(max_batch_size))
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, x):
+        """
+        predict samples within the next micro-batch.
+
+        @param x: input X of the request, numpy arrays (features, k)
+        @return: labels, numpy arrays (k,); and probabilities, numpy arrays (classes, k)
+        """
+        if np.ndim(x) != 2:
+            LOGGER.error('invalid input of shape %s', np.shape(x))
+            raise ValueError('input must be a matrix (features, k): {}'.format(np.shape(x)))
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker.done():
+            # the queue and the worker belong to the event loop of the requests
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        self._queue.put_nowait((x, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            requests = [await self._queue.get()]
+            size = requests[0][0].shape[1]
+            deadline = self._loop.time() + self.max_wait
+
+            while size < self.max_batch_size:
+                if self._queue.empty():
+                    timeout = deadline - self._loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    request = self._queue.get_nowait()
+                requests.append(request)
+                size += request[0].shape[1]
+
+            await self._process(requests)
+
+    async def _process(self, requests):
+        try:
+            # inputs of mismatched features or data types fail the batch, not the worker
+            x = requests[0][0] if len(requests) == 1 else np.hstack([x for x, _ in requests])
+            labels, probas = await self._loop.run_in_executor(None, self.predict, x)
+        except Exception as ex:
+            LOGGER.error('failed to predict a batch of %s requests: %s', len(requests), ex)
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(ex)
+            return
+
+        start = 0
+        for x_request, future in requests:
+            stop = start + x_request.shape[1]
+            if not future.done():  # unless the request was cancelled
+                future.set_result((labels[start:stop], probas[:, start:stop]))
+            start = stop
@@ -0,0 +1,243 @@
+"""
+common.benchmark.py
+
+Throughput benchmarks of the training hot path on synthetic data sets.
+
+Every config times the kernels (forward, cache-free inference, backward,
+cost, optimizer update, one training step) and one epoch of end-to-end
+training, reporting seconds per call, samples per second and peak memory
+traced by tracemalloc. Results can be saved as a JSON baseline and compared with one to catch regressions:
+
+    python -m ml.common.benchmark --save baseline.json
+    python -m ml.common.benchmark --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from ml.common.mathEx import \
+    compute_cost_with_l2_regularization, \
+    l_model_backward_with_l2, \
+    l_model_forward, \
+    l_model_predict
+from ml.common.parameters import Parameters
+from ml.common.trainer import Trainer, mini_batches
+from ml.common.workspace import PingPongBuffers
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+# name: (layer dims, mini-batch size, samples per epoch)
+CONFIGS = {
+    'small': ([784, 50, 35, 20, 15, 10], 256, 8192),
+    'wide': ([784, 256, 128, 10], 512, 8192),
+    'full-batch': ([784, 50, 35, 20, 15, 10], 4096, 4096),
+}
+
+
+def measure(func, repeat=5):
+    """
+    time a function and trace its peak memory.
+
+    @param func: function without arguments
+    @param repeat: number of timed calls, ints
+    @return: best seconds per call, floats; and peak bytes allocated by one call, ints
+    """
+    func()  # warm up caches and lazily allocated buffers
+    seconds = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak
+
+
+def synthetic_data(layer_dims, m, dtype=np.float64, seed=1):
+    """
+    create a random data set with one-hot answers.
+
+    @param layer_dims: dimensions of layers, including the input layer, lists
+    @param m: number of samples, ints
+    @param dtype: data type, numpy dtypes
+    @param seed: seed of the random state, ints
+    @return: input X, numpy arrays (features, m); and answers Y, numpy arrays (classes, m)
+    """
+    rng = np.random.RandomState(seed)
+    x = rng.rand(layer_dims[0], m).astype(dtype)
+    classes = layer_dims[-1]
+    y = np.zeros((classes, m), dtype=dtype)
+    y[rng.randint(classes, size=m), np.arange(m)] = 1
+    return x, y
+
+
+def benchmark_config(layer_dims, batch_size, samples, repeat=5, dtype=np.float64, lambd=0.7):
+    """
+    benchmark kernels and one training epoch of a model.
+
+    @param layer_dims: dimensions of layers, including the input layer, lists
+    @param batch_size: number of samples per kernel call and per mini-batch, ints
+    @param samples: number of samples of the training epoch, ints
+    @param repeat: number of timed calls per kernel, ints
+    @param dtype: data type of data and parameters, numpy dtypes
+    @param lambd: regularization hyper-parameter lambda, floats
+    @return: {kernel name: {'seconds', 'samples_per_sec', 'peak_bytes'}}, dictionaries
+    """
+    x, y = synthetic_data(layer_dims, max(batch_size, samples), dtype)
+    x_batch, y_batch = np.ascontiguousarray(x[:, :batch_size]), np.ascontiguousarray(y[:, :batch_size])
+
+    parameters = Parameters(optimizer='adam')
+    parameters.initialize_parameters_deep_he(layer_dims, dtype=dtype)
+    params = parameters.get()
+    al, caches = l_model_forward(x_batch, params)
+    grads = l_model_backward_with_l2(al, y_batch, caches, lambd)
+    buffers = PingPongBuffers.from_parameters(params, batch_size)
+    trainer = Trainer(parameters, learning_rate=0.001, lambd=lambd, use_workspace=True)
+    data_source = mini_batches(x[:, :samples], y[:, :samples], batch_size, seed=1)
+
+    kernels = [
+        ('l_model_forward', batch_size, lambda: l_model_forward(x_batch, params)),
+        ('l_model_predict', batch_size, lambda: l_model_predict(x_batch, params, buffers)),
+        ('l_model_backward_with_l2', batch_size, lambda: l_model_backward_with_l2(al, y_batch, caches, lambd)),
+        ('compute_cost_with_l2_regularization', batch_size,
+         lambda: compute_cost_with_l2_regularization(al, y_batch, params, lambd)),
+        ('parameters_update', batch_size, lambda: parameters.update(grads, 0.001)),
+        ('trainer_step', batch_size, lambda: trainer.step(x_batch, y_batch)),
+        ('train_epoch', samples, lambda: trainer.train(data_source, num_epochs=1)),
+    ]
+    results = {}
+    for name, m, func in kernels:
+        seconds, peak = measure(func, repeat)
+        results[name] = {'seconds': seconds, 'samples_per_sec': m / seconds, 'peak_bytes': peak}
+    return results
+
+
+def run_benchmarks(configs=None, repeat=5, dtype=np.float64):
+    """
+    run benchmarks of configs.
+
+    @param configs: {name: (layer dims, batch size, samples)}, None for CONFIGS, dictionaries
+    @param repeat: number of timed calls per kernel, ints
+    @param dtype: data type of data and parameters, numpy dtypes
+    @return: results with 'meta' (environment) and 'configs' ({name: kernel results}), dictionaries
+    """
+    configs = CONFIGS if configs is None else configs
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'dtype': np.dtype(dtype).name,
+            'repeat': repeat,
+        },
+        'configs': {},
+    }
+    for name, (layer_dims, batch_size, samples) in configs.items():
+        LOGGER.info('benchmarking %s: layers %s, batch size %s', name, layer_dims, batch_size)
+        results['configs'][name] = benchmark_config(layer_dims, batch_size, samples, repeat, dtype)
+    return results
+
+
+def save_results(results, file_path):
+    """
+    save results as a JSON baseline.
+
+    @param results: results of run_benchmarks, dictionaries
+    @param file_path: path of the JSON file, strings
+    """
+    with open(file_path, 'w') as json_file:
+        json.dump(results, json_file, indent=2, sort_keys=True)
+    LOGGER.info('saved benchmark results: %s', file_path)
+
+
+def load_results(file_path):
+    """
+    load a JSON baseline.
+
+    @param file_path: path of the JSON file, strings
+    @return: results of run_benchmarks, dictionaries
+    """
+    with open(file_path) as json_file:
+        return json.load(json_file)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    compare results with a baseline; configs or kernels missing on either side are skipped.
+
+    @param results: results of run_benchmarks, dictionaries
+    @param baseline: results of run_benchmarks to compare with, dictionaries
+    @param tolerance: allowed relative growth of seconds and peak bytes, floats
+    @return: regressions as messages, lists of strings
+    """
+    regressions = []
+    for name, kernels in sorted(results['configs'].items()):
+        for kernel, metrics in sorted(kernels.items()):
+            base = baseline.get('configs', {}).get(name, {}).get(kernel)
+            if base is None:
+                continue
+            for metric in ('seconds', 'peak_bytes'):
+                if base[metric] and metrics[metric] > base[metric] * (1 + tolerance):
+                    regressions.append('{}/{}: {} {:.4g} > baseline {:.4g} (+{:.0%})'.format(
+                        name, kernel, metric, metrics[metric], base[metric], metrics[metric] / base[metric] - 1))
+    return regressions
+
+
+def format_results(results):
+    """
+    format results as a text table.
+
+    @param results: results of run_benchmarks, dictionaries
+    @return: table, strings
+    """
+    lines = ['{:<12} {:<38} {:>12} {:>14} {:>12}'.format('config', 'kernel', 'ms', 'samples/sec', 'peak KiB')]
+    for name, kernels in results['configs'].items():
+        for kernel, metrics in kernels.items():
+            lines.append('{:<12} {:<38} {:>12.3f} {:>14.0f} {:>12.1f}'.format(
+                name, kernel, metrics['seconds'] * 1000, metrics['samples_per_sec'], metrics['peak_bytes'] / 1024.))
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    """
+    command line entry point.
+
+    @param args: command line arguments, None for sys.argv, lists
+    @return: exit code, 1 on regressions, ints
+    """
+    parser = argparse.ArgumentParser(description='Benchmark training kernels.')
+    parser.add_argument('--configs', nargs='+', choices=sorted(CONFIGS), help='configs to run, all by default')
+    parser.add_argument('--repeat', type=int, default=5, help='timed calls per kernel')
+    parser.add_argument('--dtype', default='float64', help='data type of data and parameters')
+    parser.add_argument('--save', metavar='JSON', help='save results as a baseline')
+    parser.add_argument('--compare', metavar='JSON', help='compare results with a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args(args)
+
+    configs = {name: CONFIGS[name] for name in args.configs} if args.configs else CONFIGS
+    results = run_benchmarks(configs, args.repeat, np.dtype(args.dtype))
+    print(format_results(results))
+    if args.save:
+        save_results(results, args.save)
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION: ' + regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+common.checkpoint.py
+
+Periodic, asynchronous checkpoints of training, and resuming from them.
+
+A checkpoint is a non-pickle .npz file holding the parameters, the optimizer
+state, the epoch, iteration and costs of the trainer, and the global random
+state. The training loop only copies these arrays; serializing and writing
+happen in a background thread.
+"""
+import glob
+import json
+import os
+import queue
+import threading
+import numpy as np
+
+from ml.common.param_file import atomic_write
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+CHECKPOINT_PATTERN = 'checkpoint-{:08d}.npz'
+
+
+def snapshot(trainer):
+    """
+    copy the state of a trainer into a checkpoint.
+
+    @param trainer: trainer, ml.common.trainer.Trainer
+    @return: arrays of the checkpoint, keyed for np.savez, dictionaries
+    """
+    optimizer = trainer.parameters.optimizer.state_dict()
+    rng_name, rng_keys, rng_pos, rng_has_gauss, rng_gauss = np.random.get_state()
+    meta = {
+        'epoch': trainer.epoch,
+        'iteration': trainer.iteration,
+        'costs': [float(cost) for cost in trainer.costs],
+        'optimizer': {'name': optimizer['name'], 't': optimizer['t']},
+        'rng': {'name': rng_name, 'pos': int(rng_pos), 'has_gauss': int(rng_has_gauss), 'gauss': float(rng_gauss)},
+    }
+    arrays = {'meta': np.array(json.dumps(meta)), 'rng/keys': rng_keys.copy()}
+    for key, val in trainer.parameters.get().items():
+        arrays['param/' + key] = np.array(val, copy=True)
+    for key, val in optimizer['arrays'].items():
+        arrays['optimizer/' + key] = val
+    return arrays
+
+
+def restore(trainer, file_path):
+    """
+    restore the state of a trainer from a checkpoint file.
+
+    @param trainer: trainer, ml.common.trainer.Trainer
+    @param file_path: path of the checkpoint file, strings
+    """
+    with np.load(file_path) as data:
+        meta = json.loads(str(data['meta']))
+        parameters = {key[len('param/'):]: data[key] for key in data.files if key.startswith('param/')}
+        arrays = {key[len('optimizer/'):]: data[key] for key in data.files if key.startswith('optimizer/')}
+        rng_keys = data['rng/keys']
+
+    trainer.parameters.set(parameters)
+    trainer.parameters.optimizer.load_state_dict(dict(meta['optimizer'], arrays=arrays), parameters)
+    trainer.epoch = meta['epoch']
+    trainer.iteration = meta['iteration']
+    trainer.costs = meta['costs']
+    rng = meta['rng']
+    np.random.set_state((rng['name'], rng_keys, rng['pos'], rng['has_gauss'], rng['gauss']))
+    LOGGER.info('resumed from checkpoint: %s', file_path)
+
+
+class Checkpointer:
+    """
+    Checkpointer class is a trainer callback writing checkpoints every few epochs in a background thread.
+
+    a snapshot waiting to be written is replaced by a newer one, so the
+    training loop never waits for the disk.
+    """
+
+    def __init__(self, checkpoint_dir, every=1, keep=3):
+        """
+        Constructor of Checkpointer
+
+        @param checkpoint_dir: folder of checkpoint files, strings
+        @param every: number of epochs between checkpoints, ints
+        @param keep: number of latest checkpoint files to keep, ints
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.every = max(1, every)
+        self.keep = max(1, keep)
+        self._queue = queue.Queue(maxsize=1)
+        self._writer = None
+
+    def latest(self):
+        """
+        @return: path of the latest checkpoint file, None if no checkpoint, strings
+        """
+        files = sorted(glob.glob(os.path.join(self.checkpoint_dir, CHECKPOINT_PATTERN.replace('{:08d}', '*'))))
+        return files[-1] if files else None
+
+    def resume(self, trainer):
+        """
+        restore a trainer from the latest checkpoint.
+
+        @param trainer: trainer, ml.common.trainer.Trainer
+        @return: whether a checkpoint was restored, booleans
+        """
+        latest = self.latest()
+        if latest is None:
+            LOGGER.info('no checkpoint to resume from in %s', self.checkpoint_dir)
+            return False
+        restore(trainer, latest)
+        return True
+
+    def save(self, trainer):
+        """
+        take a snapshot of a trainer and queue it for writing.
+
+        @param trainer: trainer, ml.common.trainer.Trainer
+        """
+        arrays = snapshot(trainer)
+        if self._writer is None or not self._writer.is_alive():
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            self._writer = threading.Thread(target=self._write_loop, name='checkpointer', daemon=True)
+            self._writer.start()
+        while True:
+            try:
+                self._queue.put_nowait((trainer.iteration, arrays))
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()  # drop the older snapshot
+                    self._queue.task_done()
+                except queue.Empty:
+                    pass
+
+    def flush(self):
+        """
+        wait until queued checkpoints are written.
+        """
+        if self._writer is not None:
+            self._queue.join()
+
+    def on_epoch_end(self, trainer, cost):
+        """
+        trainer callback: checkpoint every few epochs.
+        """
+        if trainer.epoch % self.every == 0:
+            self.save(trainer)
+
+    def on_train_end(self, trainer):
+        """
+        trainer callback: write pending checkpoints.
+        """
+        self.flush()
+
+    def _write_loop(self):
+        while True:
+            iteration, arrays = self._queue.get()
+            try:
+                self._write(iteration, arrays)
+            except Exception as ex:
+                LOGGER.error('failed to write checkpoint at iteration %s: %s', iteration, ex)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, iteration, arrays):
+        file_path = os.path.join(self.checkpoint_dir, CHECKPOINT_PATTERN.format(iteration))
+        with atomic_write(file_path, suffix='.npz') as checkpoint_file:
+            np.savez(checkpoint_file, **arrays)
+        LOGGER.debug('saved checkpoint: %s', file_path)
+
+        pattern = os.path.join(self.checkpoint_dir, CHECKPOINT_PATTERN.replace('{:08d}', '*'))
+        for old_file in sorted(glob.glob(pattern))[:-self.keep]:
+            os.unlink(old_file)
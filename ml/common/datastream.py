@@ -0,0 +1,115 @@
+"""
+common.datastream.py
+
+Chunked, streaming readers of datasets larger than memory.
+"""
+import itertools
+import numpy as np
+
+from ml.common.precision import get_dtype
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+def count_rows(data_path, skip_header=1):
+    """
+    count data rows of a csv file, without parsing them.
+
+    @param data_path: path of the csv file, strings
+    @param skip_header: number of header lines, ints
+    @return: number of data rows, ints
+    """
+    rows, last = 0, b'\n'
+    with open(data_path, 'rb') as csv_file:
+        for chunk in iter(lambda: csv_file.read(1 << 20), b''):
+            rows += chunk.count(b'\n')
+            last = chunk[-1:]
+    if last != b'\n':
+        rows += 1  # last line without a line break
+    return max(0, rows - skip_header)
+
+
+class CsvStream:
+    """
+    CsvStream class is a re-iterable of (x, y) column-major batches read from a csv file.
+
+    every iteration opens the file and parses only one batch of rows at a time,
+    so memory is bounded by batch_size rather than by the size of the file.
+    """
+
+    def __init__(
+            self, data_path, batch_size=256, rows=(0, None), label_column=0, skip_header=1,
+            num_classes=None, scale=None, dtype=None):
+        """
+        Constructor of CsvStream
+
+        @param data_path: path of the csv file, strings
+        @param batch_size: number of samples per batch, ints
+        @param rows: range (start, stop) of data rows to read, stop None for the end, tuples
+        @param label_column: column of labels, ints
+        @param skip_header: number of header lines, ints
+        @param num_classes: number of classes to one-hot labels into, None for (1, m) labels, ints
+        @param scale: maximum value of x to standardize x by, e.g. 255., None to keep x, floats
+        @param dtype: data type of x, None for the training default
+        """
+        if batch_size <= 0:
+            LOGGER.error('invalid batch size: %s', batch_size)
+            raise ValueError('batch size must be positive: {}'.format(batch_size))
+        self.data_path = data_path
+        self.batch_size = batch_size
+        self.rows = rows
+        self.label_column = label_column
+        self.skip_header = skip_header
+        self.num_classes = num_classes
+        self.scale = scale
+        self.dtype = get_dtype(dtype)
+
+    def __iter__(self):
+        start, stop = self.rows
+        with open(self.data_path, 'r') as csv_file:
+            lines = itertools.islice(
+                csv_file, self.skip_header + start, None if stop is None else self.skip_header + stop)
+            while True:
+                chunk = list(itertools.islice(lines, self.batch_size))
+                if not chunk:
+                    break
+                yield self._parse(chunk)
+
+    def _parse(self, chunk):
+        data = np.loadtxt(chunk, delimiter=',', dtype=self.dtype, ndmin=2)
+        labels = data[:, self.label_column].astype(np.int64)
+        # one sample per column, contiguous for the batch
+        x = np.ascontiguousarray(np.delete(data, self.label_column, axis=1).T)
+        if self.scale:
+            x /= self.scale
+
+        if self.num_classes is None:
+            return x, labels.reshape((1, labels.shape[0]))
+        y = np.zeros((self.num_classes, labels.shape[0]), dtype=self.dtype)
+        y[labels, np.arange(labels.shape[0])] = 1
+        return x, y
+
+    def split(self, ratio=None, ranges=None):
+        """
+        split the stream into a training stream and a test stream.
+
+        @param ratio: share of rows for training, e.g. 0.8, floats
+        @param ranges: ((start, stop), (start, stop)) data rows of training and test, tuples
+        @return: training and test streams, CsvStream
+        """
+        if ranges is None:
+            if ratio is None or not 0 <= ratio <= 1:
+                LOGGER.error('invalid split ratio: %s', ratio)
+                raise ValueError('split needs a ratio within [0, 1] or ranges: {}'.format(ratio))
+            start, stop = self.rows
+            stop = count_rows(self.data_path, self.skip_header) if stop is None else stop
+            middle = start + int(round((stop - start) * ratio))
+            ranges = ((start, middle), (middle, stop))
+
+        return tuple(self._with_rows(rows) for rows in ranges)
+
+    def _with_rows(self, rows):
+        return CsvStream(
+            self.data_path, self.batch_size, tuple(rows), self.label_column, self.skip_header,
+            self.num_classes, self.scale, self.dtype)
@@ -2,16 +2,23 @@
 common.datasvc_abstract.py
 """
 import abc
+import contextlib
 import h5py
+import hashlib
 import inspect
 import numpy as np
 import os
+import shutil
+import tempfile
 
+from ml.common.precision import get_dtype
 from ml.utils.logger import get_logger
 from ml.utils.logger import raise_ni
 
 LOGGER = get_logger(__name__)
 PWD = os.path.dirname(os.path.realpath(__file__))
+CACHE_FOLDER = '.cache'
+CSV_ARRAY = 'data'
 
 
 class DataSvcAbstract:
@@ -20,8 +27,9 @@ class DataSvcAbstract:
     """
     __metaclass__ = abc.ABCMeta
 
-    def __init__(self, base_path=PWD):
+    def __init__(self, base_path=PWD, dtype=None):
         self.base_path = base_path if os.path.isdir(base_path) else PWD
+        self.dtype = get_dtype(dtype)
         self.trainings = {"x": None, "y": None}  # x, y should be numpy arrays
         self.tests_set = {"x": None, "y": None}  # x, y should be numpy arrays
 
@@ -38,14 +46,118 @@ def load_dataset(self, data_name, data_type='csv'):
 
         @param data_name: data name, string
         @param data_type: data type, string
-        @return: data, numpy array
+        @return: data, numpy array; or an open h5py.File, closed by the caller (see open_h5_dataset)
         """
         data = None
         data_file = '{}.{}'.format(data_name, data_type)
         data_path = os.path.join(self.base_path, 'datasets', data_file)
         if data_type == 'csv':
-            data = np.genfromtxt(data_path, delimiter=',')
+            data = np.genfromtxt(data_path, delimiter=',', dtype=self.dtype)
         elif data_type == 'h5':
             data = h5py.File(data_path, 'r')
 
         return data
+
+    @contextlib.contextmanager
+    def open_h5_dataset(self, data_name):
+        """
+        open a h5 data file from os, datasets folder, closing it on exit.
+
+        @param data_name: data name, string
+        @return: context manager of the h5 data file, h5py.File
+        """
+        data_path = os.path.join(self.base_path, 'datasets', '{}.h5'.format(data_name))
+        h5_file = h5py.File(data_path, 'r')
+        try:
+            yield h5_file
+        finally:
+            h5_file.close()
+
+    def load_cached_dataset(self, data_name, data_type='csv', skip_header=1):
+        """
+        load data from os, datasets folder, through a binary cache of .npy files.
+
+        the first load converts the source into datasets/.cache, with integral
+        data narrowed to the smallest lossless integer type (e.g. uint8 pixels);
+        later loads of an unchanged source memory-map the cache read-only.
+
+        @param data_name: data name, string
+        @param data_type: data type, 'csv' or 'h5', string
+        @param skip_header: number of header lines of a csv source, ints
+        @return: csv data without the header, or {dataset name: data} of h5 data, numpy memmaps
+        """
+        if data_type not in ('csv', 'h5'):
+            LOGGER.error('unsupported data type: %s', data_type)
+            raise ValueError('unsupported data type: {}'.format(data_type))
+
+        data_file = '{}.{}'.format(data_name, data_type)
+        data_path = os.path.join(self.base_path, 'datasets', data_file)
+        cache_path = self._cache_path(data_path, skip_header)
+
+        if not os.path.isdir(cache_path):
+            self._build_cache(data_path, data_type, cache_path, skip_header)
+
+        data = {}
+        for npy_file in sorted(os.listdir(cache_path)):
+            name = os.path.splitext(npy_file)[0]
+            data[name] = np.load(os.path.join(cache_path, npy_file), mmap_mode='r')
+
+        return data[CSV_ARRAY] if data_type == 'csv' else data
+
+    @staticmethod
+    def _cache_path(data_path, skip_header):
+        # keyed by a fingerprint of the source, so a changed source is converted again
+        stat = os.stat(data_path)
+        fingerprint = '{}:{}:{}:{}'.format(os.path.abspath(data_path), stat.st_size, stat.st_mtime_ns, skip_header)
+        key = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+        cache_root = os.path.join(os.path.dirname(data_path), CACHE_FOLDER)
+        return os.path.join(cache_root, '{}-{}'.format(os.path.basename(data_path), key))
+
+    def _build_cache(self, data_path, data_type, cache_path, skip_header):
+        LOGGER.info('building dataset cache: %s', cache_path)
+        if data_type == 'csv':
+            arrays = {CSV_ARRAY: np.genfromtxt(data_path, delimiter=',', skip_header=skip_header)}
+        else:
+            with h5py.File(data_path, 'r') as h5_file:
+                arrays = {name: item[()] for name, item in h5_file.items() if isinstance(item, h5py.Dataset)}
+
+        cache_root, cache_name = os.path.split(cache_path)
+        os.makedirs(cache_root, exist_ok=True)
+        # write aside and rename, so a reader never sees a partial cache
+        temp_path = tempfile.mkdtemp(prefix='.' + cache_name, dir=cache_root)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(temp_path, name + '.npy'), narrow_dtype(array))
+            try:
+                os.rename(temp_path, cache_path)
+            except OSError:
+                pass  # built by another process meanwhile
+        finally:
+            # left over unless renamed: built meanwhile, or failed to write
+            if os.path.isdir(temp_path):
+                shutil.rmtree(temp_path, ignore_errors=True)
+
+        # remove caches of previous versions of the source
+        prefix = os.path.basename(data_path) + '-'
+        for name in os.listdir(cache_root):
+            if name.startswith(prefix) and name != cache_name:
+                shutil.rmtree(os.path.join(cache_root, name), ignore_errors=True)
+
+
+def narrow_dtype(data):
+    """
+    convert integral float data to the smallest integer type holding it losslessly.
+
+    @param data: data, numpy arrays
+    @return: data of the narrowed type, or the data unchanged, numpy arrays
+    """
+    if data.dtype.kind != 'f' or not data.size or not np.all(np.isfinite(data)):
+        return data
+    if not np.array_equal(data, np.trunc(data)):
+        return data
+    low, high = data.min(), data.max()
+    for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return data.astype(dtype)
+    return data.astype(np.int64)
@@ -0,0 +1,89 @@
+"""
+common.dataview.py
+
+Lazy views of datasets stored one sample per row, e.g. h5py datasets of images.
+"""
+import numpy as np
+
+from ml.common.precision import get_dtype
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class DataView:
+    """
+    DataView class reads samples of a dataset on demand, as flattened and standardized columns.
+
+    the dataset is anything sliced along its first axis, e.g. h5py datasets
+    or (memory-mapped) numpy arrays; only the requested samples are read.
+    """
+
+    def __init__(self, data, scale=None, dtype=None):
+        """
+        Constructor of DataView
+
+        @param data: dataset of shape (m, ...), h5py datasets or numpy arrays
+        @param scale: maximum value of the data to standardize by, e.g. 255., None to keep values, floats
+        @param dtype: data type of columns, None for the training default
+        """
+        self.data = data
+        self.scale = scale
+        self.dtype = get_dtype(dtype)
+
+    @property
+    def m(self):
+        """
+        @return: number of samples, ints
+        """
+        return self.data.shape[0]
+
+    @property
+    def shape(self):
+        """
+        @return: shape (features, m) of the flattened data, tuples
+        """
+        return int(np.prod(self.data.shape[1:])), self.m
+
+    def columns(self, index):
+        """
+        read samples as columns.
+
+        @param index: slice, or increasing indexes, of samples, slices or numpy arrays
+        @return: flattened and standardized samples, numpy arrays (features, m)
+        """
+        samples = self.data[index]
+        x = samples.reshape(samples.shape[0], -1).T
+        if self.scale:
+            return np.divide(x, self.scale, dtype=self.dtype)
+        return x.astype(self.dtype)
+
+
+def view_mini_batches(x_view, y, mini_batch_size=64, shuffle=True, seed=None):
+    """
+    create a mini-batch data source reading x from a lazy view batch by batch.
+
+    @param x_view: view of input X, DataView
+    @param y: actual answers Y, numpy arrays (labels, m)
+    @param mini_batch_size: size of every mini-batch; None or 0 for full batch, ints
+    @param shuffle: whether shuffle samples in every epoch, booleans
+    @param seed: base seed of the shuffle, changed per epoch, ints
+    @return: data source, callable(epoch) returning a generator of (x, y)
+    """
+    m = x_view.m
+    batch_size = mini_batch_size if mini_batch_size and mini_batch_size < m else m
+
+    def _batches(epoch):
+        if not shuffle or batch_size == m:
+            for start in range(0, m, batch_size):
+                yield x_view.columns(slice(start, start + batch_size)), y[:, start:start + batch_size]
+            return
+
+        rng = np.random if seed is None else np.random.RandomState(seed + epoch)
+        permutation = rng.permutation(m)
+        for start in range(0, m, batch_size):
+            # h5py reads increasing indexes only
+            index = np.sort(permutation[start:start + batch_size])
+            yield x_view.columns(index), y[:, index]
+
+    return _batches
@@ -0,0 +1,117 @@
+"""
+common.early_stopping.py
+
+Validation-driven termination of training.
+"""
+import numpy as np
+
+from ml.common.mathEx import one_vs_all_prediction
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+MONITORS = {'accuracy': 1., 'cost': -1.}  # metric: sign of improvement
+
+
+class EarlyStopping:
+    """
+    EarlyStopping class is a trainer callback evaluating held-out data on a
+    schedule, and stopping training when the monitored metric plateaus.
+
+    the best parameters are kept as a copy of the contiguous network buffer,
+    and copied back in place when training ends.
+    """
+
+    def __init__(
+            self, x, y, every=1, patience=5, monitor='accuracy', min_delta=0., restore_best=True,
+            batch_size=1024, print_metrics=False):
+        """
+        Constructor of EarlyStopping
+
+        @param x: held-out input X, numpy arrays (features, m)
+        @param y: held-out labels (1, m) or one-hot answers (classes, m), numpy arrays
+        @param every: number of epochs between evaluations, ints
+        @param patience: number of evaluations without improvement before stopping, ints
+        @param monitor: metric to monitor, 'accuracy' or 'cost', strings
+        @param min_delta: minimum change of the metric counted as an improvement, floats
+        @param restore_best: whether restore the best parameters when training ends, booleans
+        @param batch_size: number of samples per forward propagation of evaluation, ints
+        @param print_metrics: whether print metrics of every evaluation, booleans
+        """
+        if monitor not in MONITORS:
+            LOGGER.error('unknown monitor: %s', monitor)
+            raise ValueError('unknown monitor: {}'.format(monitor))
+        self.x = x
+        self.y = np.asarray(y)
+        self.every = max(1, every)
+        self.patience = max(1, patience)
+        self.monitor = monitor
+        self.min_delta = min_delta
+        self.restore_best = restore_best
+        self.batch_size = batch_size
+        self.print_metrics = print_metrics
+        self.history = []  # (epoch, cost, accuracy)
+        self.best_score = None
+        self.best_epoch = None
+        self._best_buffer = None
+        self._waits = 0
+
+    def evaluate(self, network):
+        """
+        evaluate cost and accuracy of a network on the held-out data, in chunks of batch_size.
+
+        @param network: network, ml.common.network.Network
+        @return: cross-entropy cost, floats; and accuracy, floats
+        """
+        m = self.x.shape[1]
+        cost, correct = 0., 0
+        for start in range(0, m, self.batch_size):
+            stop = min(start + self.batch_size, m)
+            al, caches = network.forward(self.x[:, start:stop])
+            y = self.y[:, start:stop]
+
+            if al.shape[0] == 1:
+                labels, predictions = y, al > 0.5
+            else:
+                labels = one_vs_all_prediction(y) if y.shape[0] > 1 else y
+                predictions = one_vs_all_prediction(al)
+                y = labels == np.arange(al.shape[0]).reshape(-1, 1)
+            correct += int(np.sum(predictions == labels))
+            cost += network.compute_cost(al, y, caches) * (stop - start)
+        return cost / m, correct / m
+
+    def on_epoch_end(self, trainer, cost):
+        """
+        trainer callback: evaluate every few epochs and stop training on a plateau.
+        """
+        if trainer.epoch % self.every != 0:
+            return
+
+        network = trainer.parameters.get_network()
+        val_cost, accuracy = self.evaluate(network)
+        self.history.append((trainer.epoch, val_cost, accuracy))
+        if self.print_metrics:
+            print("Validation after epoch %i: cost %f, accuracy %f" % (trainer.epoch, val_cost, accuracy))
+
+        score = MONITORS[self.monitor] * (accuracy if self.monitor == 'accuracy' else val_cost)
+        if self.best_score is None or score > self.best_score + self.min_delta:
+            self.best_score, self.best_epoch, self._waits = score, trainer.epoch, 0
+            if self._best_buffer is None or self._best_buffer.shape != network.buffer.shape:
+                self._best_buffer = network.buffer.copy()
+            else:
+                self._best_buffer[...] = network.buffer
+            return
+
+        self._waits += 1
+        if self._waits >= self.patience:
+            LOGGER.info('early stopping after epoch %s, best %s at epoch %s',
+                        trainer.epoch, self.monitor, self.best_epoch)
+            trainer.stop_training = True
+
+    def on_train_end(self, trainer):
+        """
+        trainer callback: restore the best parameters in place.
+        """
+        if self.restore_best and self._best_buffer is not None and self.best_epoch != trainer.epoch:
+            trainer.parameters.get_network().buffer[...] = self._best_buffer
+            LOGGER.info('restored the best parameters from epoch %s', self.best_epoch)
@@ -0,0 +1,201 @@
+"""
+common.evaluation.py
+
+Chunked evaluation of classifiers: confusion matrix, per-class precision and
+recall, and top-k accuracy.
+
+Test sets are propagated in chunks of bounded size by Network.predict, in
+ping-pong buffers without forward caches, so memory does not grow with the
+number of samples (x may be a memory-mapped array, or a stream of batches).
+Each chunk updates the metrics in one vectorized pass: a bincount into the
+confusion matrix, and a bincount of the rank of every true class for top-k
+accuracy.
+"""
+import numpy as np
+
+from ml.common.network import Network
+from ml.common.workspace import PingPongBuffers
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+EVALUATION_BATCH_SIZE = 4096
+
+
+def get_network(model, activations=None):
+    """
+    @param model: network, quantized network, parameters or parameters in dict format
+    @param activations: activation names of layers 1..L, None for the default, lists
+    @return: network with predict(x, buffers), ml.common.network.Network
+    """
+    if isinstance(model, Network) or hasattr(model, 'predict'):
+        return model
+    if hasattr(model, 'dequantize'):
+        return model.dequantize()  # ml.common.quantization.QuantizedNetwork
+    if isinstance(model, dict):
+        return Network.from_parameters(model, activations)
+    return model.get_network(activations)
+
+
+class Evaluation:
+    """
+    Evaluation class accumulates classification metrics over chunks of predictions.
+    """
+
+    def __init__(self, num_classes, top_k=(1,)):
+        """
+        Constructor of Evaluation
+
+        @param num_classes: number of classes, 2 for a single sigmoid output, ints
+        @param top_k: values of k to count top-k accuracy for, tuples of ints
+        """
+        if num_classes < 2:
+            LOGGER.error('invalid number of classes: %s', num_classes)
+            raise ValueError('number of classes must be at least 2: {}'.format(num_classes))
+        self.num_classes = num_classes
+        self.top_k = tuple(sorted({min(int(k), num_classes) for k in top_k}))
+        self.confusion = np.zeros((num_classes, num_classes), dtype=np.int64)  # rows: labels, columns: predictions
+        self._ranks = np.zeros(num_classes, dtype=np.int64)  # samples by rank of the true class
+
+    @property
+    def count(self):
+        """
+        @return: number of evaluated samples, ints
+        """
+        return int(self.confusion.sum())
+
+    def update(self, probas, y):
+        """
+        add a chunk of predictions.
+
+        @param probas: output AL, numpy arrays (classes, m), or (1, m) of a sigmoid output
+        @param y: integer labels (1, m) or (m,), or one-hot answers (classes, m), numpy arrays
+        """
+        probas = np.asarray(probas)
+        y = np.asarray(y)
+        if probas.shape[0] == 1:
+            probas = np.vstack((1 - probas, probas))
+        k, m = probas.shape
+        if k != self.num_classes:
+            LOGGER.error('expected %s classes, got %s', self.num_classes, k)
+            raise ValueError('expected {} classes, got {}'.format(self.num_classes, k))
+        labels = np.argmax(y, axis=0) if y.ndim == 2 and y.shape[0] > 1 else y.reshape(-1).astype(np.int64)
+        if labels.size and (labels.min() < 0 or labels.max() >= k):
+            LOGGER.error('labels out of range of %s classes', k)
+            raise ValueError('labels must be in [0, {})'.format(k))
+
+        predictions = np.argmax(probas, axis=0)
+        self.confusion += np.bincount(labels * k + predictions, minlength=k * k).reshape(k, k)
+        # rank of the true class: number of classes more probable than it
+        ranks = np.count_nonzero(probas > probas[labels, np.arange(m)], axis=0)
+        self._ranks += np.bincount(ranks, minlength=k)
+
+    def accuracy(self):
+        """
+        @return: fraction of correct predictions, floats
+        """
+        count = self.count
+        return float(np.trace(self.confusion)) / count if count else 0.
+
+    def top_k_accuracy(self, k):
+        """
+        @param k: number of most probable classes counted as correct, ints
+        @return: fraction of samples with the true class among the k most probable, floats
+        """
+        count = self.count
+        return float(self._ranks[:min(k, self.num_classes)].sum()) / count if count else 0.
+
+    def precision(self):
+        """
+        @return: precision of every class, 0 for classes never predicted, numpy arrays (classes,)
+        """
+        predicted = self.confusion.sum(axis=0)
+        return np.divide(np.diag(self.confusion), predicted, out=np.zeros(self.num_classes), where=predicted > 0)
+
+    def recall(self):
+        """
+        @return: recall of every class, 0 for classes never seen, numpy arrays (classes,)
+        """
+        actual = self.confusion.sum(axis=1)
+        return np.divide(np.diag(self.confusion), actual, out=np.zeros(self.num_classes), where=actual > 0)
+
+    def f1(self):
+        """
+        @return: F1 score of every class, numpy arrays (classes,)
+        """
+        precision, recall = self.precision(), self.recall()
+        total = precision + recall
+        return np.divide(2 * precision * recall, total, out=np.zeros(self.num_classes), where=total > 0)
+
+    def summary(self):
+        """
+        @return: count, accuracy, top-k accuracy, per-class precision, recall and support,
+                 and the confusion matrix, dictionaries
+        """
+        return {
+            'count': self.count,
+            'accuracy': self.accuracy(),
+            'top_k_accuracy': {k: self.top_k_accuracy(k) for k in self.top_k},
+            'precision': self.precision().tolist(),
+            'recall': self.recall().tolist(),
+            'f1': self.f1().tolist(),
+            'support': self.confusion.sum(axis=1).tolist(),
+            'confusion': self.confusion.tolist(),
+        }
+
+    def report(self):
+        """
+        format per-class metrics and accuracy as a text table.
+
+        @return: report, strings
+        """
+        lines = ['{:>8} {:>10} {:>10} {:>10} {:>10}'.format('class', 'precision', 'recall', 'f1', 'support')]
+        support = self.confusion.sum(axis=1)
+        for label, (precision, recall, f1) in enumerate(zip(self.precision(), self.recall(), self.f1())):
+            lines.append('{:>8} {:>10.4f} {:>10.4f} {:>10.4f} {:>10}'.format(
+                label, precision, recall, f1, support[label]))
+        lines.append('accuracy: {:.4f} of {} samples'.format(self.accuracy(), self.count))
+        for k in self.top_k:
+            if k > 1:
+                lines.append('top-{} accuracy: {:.4f}'.format(k, self.top_k_accuracy(k)))
+        return '\n'.join(lines)
+
+
+def evaluate_batches(model, batches, top_k=(1,), activations=None):
+    """
+    evaluate a classifier over a stream of batches, e.g. ml.common.datastream.CsvStream.
+
+    @param model: network, parameters or parameters in dict format
+    @param batches: iterable of (x, y) batches, with y as integer labels or one-hot answers
+    @param top_k: values of k to count top-k accuracy for, tuples of ints
+    @param activations: activation names of layers 1..L, None for the default, lists
+    @return: metrics, Evaluation
+    """
+    network = get_network(model, activations)
+    buffers = PingPongBuffers(network.layer_dims, 0, network.dtype)
+    evaluation = Evaluation(max(2, network.layer_dims[-1]), top_k)
+    for x, y in batches:
+        evaluation.update(network.predict(x, buffers), y)
+    return evaluation
+
+
+def evaluate(model, x, y, batch_size=EVALUATION_BATCH_SIZE, top_k=(1,), activations=None):
+    """
+    evaluate a classifier on a test set, in chunks of batch_size samples.
+
+    @param model: network, parameters or parameters in dict format
+    @param x: input X, numpy arrays (features, m)
+    @param y: integer labels (1, m), or one-hot answers (classes, m), numpy arrays
+    @param batch_size: number of samples per forward propagation, ints
+    @param top_k: values of k to count top-k accuracy for, tuples of ints
+    @param activations: activation names of layers 1..L, None for the default, lists
+    @return: metrics, Evaluation
+    """
+    if batch_size <= 0:
+        LOGGER.error('invalid batch size: %s', batch_size)
+        raise ValueError('batch size must be positive: {}'.format(batch_size))
+    y = np.asarray(y)
+    y = y.reshape(1, -1) if y.ndim == 1 else y
+    m = x.shape[1]
+    batches = ((x[:, start:start + batch_size], y[:, start:start + batch_size]) for start in range(0, m, batch_size))
+    return evaluate_batches(model, batches, top_k, activations)
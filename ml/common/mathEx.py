@@ -11,35 +11,56 @@
 LOGGER = get_logger(__name__)
 
 
-def change_to_multi_class(y):
+def change_to_multi_class(y, num_classes=None, dtype=np.float64):
     """
     change the input prediction y to array-wise multi_class classifiers.
+    labels that are not non-negative integers are mapped to class 0.
 
     @param y:input prediction y, numpy arrays
+    @param num_classes: number of classes, None for the maximum label + 1, ints
+    @param dtype: data type of the classifiers, numpy dtypes
     @return: array-wise multi_class classifiers
     """
     if not isinstance(y, np.ndarray) or y.ndim <= 1:
         LOGGER.info('Input is not an np.ndarray, adding default value...')
         y = np.array([[0]])
 
-    m = y.shape[1]
-    num_of_fields = int(y.max()) + 1
-    multi_class_y = np.zeros([num_of_fields, m])
-
-    for i in range(m):
-        label = y[0, i]
-        # print(type(label))
-        if isinstance(label, np.int64) and label >= 0:
-            multi_class_y[label, i] = 1
-        else:
-            multi_class_y[0, i] = 1
+    labels = y[0]
+    if labels.dtype.kind != 'i' and labels.dtype.kind != 'u':
+        integral = (labels == np.floor(labels)) & (labels >= 0)
+        if not np.all(integral):
+            LOGGER.warning('%s labels are not non-negative integers, mapped to class 0', np.sum(~integral))
+        labels = np.where(integral, labels, 0).astype(np.int64)
+    elif np.any(labels < 0):
+        LOGGER.warning('%s labels are negative, mapped to class 0', np.sum(labels < 0))
+        labels = np.maximum(labels, 0)
+
+    num_of_fields = int(labels.max()) + 1 if num_classes is None else num_classes
+    multi_class_y = np.zeros([num_of_fields, labels.shape[0]], dtype=dtype)
+    multi_class_y[labels, np.arange(labels.shape[0])] = 1
 
     return multi_class_y
 
 
+def sparse_labels(y, m):
+    """
+    get integer class labels of m samples, from labels (1, m) or (m,), or one-hot answers (classes, m).
+
+    @param y: labels or one-hot answers, numpy arrays
+    @param m: number of samples, ints
+    @return: labels, numpy arrays (m,)
+    """
+    y = np.asarray(y)
+    if y.size == m:
+        return y.reshape(m).astype(np.intp, copy=False)
+    return np.argmax(y, axis=0)
+
+
 def compute_cost(al, y):
     """
     compute costs between output results and actual results y. NEEDS TO BE MODIFIED.
+    kept for legacy callers: the products sum cross terms of every pair of classes, O(classes^2 x m);
+    use cross_entropy_cost, or sigmoid_cross_entropy_with_logits from logits.
 
     @param al: output results, numpy arrays
     @param y: actual result, numpy arrays
@@ -66,9 +87,112 @@ def compute_cost(al, y):
     return cost
 
 
+def cross_entropy_cost(al, y):
+    """
+    compute elementwise cross-entropy cost of sigmoid outputs: -sum(y * log(AL) + (1 - y) * log(1 - AL)) / m.
+
+    @param al: output results AL, numpy arrays (classes, m)
+    @param y: actual results y, numpy arrays (classes, m)
+    @return: cost, floats
+    """
+    m = y.shape[1]
+    return float(-np.sum(y * np.log(al) + (1 - y) * np.log(1 - al)) / m)
+
+
+def cross_entropy_backward(al, y, out=None, scratch=None):
+    """
+    compute gradients of cross-entropy cost with respect to output results.
+
+    @param al: output results AL, numpy arrays
+    @param y: actual results y, numpy arrays
+    @param out: buffer to write dAL into, None to allocate, numpy arrays
+    @param scratch: scratch buffer of the same shape, required with out, numpy arrays
+    @return: dAL, numpy arrays
+    """
+    if out is None:
+        return - (np.divide(y, al) - np.divide(1 - y, 1 - al))
+
+    # dAL = (1 - y) / (1 - AL) - y / AL
+    dal = np.divide(np.subtract(1, y, out=out), np.subtract(1, al, out=scratch), out=out)
+    dal -= np.divide(y, al, out=scratch)
+    return dal
+
+
+def sigmoid_cross_entropy_with_logits(z, y):
+    """
+    compute cross-entropy cost of sigmoid outputs from logits Z, without overflow at saturation.
+
+    per element: -y * log(sigmoid(z)) - (1 - y) * log(1 - sigmoid(z)) == max(z, 0) - z * y + log(1 + exp(-|z|))
+
+    @param z: logits Z of the output layer, numpy arrays (classes, m)
+    @param y: actual results y, numpy arrays (classes, m)
+    @return: cost, floats
+    """
+    m = z.shape[1]
+    loss = np.abs(z)
+    np.negative(loss, out=loss)
+    np.exp(loss, out=loss)
+    np.log1p(loss, out=loss)
+    cost = np.sum(loss) + np.sum(np.maximum(z, 0, out=loss)) - np.vdot(z, np.asarray(y, dtype=z.dtype))
+    return float(cost) / m
+
+
+def sigmoid_cross_entropy_backward(al, y, out=None):
+    """
+    compute gradients of cross-entropy cost with respect to logits of sigmoid outputs: dZ = AL - Y.
+
+    fuses cross_entropy_backward and sigmoid_backward_from_activation, with no divisions by AL or 1 - AL.
+
+    @param al: output results AL, numpy arrays
+    @param y: actual results y, numpy arrays
+    @param out: buffer to write dZ into, None to allocate, numpy arrays
+    @return: dZ, numpy arrays
+    """
+    return np.subtract(al, y, out=out)
+
+
+def softmax_cross_entropy_with_logits(z, y):
+    """
+    compute categorical cross-entropy cost of softmax outputs from logits Z, without overflow.
+
+    per sample: log(sum(exp(z))) - z[label], with the maximum of z subtracted before exp.
+
+    @param z: logits Z of the output layer, numpy arrays (classes, m)
+    @param y: integer labels (1, m) or (m,), or one-hot answers (classes, m), numpy arrays
+    @return: cost, floats
+    """
+    m = z.shape[1]
+    labels = sparse_labels(y, m)
+    z_max = np.max(z, axis=0)
+    shifted = np.subtract(z, z_max)
+    np.exp(shifted, out=shifted)
+    log_sum = np.log(np.sum(shifted, axis=0))
+    return float(np.sum(log_sum + z_max) - np.sum(z[labels, np.arange(m)])) / m
+
+
+def softmax_cross_entropy_backward(al, y, out=None):
+    """
+    compute gradients of categorical cross-entropy cost with respect to logits of softmax outputs: dZ = AL - Y,
+    subtracting 1 at the label of every sample instead of building one-hot answers.
+
+    @param al: output results AL, numpy arrays (classes, m)
+    @param y: integer labels (1, m) or (m,), or one-hot answers (classes, m), numpy arrays
+    @param out: buffer to write dZ into, None to allocate, numpy arrays
+    @return: dZ, numpy arrays
+    """
+    m = al.shape[1]
+    if out is None:
+        dz = al.copy()
+    else:
+        dz = out
+        np.copyto(dz, al)
+    dz[sparse_labels(y, m), np.arange(m)] -= 1
+    return dz
+
+
 def compute_cost_with_l2_regularization(al, y, parameters, lambd):
     """
-    compute costs with L2 regularization, uses the original cost function.
+    compute costs with L2 regularization, uses the elementwise cost of cross_entropy_cost.
 
     @param al: results AL, numpy arrays
     @param y: actual results y, numpy arrays
@@ -98,12 +222,12 @@ def compute_cost_with_l2_regularization(al, y, parameters, lambd):
             raise ex
 
     # compute regular costs
-    cross_entropy_cost = compute_cost(al, y)
+    regular_cost = cross_entropy_cost(al, y)
 
     # combine regular costs and regularization term
     l2_regularization_cost = (lambd / (2 * m)) * w_square_sum
 
-    cost = cross_entropy_cost + l2_regularization_cost
+    cost = regular_cost + l2_regularization_cost
 
     return cost
 
@@ -150,16 +274,19 @@ def initialize_parameters_deep(layer_dims):
 """
 
 
-def l_model_forward(x, parameters):
+def l_model_forward(x, parameters, workspace=None):
     """
     Forward propagation of deep learning.
 
     @param x: input x, numpy arrays
     @param parameters:
+    @param workspace: preallocated buffers to write Z and A into, None to allocate new arrays,
+                      ml.common.workspace.Workspace
     @return: output aL and caches for following calculations, numpy arrays and indexes
     """
     caches = []
-    a = x
+    a = x if workspace is None else workspace.input(x)
+    m = a.shape[1]
     l_total = len(parameters) // 2  # number of layers in the neural network
 
     # Implement [LINEAR -> RELU]*(L-1). Add "cache" to the "caches" list.
@@ -171,7 +298,7 @@ def l_model_forward(x, parameters):
         # print(parameters['W' + str(l)])
         a, cache = linear_activation_forward(
             a_prev, parameters['W' + str(l)], parameters['b' + str(l)],
-            activation="leaky_relu")  # was relu
+            activation="leaky_relu", out=_forward_buffers(workspace, l, m))  # was relu
         caches.append(cache)
 
     # Implement LINEAR -> SIGMOID. Add "cache" to the "caches" list.
@@ -179,7 +306,8 @@ def l_model_forward(x, parameters):
     # output layer with sigmoid activation
 
     al, cache = linear_activation_forward(
-        a, parameters['W' + str(l_total)], parameters['b' + str(l_total)], activation="sigmoid")
+        a, parameters['W' + str(l_total)], parameters['b' + str(l_total)], activation="sigmoid",
+        out=_forward_buffers(workspace, l_total, m))
 
     caches.append(cache)
 
@@ -188,7 +316,35 @@ def l_model_forward(x, parameters):
     return al, caches
 
 
-def l_model_backward_with_l2(al, y, caches, lambd):
+def l_model_predict(x, parameters, buffers=None, activations=None):
+    """
+    Forward propagation for inference, without caches.
+
+    only the current activation is kept, so peak memory per layer does not grow
+    with depth; with buffers, activations alternate between two preallocated
+    ping-pong buffers and propagation allocates nothing.
+
+    @param x: input x, numpy arrays (features, m)
+    @param parameters: parameters keyed 'W1', 'b1', ..., dictionaries
+    @param buffers: preallocated buffers, None to allocate, ml.common.workspace.PingPongBuffers
+    @param activations: activation names of layers 1..L, None for leaky relu in hidden layers
+                        and sigmoid in the output layer, same as l_model_forward, lists
+    @return: output aL, a view into buffers if given, numpy arrays
+    """
+    l_total = len(parameters) // 2
+    activations = activations or ['leaky_relu'] * (l_total - 1) + ['sigmoid']
+    a = x if buffers is None else buffers.input(x)
+    m = a.shape[1]
+
+    for l in range(1, l_total + 1):
+        out, scratch = (None, None) if buffers is None else (buffers.out(l, m), buffers.scratch(l, m))
+        a = linear_activation_predict(
+            a, parameters['W' + str(l)], parameters['b' + str(l)], activations[l - 1], out=out, scratch=scratch)
+
+    return a
+
+
+def l_model_backward_with_l2(al, y, caches, lambd, workspace=None):
     """
     Backward propagation for deep learning with L2 regularization.
 
@@ -196,20 +352,22 @@ def l_model_backward_with_l2(al, y, caches, lambd):
     @param y: actual answers y, numpy arrays
     @param caches: caches from forward propagation, dictionaries
     @param lambd: regularization parameter lambda, floats
+    @param workspace: preallocated buffers to write gradients into, None to allocate new arrays;
+                      with a workspace, dA0 (gradient of the input) is not computed,
+                      ml.common.workspace.Workspace
     @return: gradients for gradient decent, dictionaries
     """
     grads = {}
     l = len(caches)  # the number of layers
-    y = y.reshape(al.shape)  # after this line, Y is the same shape as AL
-
-    # Initializing the back propagation
-    dal = - (np.divide(y, al) - np.divide(1 - y, 1 - al))
+    y = np.asarray(y, dtype=al.dtype).reshape(al.shape)  # after this line, Y is the same shape and precision as AL
+    m = al.shape[1]
 
     # Lth layer Inputs: "AL, Y, caches". Outputs: "grads["dAL"], grads["dWL"], grads["dbL"]
-    current_cache = caches[l - 1]
+    # sigmoid and cross-entropy gradients fused: dZ = AL - Y
+    out = _backward_buffers(workspace, l, m)
+    dz = sigmoid_cross_entropy_backward(al, y, out=None if out is None else out[0])
     grads["dA" + str(l - 1)], grads["dW" + str(l)], grads["db" + str(l)] = \
-        linear_activation_backward_with_l2(
-            dal, current_cache, lambd, activation="sigmoid")
+        linear_backward_with_l2(dz, caches[l - 1][0], lambd, out=None if out is None else out[1:])
 
     for l in reversed(range(l - 1)):
         # lth layer: (RELU -> LINEAR) gradients.
@@ -218,15 +376,17 @@ def l_model_backward_with_l2(al, y, caches, lambd):
         # use relu or leaky relu for hidden layers
         da_prev_temp, dw_temp, db_temp = \
             linear_activation_backward_with_l2(
-                grads["dA" + str(l + 1)], current_cache, lambd, activation="leaky_relu")
-        grads["dA" + str(l)] = da_prev_temp
+                grads["dA" + str(l + 1)], current_cache, lambd, activation="leaky_relu",
+                out=_backward_buffers(workspace, l + 1, m))
+        if da_prev_temp is not None:
+            grads["dA" + str(l)] = da_prev_temp
         grads["dW" + str(l + 1)] = dw_temp
         grads["db" + str(l + 1)] = db_temp
 
     return grads
 
 
-def linear_activation_backward_with_l2(da, cache, lambd, activation):
+def linear_activation_backward_with_l2(da, cache, lambd, activation, out=None, a=None):
     """
     activation step for backward propagation with multiple choices of activation function.
 
@@ -234,27 +394,33 @@ def linear_activation_backward_with_l2(da, cache, lambd, activation):
     @param cache: caches in deep learning, dictionaries
     @param lambd: regularization parameter lambda, floats
     @param activation: choice of activation, strings
+    @param out: buffers (dZ, dA_prev, dW, db, L2 scratch) to write into, None to allocate, tuples
+    @param a: activation A of the layer to compute sigmoid gradient from, None to use Z, numpy arrays
     @return: last dA, dW, db, numpy arrays
     """
 
     linear_cache, activation_cache = cache
+    dz_out, linear_out = (None, None) if out is None else (out[0], out[1:])
 
     # if activation == "relu":
     # dZ = relu_backward(da, activation_cache)
     # dA_prev, dW, db = linear_backward_with_l2(dZ, linear_cache, lambd)
 
     if activation == "sigmoid":
-        dZ = sigmoid_backward(da, activation_cache)
-        dA_prev, dW, db = linear_backward_with_l2(dZ, linear_cache, lambd)
+        if a is None:
+            dZ = sigmoid_backward(da, activation_cache)
+        else:
+            dZ = sigmoid_backward_from_activation(da, a, out=dz_out)
+        dA_prev, dW, db = linear_backward_with_l2(dZ, linear_cache, lambd, out=linear_out)
 
     elif activation == "leaky_relu":
-        dZ = leaky_relu_backward(da, activation_cache)
-        dA_prev, dW, db = linear_backward_with_l2(dZ, linear_cache, lambd)
+        dZ = leaky_relu_backward(da, activation_cache, out=dz_out)
+        dA_prev, dW, db = linear_backward_with_l2(dZ, linear_cache, lambd, out=linear_out)
 
     return dA_prev, dW, db
 
 
-def linear_activation_forward(a_prev, w, b, activation):
+def linear_activation_forward(a_prev, w, b, activation, out=None):
     """
     activation step for forward propagation with multiple choices of activation function.
 
@@ -262,13 +428,15 @@ def linear_activation_forward(a_prev, w, b, activation):
     @param w: parameter W in current layer, numpy arrays
     @param b: parameter b in current layer, numpy arrays
     @param activation: choice of activation, strings
+    @param out: buffers (Z, A) to write into, None to allocate, tuples
     @return: current A and cache for following calculation
     """
+    z_out, a_out = (None, None) if out is None else out
 
     if activation == "sigmoid":
         # Inputs: "A_prev, W, b". Outputs: "A, activation_cache".
-        z, linear_cache = linear_forward(a_prev, w, b)
-        a, activation_cache = sigmoid(z)
+        z, linear_cache = linear_forward(a_prev, w, b, out=z_out)
+        a, activation_cache = sigmoid(z, out=a_out)
 
     # elif activation == "relu":
         # Inputs: "A_prev, W, b". Outputs: "A, activation_cache".
@@ -277,50 +445,97 @@ def linear_activation_forward(a_prev, w, b, activation):
 
     elif activation == "leaky_relu":
         # Inputs: "A_prev, W, b". Outputs: "A, activation_cache".
-        z, linear_cache = linear_forward(a_prev, w, b)
-        a, activation_cache = leaky_relu(z)
+        z, linear_cache = linear_forward(a_prev, w, b, out=z_out)
+        a, activation_cache = leaky_relu(z, out=a_out)
 
     assert (a.shape == (w.shape[0], a_prev.shape[1]))
     cache = (linear_cache, activation_cache)
     return a, cache
 
 
-def linear_backward_with_l2(dz, cache, lambd):
+def linear_activation_predict(a_prev, w, b, activation, out=None, scratch=None):
+    """
+    linear and activation step for inference, adding b and applying the activation in place of Z.
+
+    @param a_prev: previous A, numpy arrays
+    @param w: parameter W in current layer, numpy arrays
+    @param b: parameter b in current layer, numpy arrays
+    @param activation: 'leaky_relu', 'relu', 'sigmoid' or 'softmax', strings
+    @param out: buffer to write A into, None to allocate, numpy arrays
+    @param scratch: buffer of the shape of A for leaky relu, which may hold a_prev, None to allocate, numpy arrays
+    @return: current A, numpy arrays
+    """
+    a = w.dot(a_prev) if out is None else np.dot(w, a_prev, out=out)
+    a += b
+
+    if activation == "leaky_relu":
+        np.maximum(a, np.multiply(a, 0.01, out=scratch), out=a)
+    elif activation == "relu":
+        np.maximum(a, 0, out=a)
+    elif activation == "sigmoid":
+        sigmoid(a, out=a)
+    elif activation == "softmax":
+        softmax(a, out=a)
+    else:
+        LOGGER.error('unknown activation: %s', activation)
+        raise ValueError('unknown activation: {}'.format(activation))
+
+    return a
+
+
+def linear_backward_with_l2(dz, cache, lambd, out=None):
     """
     linear step in backward propagation.
 
     @param dz: current dZ, numpy arrays
     @param cache: caches from previous calculation, dictionaries
     @param lambd: regularization parameter lambda, floats
+    @param out: buffers (dA_prev, dW, db, L2 scratch) to write into, None to allocate;
+                dA_prev is not computed if its buffer is None, tuples
     @return: previous dA, current dW, db, numpy arrays
     """
 
     a_prev, w, b = cache
     m = a_prev.shape[1]
-    dW = 1. / m * np.dot(dz, a_prev.T) + (lambd / m) * w
-    db = 1. / m * np.sum(dz, axis=1, keepdims=True)
-    dA_prev = np.dot(w.T, dz)
+
+    if out is None:
+        dW = 1. / m * np.dot(dz, a_prev.T) + (lambd / m) * w
+        db = 1. / m * np.sum(dz, axis=1, keepdims=True)
+        dA_prev = np.dot(w.T, dz)
+    else:
+        da_prev_out, dW, db, dw_l2 = out
+        np.dot(dz, a_prev.T, out=dW)
+        dW += np.multiply(w, lambd, out=dw_l2)
+        dW *= 1. / m
+        np.sum(dz, axis=1, keepdims=True, out=db)
+        db *= 1. / m
+        dA_prev = None if da_prev_out is None else np.dot(w.T, dz, out=da_prev_out)
 
     # dA_prev = dropouts_backward(dA_prev, D, keep_prob)
 
-    assert (dA_prev.shape == a_prev.shape)
+    assert (dA_prev is None or dA_prev.shape == a_prev.shape)
     assert (dW.shape == w.shape)
     assert (db.shape == b.shape)
 
     return dA_prev, dW, db
 
 
-def linear_forward(a, w, b):
+def linear_forward(a, w, b, out=None):
     """
     linear step for forward propagation
     @param a: current A, numpy arrays
     @param w: current parameter W, numpy arrays
     @param b: current parameter b, numpy arrays
+    @param out: buffer to write Z into, None to allocate, numpy arrays
     @return: current z, and caches for following calculations, numpy arrays and dictionaries
     """
 
     # print(a.shape, w.shape, b.shape)
-    z = w.dot(a) + b
+    if out is None:
+        z = w.dot(a) + b
+    else:
+        z = np.dot(w, a, out=out)
+        z += b
 
     assert (z.shape == (w.shape[0], a.shape[1]))
     cache = (a, w, b)
@@ -345,17 +560,18 @@ def one_vs_all_prediction(prob_matrix):
     return prediction
 
 
-def relu(z):
+def relu(z, out=None):
     """
     relu function
 
     @param z: input A, numpy arrays or numbers
+    @param out: buffer to write A into, None to allocate, numpy arrays
     @return: output A, numpy arrays or numbers
     """
     if isinstance(z, np.float) or isinstance(z, np.int64) or isinstance(z, float) or isinstance(z, int):
         z = np.array([[z]])
 
-    a = np.maximum(0, z)
+    a = np.maximum(0, z, out=out)
 
     assert (a.shape == z.shape)
 
@@ -363,17 +579,22 @@ def relu(z):
     return a, cache
 
 
-def relu_backward(da, cache):
+def relu_backward(da, cache, out=None):
     """
     compute gradient of relu function.
 
     @param da: input dA, numpy arrays or numbers
     @param cache: caches with Z, dictionaries
+    @param out: buffer to write dZ into, None to allocate, numpy arrays
     @return: result dZ, numpy arrays or numbers
     """
 
     z = cache
-    dz = np.array(da, copy=True)  # just converting dz to a correct object.
+    if out is None:
+        dz = np.array(da, copy=True)  # just converting dz to a correct object.
+    else:
+        dz = out
+        np.copyto(dz, da)
 
     # When z <= 0s you should set dz to 0 as well.
     dz[z <= 0] = 0
@@ -383,18 +604,22 @@ def relu_backward(da, cache):
     return dz
 
 
-def leaky_relu(z):
+def leaky_relu(z, out=None):
     """
     leaky relu function
 
     @param z: input Z, numpy arrays or numbers
+    @param out: buffer to write A into, None to allocate, numpy arrays
     @return: result A and caches for following calculation
     """
 
     if isinstance(z, np.float) or isinstance(z, np.int64) or isinstance(z, float) or isinstance(z, int):
         z = np.array([[z]])
 
-    a = np.maximum(0.01 * z, z)
+    if out is None:
+        a = np.maximum(0.01 * z, z)
+    else:
+        a = np.maximum(np.multiply(z, 0.01, out=out), z, out=out)
 
     assert (a.shape == z.shape)
 
@@ -402,16 +627,22 @@ def leaky_relu(z):
     return a, cache
 
 
-def leaky_relu_backward(da, cache):
+def leaky_relu_backward(da, cache, out=None):
     """
     compute gradients of leaky relu function.
 
     @param da: input dA, numpy arrays or numbers
     @param cache: cache with Z, dictionaries
+    @param out: buffer to write dZ into, None to allocate, numpy arrays
     @return: result dZ, numpy arrays or numbers
     """
     z = cache
-    dz = np.array(da, copy=True)  # just converting dz to a correct object.
+    if out is None:
+        # a float copy of dA, so integer gradients keep the 0.01 slope
+        dz = np.array(da, dtype=np.result_type(da, 0.01))
+    else:
+        dz = out
+        np.copyto(dz, da)
 
     # When z < 0, you should set dz to 0.01  as well.
     # temp = np.ones(Z.shape)
@@ -421,29 +652,67 @@ def leaky_relu_backward(da, cache):
     # Z[Z != 1] = 0.01
     # dZ = dZ*Z
 
-    temp = np.ones_like(z)
-    temp[z <= 0] = 0.01
-    dz = dz*temp
+    # scale dZ in place where z <= 0, instead of multiplying by a full slope array
+    np.multiply(dz, 0.01, out=dz, where=z <= 0)
 
     assert (dz.shape == z.shape)
 
     return dz
 
 
-def sigmoid(z):
+def sigmoid(z, out=None):
     """
     sigmoid function.
 
     @param z: input Z, numpy arrays or numbers
+    @param out: buffer to write A into, None to allocate, numpy arrays
     @return: result A, caches for following calculations, numpy arrays or numbers, dictionaries
     """
 
-    a = 1 / (1 + np.exp(-z))
+    if out is None:
+        a = 1 / (1 + np.exp(-z))
+    else:
+        a = np.exp(np.negative(z, out=out), out=out)
+        a += 1
+        np.reciprocal(a, out=a)
+    cache = z
+
+    return a, cache
+
+
+def softmax(z, out=None):
+    """
+    softmax function over classes (rows) of every sample, stable for large Z.
+
+    @param z: input Z, numpy arrays (classes, m)
+    @param out: buffer to write A into, None to allocate, numpy arrays
+    @return: result A, caches for following calculations, numpy arrays, dictionaries
+    """
+    a = np.subtract(z, np.max(z, axis=0), out=out)
+    np.exp(a, out=a)
+    a /= np.sum(a, axis=0)
     cache = z
 
     return a, cache
 
 
+def softmax_backward_from_activation(da, a, out=None):
+    """
+    compute gradients of softmax function from its activation: dZ = A * (dA - sum(dA * A)) per sample.
+
+    @param da: input dA, numpy arrays
+    @param a: activation A = softmax(Z), numpy arrays
+    @param out: buffer to write dZ into, None to allocate, numpy arrays
+    @return: result dZ, numpy arrays
+    """
+    dz = np.multiply(da, a, out=out)
+    dz_sum = np.sum(dz, axis=0)
+    np.subtract(da, dz_sum, out=dz)
+    dz *= a
+
+    return dz
+
+
 def sigmoid_backward(da, cache):
     """
     compute gradients of sigmoid function.
@@ -468,6 +737,38 @@ def sigmoid_backward(da, cache):
     return dz
 
 
+def sigmoid_backward_from_activation(da, a, out=None):
+    """
+    compute gradients of sigmoid function from its activation, without re-computing exp(Z).
+
+    @param da: input dA, numpy arrays
+    @param a: activation A = sigmoid(Z), numpy arrays
+    @param out: buffer to write dZ into, None to allocate, numpy arrays
+    @return: result dZ, numpy arrays
+    """
+    dz = np.subtract(1, a, out=out)
+    dz *= a
+    dz *= da
+
+    assert (dz.shape == a.shape)
+
+    return dz
+
+
+def _forward_buffers(workspace, l, m):
+    """
+    @return: (Z, A) buffers of layer l in a workspace, or None without workspace
+    """
+    return None if workspace is None else workspace.forward_buffers(l, m)
+
+
+def _backward_buffers(workspace, l, m):
+    """
+    @return: (dZ, dA_prev, dW, db, L2 scratch) buffers of layer l in a workspace, or None without workspace
+    """
+    return None if workspace is None else workspace.backward_buffers(l, m)
+
+
 """
 unused dropout functions
 def dropouts_forward(A,  activation_cache, keep_prob):
@@ -0,0 +1,356 @@
+"""
+common.model_registry.py
+
+Named, versioned models hot-reloaded from their parameter files.
+
+Parameter files are replaced atomically (ml.common.param_file.save_network
+writes a temporary file and renames it over the old one), so a new file has
+a new inode. The registry polls (os.stat) the inode, size and modification
+time of every registered file, from a watcher thread or by check(), and
+loads a changed file into a new model version.
+
+Versions are swapped by read-copy-update: a writer loads the new model
+aside, then publishes a new copy of the version dict with one assignment,
+which readers pick up without locking. A reader holds on to the version it
+took for the whole request (use() or acquire()), so in-flight requests finish
+on the old weights; a retired version is closed once its last reader
+releases it. A file failing to load keeps the current version.
+"""
+import contextlib
+import os
+import threading
+import time
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+RELOAD_INTERVAL = 1.  # seconds between polls of the watcher
+MAX_HISTORY = 10  # versions kept in the history of every model
+
+
+def file_signature(path):
+    """
+    @param path: path of a file, strings
+    @return: inode, size and modification time in ns of the file, tuples; None if the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ModelVersion:
+    """
+    ModelVersion class is one loaded version of a model, counting its readers.
+    """
+
+    def __init__(self, name, version, model, path=None, signature=None):
+        """
+        Constructor of ModelVersion
+
+        @param name: model name, strings
+        @param version: version number, from 1, ints
+        @param model: loaded model, e.g. an inference engine
+        @param path: path of the parameter file, strings
+        @param signature: signature of the file when loaded, tuples of file_signature
+        """
+        self.name = name
+        self.version = version
+        self.model = model
+        self.path = path
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.readers = 0
+        self.retired = False
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def info(self):
+        """
+        @return: name, version, path and loaded_at of the version, dictionaries
+        """
+        return {'name': self.name, 'version': self.version, 'path': self.path, 'loaded_at': self.loaded_at}
+
+    def acquire(self):
+        """
+        take a reference to the version.
+
+        @return: False if the version is already closed, booleans
+        """
+        with self._lock:
+            if self.closed:
+                return False
+            self.readers += 1
+            return True
+
+    def release(self):
+        """
+        drop a reference to the version, closing it if retired and not read any more.
+        """
+        with self._lock:
+            self.readers -= 1
+            closing = self.retired and self.readers == 0 and not self.closed
+            self.closed = self.closed or closing
+        if closing:
+            self._close()
+
+    def retire(self):
+        """
+        mark the version replaced, closing it once not read any more.
+        """
+        with self._lock:
+            self.retired = True
+            closing = self.readers == 0 and not self.closed
+            self.closed = self.closed or closing
+        if closing:
+            self._close()
+
+    def _close(self):
+        close = getattr(self.model, 'close', None)
+        if close is not None:
+            try:
+                close()
+            except Exception as ex:
+                LOGGER.error('failed to close %s version %s: %s', self.name, self.version, ex)
+        LOGGER.info('retired %s version %s', self.name, self.version)
+
+
+class ModelRegistry:
+    """
+    ModelRegistry class keeps the current version of named models, reloading changed parameter files.
+    """
+
+    def __init__(self, callbacks=None, max_history=MAX_HISTORY):
+        """
+        Constructor of ModelRegistry
+
+        @param callbacks: functions called with the old (None at first) and the new ModelVersion
+                          of every swap, lists
+        @param max_history: number of versions kept in the history of every model, ints
+        """
+        self.callbacks = list(callbacks or [])
+        self.max_history = max_history
+        self._versions = {}  # name: current ModelVersion, replaced as a whole by every swap
+        self._sources = {}  # name: (path, loader)
+        self._history = {}  # name: info of loaded versions, oldest first
+        self._failed = {}  # name: signature of a file that failed to load
+        self._lock = threading.RLock()  # serializes writers; readers never take it
+        self._watcher = None
+        self._stopping = threading.Event()
+
+    def __contains__(self, name):
+        return name in self._versions
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def names(self):
+        """
+        @return: names of registered models, lists
+        """
+        return sorted(self._versions)
+
+    def versions(self):
+        """
+        @return: {model name: current version number}, dictionaries
+        """
+        return {name: version.version for name, version in self._versions.items()}
+
+    def history(self, name):
+        """
+        @param name: model name, strings
+        @return: info of loaded versions, oldest first, lists of dictionaries
+        """
+        return list(self._history.get(name, []))
+
+    def get(self, name):
+        """
+        get the current version of a model, without taking a reference to it.
+
+        @param name: model name, strings
+        @return: current version, ModelVersion; None if not registered
+        """
+        return self._versions.get(name)
+
+    def acquire(self, name):
+        """
+        take a reference to the current version of a model; release() it when done.
+
+        @param name: model name, strings
+        @return: current version, ModelVersion
+        """
+        while True:
+            version = self._versions.get(name)
+            if version is None:
+                LOGGER.error('model not registered: %s', name)
+                raise KeyError('model not registered: {}'.format(name))
+            if version.acquire():
+                return version
+            # closed between the lookup and the reference: a newer version is published already
+
+    @contextlib.contextmanager
+    def use(self, name):
+        """
+        use the current version of a model for a request; a swap meanwhile does not affect it.
+
+        @param name: model name, strings
+        @return: context manager of the model
+        """
+        version = self.acquire(name)
+        try:
+            yield version.model
+        finally:
+            version.release()
+
+    def register(self, name, path, loader, model=None):
+        """
+        register a model loaded from a parameter file, replacing a model of the same name.
+
+        @param name: model name, strings
+        @param path: path of the parameter file to watch, strings
+        @param loader: function of the path returning a model
+        @param model: already loaded model, None to load it from the file; with a model,
+                      the file may not exist yet, and is loaded once created
+        @return: first version, ModelVersion
+        """
+        with self._lock:
+            signature = file_signature(path)
+            model = loader(path) if model is None else model
+            self._sources[name] = (path, loader)
+            self._history[name] = []
+            self._failed.pop(name, None)
+            return self._publish(ModelVersion(name, 1, model, path, signature))
+
+    def unregister(self, name):
+        """
+        remove a model; its current version is closed once not read any more.
+
+        @param name: model name, strings
+        """
+        with self._lock:
+            versions = dict(self._versions)
+            version = versions.pop(name, None)
+            self._versions = versions
+            self._sources.pop(name, None)
+            self._history.pop(name, None)
+            self._failed.pop(name, None)
+        if version is not None:
+            version.retire()
+
+    def clear(self):
+        """
+        remove all models.
+        """
+        for name in self.names():
+            self.unregister(name)
+
+    def reload(self, name):
+        """
+        load the parameter file of a model into a new version, and swap it in.
+
+        @param name: model name, strings
+        @return: new version, ModelVersion; None if the file failed to load
+        """
+        with self._lock:
+            if name not in self._sources:
+                LOGGER.error('model not registered: %s', name)
+                raise KeyError('model not registered: {}'.format(name))
+            path, loader = self._sources[name]
+            signature = file_signature(path)
+            try:
+                model = loader(path)
+            except Exception as ex:
+                self._failed[name] = signature
+                LOGGER.error('failed to reload %s from %s, keeping version %s: %s',
+                             name, path, self._versions[name].version, ex)
+                return None
+            self._failed.pop(name, None)
+            return self._publish(ModelVersion(name, self._versions[name].version + 1, model, path, signature))
+
+    def _publish(self, version):
+        """
+        swap in a new version: copy, update, and assign the version dict (read-copy-update).
+        """
+        versions = dict(self._versions)
+        old = versions.get(version.name)
+        versions[version.name] = version
+        self._versions = versions
+
+        history = self._history[version.name]
+        history.append(version.info())
+        del history[:-self.max_history]
+        LOGGER.info('published %s version %s: %s', version.name, version.version, version.path)
+        if old is not None:
+            old.retire()
+        for callback in self.callbacks:
+            callback(old, version)
+        return version
+
+    def changed(self):
+        """
+        @return: names of models whose parameter file was replaced since loaded, lists
+        """
+        changed = []
+        for name, version in self._versions.items():
+            path, _ = self._sources.get(name, (version.path, None))
+            signature = file_signature(path)
+            # a missing file, e.g. between unlink and rename of a non-atomic copy, keeps the version
+            if signature is not None and signature != version.signature and signature != self._failed.get(name):
+                changed.append(name)
+        return changed
+
+    def check(self):
+        """
+        reload models whose parameter file was replaced.
+
+        @return: names of reloaded models, lists
+        """
+        return [name for name in self.changed() if self.reload(name) is not None]
+
+    def start(self, interval=RELOAD_INTERVAL):
+        """
+        start a daemon thread checking parameter files every interval seconds, if not running.
+
+        threads do not survive fork, so start it in every worker process.
+
+        @param interval: seconds between checks, floats
+        """
+        if interval <= 0:
+            LOGGER.error('invalid reload interval: %s', interval)
+            raise ValueError('reload interval must be positive: {}'.format(interval))
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._stopping.clear()
+            self._watcher = threading.Thread(
+                target=self._watch, args=(interval,), name='model-registry', daemon=True)
+            self._watcher.start()
+        LOGGER.info('watching parameter files of %s every %s seconds', self.names(), interval)
+
+    def _watch(self, interval):
+        while not self._stopping.wait(interval):
+            try:
+                self.check()
+            except Exception as ex:
+                LOGGER.error('failed to check parameter files: %s', ex)
+
+    def stop(self):
+        """
+        stop the watcher thread.
+        """
+        self._stopping.set()
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None and watcher is not threading.current_thread():
+            watcher.join()
+
+    def close(self):
+        """
+        stop the watcher thread and remove all models.
+        """
+        self.stop()
+        self.clear()
@@ -0,0 +1,307 @@
+"""
+common.network.py
+
+Compiled layer graph of a deep learning model, with contiguous weight storage.
+
+A Network keeps every W and b in one flat buffer (all Ws first, then all bs),
+and every Layer holds views into it plus precompiled activation callables,
+so propagation needs neither string-keyed lookups nor activation dispatch.
+`to_parameters` exposes the same views in the 'W1', 'b1', ... dict format.
+"""
+import numpy as np
+
+from ml.common.mathEx import \
+    cross_entropy_backward, \
+    leaky_relu, \
+    leaky_relu_backward, \
+    linear_activation_predict, \
+    linear_backward_with_l2, \
+    linear_forward, \
+    relu, \
+    relu_backward, \
+    sigmoid, \
+    sigmoid_backward_from_activation, \
+    sigmoid_cross_entropy_backward, \
+    sigmoid_cross_entropy_with_logits, \
+    softmax, \
+    softmax_backward_from_activation, \
+    softmax_cross_entropy_backward, \
+    softmax_cross_entropy_with_logits, \
+    sparse_labels
+from ml.common.profiler import NO_SPAN
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+# activation name: (forward(z, out), backward(da, z, a, out))
+ACTIVATIONS = {
+    'leaky_relu': (leaky_relu, lambda da, z, a, out: leaky_relu_backward(da, z, out=out)),
+    'relu': (relu, lambda da, z, a, out: relu_backward(da, z, out=out)),
+    'sigmoid': (sigmoid, lambda da, z, a, out: sigmoid_backward_from_activation(da, a, out=out)),
+    'softmax': (softmax, lambda da, z, a, out: softmax_backward_from_activation(da, a, out=out)),
+}
+# output activation name: gradient of cross-entropy cost with respect to Z, dZ(AL, Y, out)
+FUSED_BACKWARD = {
+    'sigmoid': sigmoid_cross_entropy_backward,
+    'softmax': softmax_cross_entropy_backward,
+}
+
+
+class Layer:
+    """
+    Layer class is one [LINEAR -> ACTIVATION] step of a Network.
+    """
+    __slots__ = ('index', 'w', 'b', 'activation', 'activation_forward', 'activation_backward')
+
+    def __init__(self, index, w, b, activation):
+        """
+        Constructor of Layer
+
+        @param index: 1-based index of the layer in the network, ints
+        @param w: parameter W of the layer, numpy arrays
+        @param b: parameter b of the layer, numpy arrays
+        @param activation: activation name, e.g. 'leaky_relu', strings
+        """
+        if activation not in ACTIVATIONS:
+            LOGGER.error('unknown activation: %s', activation)
+            raise ValueError('unknown activation: {}'.format(activation))
+        self.index = index
+        self.w = w
+        self.b = b
+        self.activation = activation
+        self.activation_forward, self.activation_backward = ACTIVATIONS[activation]
+
+    def forward(self, a_prev, out=None):
+        """
+        forward propagation of the layer.
+
+        @param a_prev: A from the previous layer, numpy arrays
+        @param out: buffers (Z, A) to write into, None to allocate, tuples
+        @return: A and cache ((A_prev, W, b), Z) of the layer
+        """
+        z_out, a_out = (None, None) if out is None else out
+        z, linear_cache = linear_forward(a_prev, self.w, self.b, out=z_out)
+        a, _ = self.activation_forward(z, out=a_out)
+        return a, (linear_cache, z)
+
+    def backward(self, da, cache, a, lambd, out=None):
+        """
+        backward propagation of the layer with L2 regularization.
+
+        @param da: gradient of the layer output A, numpy arrays
+        @param cache: cache from forward propagation of the layer, tuples
+        @param a: output A of the layer, numpy arrays
+        @param lambd: regularization parameter lambda, floats
+        @param out: buffers (dZ, dA_prev, dW, db, L2 scratch) to write into, None to allocate, tuples
+        @return: dA_prev, dW, db, numpy arrays
+        """
+        linear_cache, z = cache
+        dz_out, linear_out = (None, None) if out is None else (out[0], out[1:])
+        dz = self.activation_backward(da, z, a, dz_out)
+        return linear_backward_with_l2(dz, linear_cache, lambd, out=linear_out)
+
+
+class Network:
+    """
+    Network class is a compiled graph of layers over contiguous weight storage.
+    """
+    __slots__ = ('layer_dims', 'activations', 'buffer', 'weights', 'layers')
+
+    def __init__(self, layer_dims, activations=None, buffer=None, dtype=np.float64):
+        """
+        Constructor of Network
+
+        @param layer_dims: dimensions of layers, including the input layer, lists
+        @param activations: activation names of layers 1..L, None for
+                            leaky relu in hidden layers and sigmoid in the output layer;
+                            'softmax' in the output layer trains on integer labels, lists
+        @param buffer: flat storage of all Ws then all bs, None to allocate zeros, numpy arrays
+        @param dtype: data type of a newly allocated buffer, numpy dtypes
+        """
+        self.layer_dims = [int(n) for n in layer_dims]
+        total = len(self.layer_dims) - 1
+        self.activations = list(activations or ['leaky_relu'] * (total - 1) + ['sigmoid'])
+        assert len(self.activations) == total
+
+        w_sizes = [self.layer_dims[l] * self.layer_dims[l - 1] for l in range(1, total + 1)]
+        w_total = sum(w_sizes)
+        size = w_total + sum(self.layer_dims[1:])
+        self.buffer = np.zeros(size, dtype=dtype) if buffer is None else buffer
+        if self.buffer.shape != (size,):
+            LOGGER.error('invalid buffer size %s for layers %s', self.buffer.shape, self.layer_dims)
+            raise ValueError('buffer size {} does not match layers {}'.format(self.buffer.shape, self.layer_dims))
+        self.weights = self.buffer[:w_total]
+
+        self.layers = []
+        w_offset, b_offset = 0, w_total
+        for l in range(1, total + 1):
+            rows, cols = self.layer_dims[l], self.layer_dims[l - 1]
+            w = self.buffer[w_offset:w_offset + rows * cols].reshape(rows, cols)
+            b = self.buffer[b_offset:b_offset + rows].reshape(rows, 1)
+            self.layers.append(Layer(l, w, b, self.activations[l - 1]))
+            w_offset += rows * cols
+            b_offset += rows
+
+    @classmethod
+    def from_parameters(cls, parameters, activations=None, dtype=None):
+        """
+        compile a network from parameters in dict format, copying them into contiguous storage.
+
+        @param parameters: parameters keyed 'W1', 'b1', ..., dictionaries
+        @param activations: activation names of layers 1..L, None for the default, lists
+        @param dtype: data type of the storage, None for the data type of W1
+        @return: network, Network
+        """
+        total = len(parameters) // 2
+        w_list = [np.asarray(parameters['W' + str(l)]) for l in range(1, total + 1)]
+        layer_dims = [w_list[0].shape[1]] + [w.shape[0] for w in w_list]
+        network = cls(layer_dims, activations, dtype=dtype or w_list[0].dtype)
+        for layer in network.layers:
+            layer.w[...] = parameters['W' + str(layer.index)]
+            layer.b[...] = parameters['b' + str(layer.index)]
+        return network
+
+    @property
+    def dtype(self):
+        """
+        @return: data type of the storage, numpy dtypes
+        """
+        return self.buffer.dtype
+
+    def to_parameters(self):
+        """
+        parameters in dict format, as views into the contiguous storage.
+
+        @return: parameters keyed 'W1', 'b1', ..., dictionaries
+        """
+        parameters = {}
+        for layer in self.layers:
+            parameters['W' + str(layer.index)] = layer.w
+            parameters['b' + str(layer.index)] = layer.b
+        return parameters
+
+    def forward(self, x, workspace=None, profiler=None):
+        """
+        forward propagation through all layers.
+
+        @param x: input X, numpy arrays (features, m)
+        @param workspace: preallocated buffers, None to allocate, ml.common.workspace.Workspace
+        @param profiler: profiler recording every layer, None for no profiling, ml.common.profiler.Profiler
+        @return: output AL and caches, same as ml.common.mathEx.l_model_forward
+        """
+        caches = []
+        a = x if workspace is None else workspace.input(x)
+        m = a.shape[1]
+        for layer in self.layers:
+            out = None if workspace is None else workspace.forward_buffers(layer.index, m)
+            with NO_SPAN if profiler is None else profiler.layer_span('forward', layer, m):
+                a, cache = layer.forward(a, out=out)
+            caches.append(cache)
+        return a, caches
+
+    def predict(self, x, buffers=None):
+        """
+        forward propagation for inference, without caches.
+
+        @param x: input X, numpy arrays (features, m)
+        @param buffers: preallocated buffers, None to allocate, ml.common.workspace.PingPongBuffers
+        @return: output AL, a view into buffers if given, same as ml.common.mathEx.l_model_predict
+        """
+        a = x if buffers is None else buffers.input(x)
+        m = a.shape[1]
+        for layer in self.layers:
+            l = layer.index
+            out, scratch = (None, None) if buffers is None else (buffers.out(l, m), buffers.scratch(l, m))
+            a = linear_activation_predict(a, layer.w, layer.b, layer.activation, out=out, scratch=scratch)
+        return a
+
+    def backward(self, al, y, caches, lambd, workspace=None, profiler=None):
+        """
+        backward propagation through all layers with L2 regularization, for cross-entropy cost.
+
+        @param al: output AL, numpy arrays
+        @param y: actual answers Y; integer labels (1, m) with a softmax output layer, numpy arrays
+        @param caches: caches from forward propagation, lists
+        @param lambd: regularization parameter lambda, floats
+        @param workspace: preallocated buffers, None to allocate, ml.common.workspace.Workspace
+        @param profiler: profiler recording every layer, None for no profiling, ml.common.profiler.Profiler
+        @return: gradients, same as ml.common.mathEx.l_model_backward_with_l2
+        """
+        grads = {}
+        total = len(self.layers)
+        m = al.shape[1]
+        # activation and cross-entropy gradients of the output layer are fused: dZ = AL - Y
+        fused = FUSED_BACKWARD.get(self.layers[-1].activation)
+        if fused is not softmax_cross_entropy_backward:
+            y = np.asarray(y, dtype=al.dtype).reshape(al.shape)
+
+        da = None
+        if not fused and workspace is None:
+            da = cross_entropy_backward(al, y)
+        elif not fused:
+            da = cross_entropy_backward(al, y, out=workspace.da(total, m), scratch=workspace.dz(total, m))
+
+        a = al
+        for layer in reversed(self.layers):
+            l = layer.index
+            out = None if workspace is None else workspace.backward_buffers(l, m)
+            with NO_SPAN if profiler is None else profiler.layer_span('backward', layer, m):
+                if fused and l == total:
+                    dz = fused(al, y, out=None if out is None else out[0])
+                    da_prev, grads['dW' + str(l)], grads['db' + str(l)] = \
+                        linear_backward_with_l2(dz, caches[l - 1][0], lambd, out=None if out is None else out[1:])
+                else:
+                    da_prev, grads['dW' + str(l)], grads['db' + str(l)] = \
+                        layer.backward(da, caches[l - 1], a, lambd, out=out)
+            if da_prev is not None:
+                grads['dA' + str(l - 1)] = da_prev
+            # output of the previous layer is the input cached by this layer
+            da, a = da_prev, caches[l - 1][0][0]
+
+        return grads
+
+    def l2_square_sum(self):
+        """
+        sum of squares of all Ws, computed over the contiguous weights in one product.
+
+        @return: sum of squares, floats
+        """
+        return float(np.dot(self.weights, self.weights))
+
+    def compute_cost(self, al, y, caches=None):
+        """
+        compute cross-entropy cost of outputs, in O(classes x m).
+
+        @param al: output results AL, numpy arrays
+        @param y: actual results y; integer labels (1, m) or one-hot answers with a softmax output layer,
+                  numpy arrays
+        @param caches: caches from forward propagation, to compute the cost stably from logits Z;
+                       None to compute it from AL, lists
+        @return: cost, floats
+        """
+        activation = self.layers[-1].activation
+        if caches is not None and activation == 'sigmoid':
+            return sigmoid_cross_entropy_with_logits(caches[-1][1], y)
+        if caches is not None and activation == 'softmax':
+            return softmax_cross_entropy_with_logits(caches[-1][1], y)
+
+        m = al.shape[1]
+        eps = np.finfo(al.dtype).eps
+        if activation == 'softmax':
+            return -float(np.sum(np.log(np.maximum(al[sparse_labels(y, m), np.arange(m)], eps)))) / m
+        y = np.asarray(y, dtype=al.dtype).reshape(al.shape)
+        al = np.clip(al, eps, 1. - eps)
+        return -float(np.vdot(y, np.log(al)) + np.vdot(1. - y, np.log1p(-al))) / m
+
+    def compute_cost_with_l2_regularization(self, al, y, lambd, caches=None):
+        """
+        compute costs with L2 regularization over the weights of the network.
+
+        @param al: output results AL, numpy arrays
+        @param y: actual results y, numpy arrays
+        @param lambd: regularization parameter lambda, floats
+        @param caches: caches from forward propagation, for the stable cost from logits, lists
+        @return: cost, floats
+        """
+        m = al.shape[1]
+        return self.compute_cost(al, y, caches) + (lambd / (2 * m)) * self.l2_square_sum()
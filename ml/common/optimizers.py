@@ -0,0 +1,265 @@
+"""
+common.optimizers.py
+
+Optimizers for updating parameters with gradients: gradient decent, Momentum, RMSProp and Adam.
+
+Every optimizer keeps its state in buffers preallocated on the first update,
+and updates the parameters in place, so no array is allocated per step.
+"""
+import numpy as np
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class GradientDescent:
+    """
+    GradientDescent class updates parameters by plain (stochastic) gradient decent.
+    """
+    name = 'gd'
+
+    def __init__(self):
+        self._keys = None
+        self._scratch = {}
+        self.t = 0  # number of updates
+
+    def _init_state(self, parameters):
+        """
+        build the (parameter, gradient) key pairs and preallocate the buffers.
+
+        @param parameters: parameters to update, dictionaries
+        """
+        layers = len(parameters) // 2  # number of layers in the neural network
+        self._keys = []
+        for l in range(1, layers + 1):
+            for key in ('W{}'.format(l), 'b{}'.format(l)):
+                self._keys.append((key, 'd' + key))
+        self._scratch = {key: np.zeros_like(parameters[key]) for key, _ in self._keys}
+
+    def reset(self):
+        """
+        drop all states, e.g. after parameters are re-initialized or loaded.
+        """
+        self._keys = None
+        self._scratch = {}
+        self.t = 0
+
+    def _slots(self):
+        """
+        @return: state buffers by slot, e.g. {'v': {'W1': numpy arrays, ...}}, dictionaries
+        """
+        return {}
+
+    def state_dict(self):
+        """
+        copy the state, e.g. for checkpoints.
+
+        @return: name, number of updates, and state arrays keyed '<slot>/<parameter key>', dictionaries
+        """
+        arrays = {}
+        for slot, buffers in self._slots().items():
+            for key, buffer in buffers.items():
+                arrays['{}/{}'.format(slot, key)] = buffer.copy()
+        return {'name': self.name, 't': self.t, 'arrays': arrays}
+
+    def load_state_dict(self, state, parameters):
+        """
+        restore the state copied by state_dict.
+
+        @param state: state from state_dict, dictionaries
+        @param parameters: parameters the state belongs to, dictionaries
+        """
+        if state['name'] != self.name:
+            LOGGER.error('cannot load %s state into %s optimizer', state['name'], self.name)
+            raise ValueError('cannot load {} state into {} optimizer'.format(state['name'], self.name))
+        self._init_state(parameters)
+        for slot, buffers in self._slots().items():
+            for key, buffer in buffers.items():
+                buffer[...] = state['arrays']['{}/{}'.format(slot, key)]
+        self.t = int(state['t'])
+
+    def update(self, parameters, grads, learning_rate):
+        """
+        update parameters in place with gradients.
+
+        @param parameters: parameters to update, dictionaries
+        @param grads: gradients, dictionaries
+        @param learning_rate: hyper-parameter alpha for deep learning, floats
+        """
+        if self._keys is None:
+            self._init_state(parameters)
+        self.t += 1
+
+        for key, grad_key in self._keys:
+            self._update(key, parameters[key], grads[grad_key], learning_rate)
+
+    def _update(self, key, param, grad, learning_rate):
+        """
+        update one parameter in place.
+
+        @param key: parameter key, e.g. 'W1', strings
+        @param param: parameter to update, numpy arrays
+        @param grad: gradient of the parameter, numpy arrays
+        @param learning_rate: hyper-parameter alpha for deep learning, floats
+        """
+        step = np.multiply(grad, learning_rate, out=self._scratch[key])
+        param -= step
+
+
+class Momentum(GradientDescent):
+    """
+    Momentum class updates parameters by gradient decent with momentum.
+    """
+    name = 'momentum'
+
+    def __init__(self, beta=0.9):
+        super().__init__()
+        self.beta = beta
+        self._v = {}
+
+    def _init_state(self, parameters):
+        super()._init_state(parameters)
+        self._v = {key: np.zeros_like(parameters[key]) for key, _ in self._keys}
+
+    def reset(self):
+        super().reset()
+        self._v = {}
+
+    def _slots(self):
+        return {'v': self._v}
+
+    def _update(self, key, param, grad, learning_rate):
+        v, tmp = self._v[key], self._scratch[key]
+
+        # v = beta * v + (1 - beta) * grad
+        v *= self.beta
+        v += np.multiply(grad, 1 - self.beta, out=tmp)
+
+        param -= np.multiply(v, learning_rate, out=tmp)
+
+
+class RMSProp(GradientDescent):
+    """
+    RMSProp class updates parameters by root mean square propagation.
+    """
+    name = 'rmsprop'
+
+    def __init__(self, beta=0.999, epsilon=1e-8):
+        super().__init__()
+        self.beta = beta
+        self.epsilon = epsilon
+        self._s = {}
+
+    def _init_state(self, parameters):
+        super()._init_state(parameters)
+        self._s = {key: np.zeros_like(parameters[key]) for key, _ in self._keys}
+
+    def reset(self):
+        super().reset()
+        self._s = {}
+
+    def _slots(self):
+        return {'s': self._s}
+
+    def _update(self, key, param, grad, learning_rate):
+        s, tmp = self._s[key], self._scratch[key]
+
+        # s = beta * s + (1 - beta) * grad ** 2
+        s *= self.beta
+        np.multiply(grad, grad, out=tmp)
+        tmp *= 1 - self.beta
+        s += tmp
+
+        # param -= learning_rate * grad / (sqrt(s) + epsilon)
+        np.sqrt(s, out=tmp)
+        tmp += self.epsilon
+        np.divide(grad, tmp, out=tmp)
+        tmp *= learning_rate
+        param -= tmp
+
+
+class Adam(GradientDescent):
+    """
+    Adam class updates parameters by adaptive moment estimation.
+    """
+    name = 'adam'
+
+    def __init__(self, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        super().__init__()
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self._lr_t = 0.
+        self._eps_t = epsilon
+        self._v = {}
+        self._s = {}
+
+    def _init_state(self, parameters):
+        super()._init_state(parameters)
+        self._v = {key: np.zeros_like(parameters[key]) for key, _ in self._keys}
+        self._s = {key: np.zeros_like(parameters[key]) for key, _ in self._keys}
+
+    def reset(self):
+        super().reset()
+        self._v = {}
+        self._s = {}
+
+    def _slots(self):
+        return {'v': self._v, 's': self._s}
+
+    def update(self, parameters, grads, learning_rate):
+        # fold the bias corrections of both moments into the step size and epsilon:
+        #   v_hat / (sqrt(s_hat) + eps) == c * v / (sqrt(s) + eps * sqrt(1 - beta2^t))
+        #   with c = sqrt(1 - beta2^t) / (1 - beta1^t)
+        t = self.t + 1
+        correction = np.sqrt(1 - self.beta2 ** t)
+        self._lr_t = learning_rate * correction / (1 - self.beta1 ** t)
+        self._eps_t = self.epsilon * correction
+        super().update(parameters, grads, learning_rate)
+
+    def _update(self, key, param, grad, learning_rate):
+        v, s, tmp = self._v[key], self._s[key], self._scratch[key]
+
+        # v = beta1 * v + (1 - beta1) * grad
+        v *= self.beta1
+        v += np.multiply(grad, 1 - self.beta1, out=tmp)
+
+        # s = beta2 * s + (1 - beta2) * grad ** 2
+        s *= self.beta2
+        np.multiply(grad, grad, out=tmp)
+        tmp *= 1 - self.beta2
+        s += tmp
+
+        # param -= lr_t * v / (sqrt(s) + eps_t)
+        np.sqrt(s, out=tmp)
+        tmp += self._eps_t
+        np.divide(v, tmp, out=tmp)
+        tmp *= self._lr_t
+        param -= tmp
+
+
+OPTIMIZERS = {
+    'gd': GradientDescent,
+    'sgd': GradientDescent,
+    'momentum': Momentum,
+    'rmsprop': RMSProp,
+    'adam': Adam,
+}
+
+
+def get_optimizer(optimizer=None, **kwargs):
+    """
+    get an optimizer by name.
+
+    @param optimizer: name of the optimizer, or an optimizer instance, strings
+    @param kwargs: hyper-parameters of the optimizer, e.g. beta1
+    @return: optimizer instance, GradientDescent
+    """
+    if isinstance(optimizer, GradientDescent):
+        return optimizer
+    name = str(optimizer or 'gd').lower()
+    if name not in OPTIMIZERS:
+        LOGGER.error('unknown optimizer: %s', optimizer)
+        raise ValueError('unknown optimizer: {}'.format(optimizer))
+    return OPTIMIZERS[name](**kwargs)
@@ -0,0 +1,226 @@
+"""
+common.parallel.py
+
+Data-parallel training across CPU cores with gradient averaging.
+
+Worker processes are forked once and share, through shared memory, the
+flat parameter buffer, the current batch, and one gradient row per worker.
+Every step the master copies the batch in, each worker propagates its shard
+of columns with `Network.forward` / `Network.backward`, and the master
+averages the shard gradients (weighted by shard size) in one product before
+`Parameters.update`. Only tiny (m, start, stop, rows) messages go through pipes.
+
+Since every process runs its own BLAS, limit BLAS threads per process
+(e.g. OMP_NUM_THREADS=1) when running as many workers as cores.
+"""
+import multiprocessing
+import os
+import numpy as np
+
+from ml.common.network import Network
+from ml.common.profiler import NO_SPAN, layer_flops
+from ml.common.trainer import Trainer
+from ml.common.workspace import Workspace
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+_CTYPES = {np.dtype(np.float32): 'f', np.dtype(np.float64): 'd'}
+
+
+def _shared_array(ctx, dtype, size):
+    """
+    allocate a zeroed array in shared memory, inherited by forked processes.
+
+    @param ctx: multiprocessing context
+    @param dtype: data type, numpy float32 or float64
+    @param size: number of elements, ints
+    @return: array over the shared memory, numpy arrays (size,)
+    """
+    return np.frombuffer(ctx.RawArray(_CTYPES[np.dtype(dtype)], max(1, size)), dtype=dtype)[:size]
+
+
+def _worker(conn, layer_dims, activations, params, x_buffer, y_buffer, grads, costs, index, use_workspace):
+    """
+    loop of a worker process: propagate shards of the shared batch and write shard gradients.
+
+    messages: (m, start, stop, rows) to compute columns [start, stop) of a batch of m samples
+    with rows of answers (1 for integer labels); None to exit. replies: None on success, or an error message.
+    """
+    network = Network(layer_dims, activations, buffer=params)
+    grad_network = Network(layer_dims, activations, buffer=grads[index])
+    features = layer_dims[0]
+    workspace = None
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        m, start, stop, rows = message
+        try:
+            x = x_buffer[:features * m].reshape(features, m)[:, start:stop]
+            y = y_buffer[:rows * m].reshape(rows, m)[:, start:stop]
+            if use_workspace:
+                if workspace is None:
+                    workspace = Workspace(layer_dims, stop - start, params.dtype)
+                workspace.reserve(stop - start)
+
+            al, caches = network.forward(x, workspace)
+            costs[index] = network.compute_cost(al, y, caches)
+            # regularization is added once by the master, over the whole batch
+            shard_grads = network.backward(al, y, caches, 0., workspace)
+            for layer in grad_network.layers:
+                layer.w[...] = shard_grads['dW' + str(layer.index)]
+                layer.b[...] = shard_grads['db' + str(layer.index)]
+            conn.send(None)
+        except Exception as ex:
+            conn.send('{}: {}'.format(type(ex).__name__, ex))
+    conn.close()
+
+
+class ParallelTrainer(Trainer):
+    """
+    ParallelTrainer class runs every step of a Trainer over shards of the batch in worker processes.
+
+    workers are started on the first step and stopped at the end of train(), or by close().
+    """
+
+    def __init__(self, parameters, num_workers=None, **kwargs):
+        """
+        Constructor of ParallelTrainer
+
+        @param parameters: initialized parameters, ml.common.parameters.Parameters
+        @param num_workers: number of worker processes, None for the number of CPU cores, ints
+        @param kwargs: other arguments of ml.common.trainer.Trainer
+        """
+        super().__init__(parameters, **kwargs)
+        self.num_workers = num_workers or os.cpu_count() or 1
+        if self.num_workers < 1:
+            LOGGER.error('invalid number of workers: %s', num_workers)
+            raise ValueError('number of workers must be positive: {}'.format(num_workers))
+        self._ctx = multiprocessing.get_context('fork')
+        self._workers = []
+        self._network = None
+        self._x, self._y, self._grads, self._costs, self._grad = None, None, None, None, None
+        self._capacity = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        stop the worker processes; they are restarted by the next step.
+        """
+        for process, conn in self._workers:
+            try:
+                conn.send(None)
+                conn.close()
+            except (IOError, OSError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
+        self._capacity = 0
+
+    def train(self, data_source, num_epochs=1):
+        try:
+            return super().train(data_source, num_epochs)
+        finally:
+            self.close()
+
+    def _start(self, batch_size):
+        """
+        allocate shared memory for batches up to batch_size samples, and fork the workers.
+        """
+        self.close()
+        network = self.parameters.get_network(self.activations)
+        layer_dims, activations, dtype = network.layer_dims, network.activations, network.buffer.dtype
+
+        # parameters move into shared memory, where the optimizer keeps updating them in place
+        shared = Network(layer_dims, activations, buffer=_shared_array(self._ctx, dtype, network.buffer.size))
+        shared.buffer[...] = network.buffer
+        self.parameters.set_network(shared)
+        self._network = shared
+
+        size = shared.buffer.size
+        self._x = _shared_array(self._ctx, dtype, layer_dims[0] * batch_size)
+        self._y = _shared_array(self._ctx, dtype, layer_dims[-1] * batch_size)
+        self._grads = _shared_array(self._ctx, dtype, self.num_workers * size).reshape(self.num_workers, size)
+        self._costs = _shared_array(self._ctx, np.float64, self.num_workers)
+        self._grad = Network(layer_dims, activations, buffer=np.empty(size, dtype=dtype))
+        self._capacity = batch_size
+
+        for index in range(self.num_workers):
+            conn, child_conn = self._ctx.Pipe()
+            process = self._ctx.Process(
+                target=_worker, name='trainer-{}'.format(index), daemon=True,
+                args=(child_conn, layer_dims, activations, shared.buffer, self._x, self._y,
+                      self._grads, self._costs, index, self.use_workspace))
+            process.start()
+            child_conn.close()
+            self._workers.append((process, conn))
+        LOGGER.info('started %s training workers for batches of %s samples', self.num_workers, batch_size)
+
+    def _propagation_flops(self, m):
+        """
+        @return: estimated floating point operations of forward and backward propagation of m samples, ints
+        """
+        dims = self._network.layer_dims
+        return sum(layer_flops(phase, dims[l], dims[l - 1], m)
+                   for l in range(1, len(dims)) for phase in ('forward', 'backward'))
+
+    def step(self, x, y):
+        """
+        one step of gradient decent on a mini-batch, sharded across the workers.
+
+        @param x: input X of the mini-batch, numpy arrays
+        @param y: actual answers Y of the mini-batch, numpy arrays
+        @return: cost of the mini-batch before the update, floats
+        """
+        m = x.shape[1]
+        params = self.parameters.get()
+        if m > self._capacity or self._network is None or params.get('W1') is not self._network.layers[0].w:
+            # first step, a larger batch, or parameters replaced (e.g. restored from a checkpoint)
+            self._start(max(m, self._capacity))
+
+        features = self._network.layer_dims[0]
+        rows = np.size(y) // m  # 1 for integer labels
+        self._x[:features * m].reshape(features, m)[...] = x
+        self._y[:rows * m].reshape(rows, m)[...] = np.reshape(y, (rows, m))
+
+        bounds = np.linspace(0, m, min(self.num_workers, m) + 1).astype(int)
+        shards = list(zip(bounds[:-1], bounds[1:]))
+        profiler = self.profiler
+        # layers propagate in the workers, so the profiler records them as one span
+        with NO_SPAN if profiler is None else profiler.span('workers', flops=self._propagation_flops(m)):
+            for (process, conn), (start, stop) in zip(self._workers, shards):
+                conn.send((m, int(start), int(stop), rows))
+            errors = [conn.recv() for (_, conn), _ in zip(self._workers, shards)]
+        errors = [error for error in errors if error]
+        if errors:
+            LOGGER.error('training workers failed: %s', errors)
+            raise RuntimeError('training workers failed: {}'.format(errors))
+
+        # average of shard gradients weighted by shard sizes, plus L2 regularization of the whole batch
+        k = len(shards)
+        shares = (bounds[1:] - bounds[:-1]) / m
+        grad = self._grad.buffer
+        np.dot(shares.astype(grad.dtype), self._grads[:k], out=grad)
+        weights = self._network.weights
+        grad[:weights.size] += (self.lambd / m) * weights
+        cost = float(np.dot(shares, self._costs[:k]))
+        cost += (self.lambd / (2 * m)) * self._network.l2_square_sum()
+
+        grads = {}
+        for layer in self._grad.layers:
+            grads['dW' + str(layer.index)] = layer.w
+            grads['db' + str(layer.index)] = layer.b
+        with NO_SPAN if profiler is None else profiler.span('update', flops=self._update_flops(self._network)):
+            self.parameters.update(grads, self.learning_rate)
+        self.iteration += 1
+
+        return cost
@@ -0,0 +1,143 @@
+"""
+common.param_file.py
+
+Versioned, non-pickle parameter file format that can be memory-mapped.
+
+layout:
+    MAGIC (8 bytes) | header length (uint32, little endian) | JSON header | padding | flat buffer
+
+the JSON header records the format version, layer dims, activations, the
+data type and the offset of the flat buffer, which holds all Ws then all bs
+in the layout of ml.common.network.Network and is aligned to ALIGNMENT bytes.
+"""
+import contextlib
+import json
+import os
+import struct
+import tempfile
+import numpy as np
+
+from ml.common.network import Network
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+MAGIC = b'\x93PYMLPRM'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<8sI')
+
+
+def is_param_file(file_path):
+    """
+    check whether a file is in the parameter file format.
+
+    @param file_path: path of the file, strings
+    @return: True if the file starts with the format magic, booleans
+    """
+    try:
+        with open(file_path, 'rb') as param_file:
+            return param_file.read(len(MAGIC)) == MAGIC
+    except (IOError, OSError):
+        return False
+
+
+@contextlib.contextmanager
+def atomic_write(file_path, suffix=''):
+    """
+    write a file atomically: a reader sees either the old or the new file, never a partial one.
+
+    the file is written aside in the same folder, synced to disk, and renamed over file_path;
+    on an error, the temporary file is removed and file_path is left as it was.
+
+    @param file_path: path of the file, strings
+    @param suffix: suffix of the temporary file, strings
+    @return: context manager of the temporary file, opened for binary writing
+    """
+    folder, name = os.path.split(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + name, suffix=suffix, dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            yield temp_file
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def save_network(file_path, network):
+    """
+    save the weights of a network atomically: a reader sees either the old or the new file.
+
+    @param file_path: path of the file, strings
+    @param network: network to save, ml.common.network.Network
+    """
+    buffer = network.buffer
+    dtype = buffer.dtype.newbyteorder('<')
+    header = {
+        'format_version': FORMAT_VERSION,
+        'layer_dims': network.layer_dims,
+        'activations': network.activations,
+        'dtype': dtype.str,
+        'size': int(buffer.size),
+        'offset': 0,
+    }
+    while True:
+        header_bytes = json.dumps(header).encode('utf-8')
+        offset = -(-(_PREFIX.size + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+        if header['offset'] == offset:
+            break
+        header['offset'] = offset
+    header_bytes += b' ' * (offset - _PREFIX.size - len(header_bytes))
+
+    with atomic_write(file_path) as param_file:
+        param_file.write(_PREFIX.pack(MAGIC, len(header_bytes)))
+        param_file.write(header_bytes)
+        param_file.write(np.ascontiguousarray(buffer, dtype=dtype).tobytes())
+
+
+def read_header(file_path):
+    """
+    read the header of a parameter file.
+
+    @param file_path: path of the file, strings
+    @return: header, dictionaries
+    """
+    with open(file_path, 'rb') as param_file:
+        magic, length = _PREFIX.unpack(param_file.read(_PREFIX.size))
+        if magic != MAGIC:
+            LOGGER.error('not a parameter file: %s', file_path)
+            raise ValueError('not a parameter file: {}'.format(file_path))
+        header = json.loads(param_file.read(length).decode('utf-8'))
+
+    if header.get('format_version', 0) > FORMAT_VERSION:
+        LOGGER.error('unsupported format version %s: %s', header.get('format_version'), file_path)
+        raise ValueError('unsupported format version {}: {}'.format(header.get('format_version'), file_path))
+    return header
+
+
+def load_network(file_path, mmap_mode=None):
+    """
+    load a network from a parameter file.
+
+    @param file_path: path of the file, strings
+    @param mmap_mode: None to read into memory; 'r' (read-only) or 'c' (copy-on-write) to map it, strings
+    @return: network over the flat buffer of the file, ml.common.network.Network
+    """
+    header = read_header(file_path)
+    dtype, size, offset = np.dtype(header['dtype']), header['size'], header['offset']
+    if os.path.getsize(file_path) < offset + size * dtype.itemsize:
+        LOGGER.error('truncated parameter file: %s', file_path)
+        raise ValueError('truncated parameter file: {}'.format(file_path))
+
+    if mmap_mode:
+        buffer = np.memmap(file_path, dtype=dtype, mode=mmap_mode, offset=offset, shape=(size,))
+    else:
+        with open(file_path, 'rb') as param_file:
+            param_file.seek(offset)
+            buffer = np.fromfile(param_file, dtype=dtype, count=size)
+        buffer = buffer.astype(dtype.newbyteorder('='), copy=False)
+
+    return Network(header['layer_dims'], header['activations'], buffer=buffer)
@@ -5,10 +5,16 @@
 import numpy as np
 import os
 
+from ml.common.network import Network
+from ml.common.optimizers import get_optimizer
+from ml.common.param_file import is_param_file, load_network, save_network
+from ml.common.precision import as_dtype, get_dtype
 from ml.utils.logger import get_logger
 
 LOGGER = get_logger(__name__)
 PWD = os.path.dirname(os.path.realpath(__file__))
+PARAM_FILE = 'saved_parameters.params'
+LEGACY_PARAM_FILE = 'saved_parameters.npy'  # pickled dict, by np.save
 
 
 class Parameters:
@@ -16,52 +22,93 @@ class Parameters:
     DataSvcAbstract class provides abstract interfaces to any data service.
     """
 
-    def __init__(self, base_path=PWD, file_name="saved_parameters.npy"):
+    def __init__(self, base_path=PWD, file_name=PARAM_FILE, optimizer=None):
         self.base_path = base_path if os.path.isdir(base_path) else PWD
         self._param_file = os.path.join(self.base_path, 'datasets', file_name)
         self._parameters = None
+        self._network = None
+        self.optimizer = get_optimizer(optimizer)
 
-    def load(self):
+    @property
+    def param_file(self):
         """
-        load parameters saved from datasets. file name: saved_parameters.npy
+        @return: path of the file loaded by load(), the legacy file if the default one does not exist, strings
+        """
+        param_file = self._param_file
+        if os.path.basename(param_file) == PARAM_FILE and not os.path.exists(param_file):
+            param_file = os.path.join(os.path.dirname(param_file), LEGACY_PARAM_FILE)
+        return param_file
+
+    def load(self, dtype=None, mmap_mode=None):
+        """
+        load parameters saved from datasets. file name: saved_parameters.params
+
+        the format is detected: the parameter file format (ml.common.param_file),
+        or the legacy pickled saved_parameters.npy, which is also loaded when the
+        default file does not exist.
+
+        @param dtype: data type to cast parameters to, None to keep the saved data type
+        @param mmap_mode: 'r' (read-only) or 'c' (copy-on-write) to map a file in the parameter file format,
+                          None to read it into memory, strings
         @return: loaded parameters
         """
-        LOGGER.info('loading saved parameters: {}'.format(self._param_file))
-        self._parameters = np.load(self._param_file).item()
+        param_file = self.param_file
+        LOGGER.info('loading saved parameters: {}'.format(param_file))
+        if is_param_file(param_file):
+            self._network = load_network(param_file, mmap_mode)
+            self._parameters = self._network.to_parameters()
+        else:
+            self._parameters = np.load(param_file, allow_pickle=True).item()
+            self._network = None
+
+        if dtype is not None and self._parameters['W1'].dtype != dtype:
+            if self._network is None:
+                self._parameters = as_dtype(self._parameters, dtype)
+            else:
+                # keep the activations saved in the file, e.g. a softmax output layer
+                network = self._network
+                self._network = Network(network.layer_dims, network.activations, buffer=network.buffer.astype(dtype))
+                self._parameters = self._network.to_parameters()
+        self.optimizer.reset()
         return self._parameters
 
-    def save(self):
+    def save(self, dtype=None):
         """
-        save parameters from calculation to saved_parameters.npy
-        @param parameters: parameters from calfculation, dictionaries
+        save parameters from calculation to saved_parameters.params, atomically.
+        @param dtype: data type to save parameters in, None to keep the current data type
         """
         LOGGER.info('saving parameters: {} ...'.format(self._param_file))
-        np.save(self._param_file, self._parameters, allow_pickle=True, fix_imports=True)
+        network = self.get_network()
+        if dtype is not None and network.buffer.dtype != dtype:
+            network = Network(network.layer_dims, network.activations, buffer=network.buffer.astype(dtype))
+        save_network(self._param_file, network)
 
     def update(self, grads, learning_rate):
         """
-        update parameters with gradients.
+        update parameters in place with gradients, by the optimizer.
 
         @param grads: gradients, dictionaries
         @param learning_rate: hyper-parameter alpha for deep learning, floats
         """
+        self.optimizer.update(self._parameters, grads, learning_rate)
 
-        L = len(self._parameters) // 2  # number of layers in the neural network
+    def set_optimizer(self, optimizer):
+        """
+        set the optimizer to update parameters, e.g. 'adam'.
 
-        # Update rule for each parameter. Use a for loop.
-        for l in range(L):
-            self._parameters["W" + str(l + 1)] = \
-                self._parameters["W" + str(l + 1)] - learning_rate * grads["dW" + str(l + 1)]
-            self._parameters["b" + str(l + 1)] = \
-                self._parameters["b" + str(l + 1)] - learning_rate * grads["db" + str(l + 1)]
+        @param optimizer: name of the optimizer, or an optimizer instance
+        """
+        self.optimizer = get_optimizer(optimizer)
 
-    def initialize_parameters_deep_he(self, layer_dims):
+    def initialize_parameters_deep_he(self, layer_dims, dtype=None):
         """
         initialization for deep learning with HE random algorithm to prevent fading & exploding gradients.
 
         @param layer_dims: dimensions of layers, lists
+        @param dtype: data type of parameters, None for the training default
         @return: initialized parameters
         """
+        dtype = get_dtype(dtype)
 
         np.random.seed(1)
         parameters = {}
@@ -69,15 +116,17 @@ def initialize_parameters_deep_he(self, layer_dims):
 
         for l in range(1, l):
             # initialized W with random and HE term
-            parameters['W' + str(l)] = np.random.randn(layer_dims[l], layer_dims[l - 1]) * np.sqrt(
-                2 / layer_dims[l - 1])
+            parameters['W' + str(l)] = (np.random.randn(layer_dims[l], layer_dims[l - 1]) * np.sqrt(
+                2 / layer_dims[l - 1])).astype(dtype, copy=False)
 
-            parameters['b' + str(l)] = np.zeros((layer_dims[l], 1))
+            parameters['b' + str(l)] = np.zeros((layer_dims[l], 1), dtype=dtype)
 
             assert (parameters['W' + str(l)].shape == (layer_dims[l], layer_dims[l - 1]))
             assert (parameters['b' + str(l)].shape == (layer_dims[l], 1))
 
         self._parameters = parameters
+        self._network = None
+        self.optimizer.reset()
 
     def get(self):
         """
@@ -85,3 +134,35 @@ def get(self):
         @return: _parameters
         """
         return self._parameters
+
+    def set(self, parameters):
+        """
+        set the parameters, e.g. restored from a checkpoint; the optimizer state is kept.
+        @param parameters: parameters keyed 'W1', 'b1', ..., dictionaries
+        """
+        self._parameters = parameters
+        self._network = None
+
+    def set_network(self, network):
+        """
+        set the parameters as views into a network, e.g. over shared memory; the optimizer state is kept.
+        @param network: network, ml.common.network.Network
+        """
+        self._parameters = network.to_parameters()
+        self._network = network
+
+    def get_network(self, activations=None):
+        """
+        get the parameters compiled into a network with contiguous storage.
+        the parameters then become views into the network, so both stay in sync.
+
+        @param activations: activation names of layers 1..L, None for the default, lists
+        @return: compiled network, ml.common.network.Network
+        """
+        network = self._network
+        stale = network is None or network.layers[0].w is not self._parameters.get('W1')
+        if stale or (activations and list(activations) != network.activations):
+            network = Network.from_parameters(self._parameters, activations)
+            self._parameters = network.to_parameters()
+            self._network = network
+        return network
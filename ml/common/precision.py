@@ -0,0 +1,55 @@
+"""
+common.precision.py
+
+Data type (precision) policy for training and inference.
+
+Inference defaults to float32, which halves memory traffic and speeds up BLAS
+calls with no loss of accuracy for these models; training defaults to float64.
+Both can be changed in config.yaml (`precision.training`, `precision.inference`)
+or by environment variables PRECISION_TRAINING and PRECISION_INFERENCE.
+"""
+import numpy as np
+
+from ml.config import settings
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+TRAINING_DTYPE = np.dtype(settings('precision.training', 'float64') or 'float64')
+INFERENCE_DTYPE = np.dtype(settings('precision.inference', 'float32') or 'float32')
+
+
+def get_dtype(dtype=None, inference=False):
+    """
+    get the data type by the precision policy.
+
+    @param dtype: requested data type, None for the policy default, strings or numpy dtypes
+    @param inference: whether the default is for inference rather than training, booleans
+    @return: data type, numpy dtypes
+    """
+    if dtype is None:
+        return INFERENCE_DTYPE if inference else TRAINING_DTYPE
+    return np.dtype(dtype)
+
+
+def as_dtype(parameters, dtype):
+    """
+    cast parameters to a data type; arrays already of the data type are not copied.
+
+    @param parameters: parameters keyed 'W1', 'b1', ..., dictionaries
+    @param dtype: data type, strings or numpy dtypes
+    @return: parameters of the data type, dictionaries
+    """
+    return {key: np.asarray(val, dtype=dtype) for key, val in parameters.items()}
+
+
+def standardize(x, scale=255., dtype=None):
+    """
+    scale input x (e.g. pixels) into [0, 1], computing directly in the target data type.
+
+    @param x: input X, numpy arrays
+    @param scale: maximum value of x, floats
+    @param dtype: data type of the result, None for the training default
+    @return: standardized x, numpy arrays
+    """
+    return np.divide(x, scale, dtype=get_dtype(dtype))
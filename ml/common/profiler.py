@@ -0,0 +1,213 @@
+"""
+common.profiler.py
+
+Per-layer timing instrumentation of training.
+
+A Profiler passed to Trainer (or to Network.forward / Network.backward)
+records a span around the forward and the backward propagation of every
+layer, the cost, and the parameter update. Spans accumulate calls, seconds,
+estimated FLOPs and, with track_memory, the net bytes allocated (still held
+at the end of the span) as traced by tracemalloc. Every span is passed to the callbacks of the profiler, and kept
+as an event to export as a Chrome trace (chrome://tracing or ui.perfetto.dev).
+
+Without a profiler, propagation runs through NO_SPAN, a shared no-op context.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+NO_SPAN = contextlib.nullcontext()
+
+# estimated floating point operations per parameter of an update, by optimizer
+UPDATE_FLOPS = {'gd': 2, 'momentum': 5, 'rmsprop': 8, 'adam': 13}
+
+
+def layer_flops(phase, n, n_prev, m):
+    """
+    estimate floating point operations of a layer, counting a multiply-add as 2.
+
+    @param phase: 'forward' (Z = W·A_prev + b, A = g(Z)), or 'backward' (dZ, dW, db, dA_prev), strings
+    @param n: number of units of the layer, ints
+    @param n_prev: number of units of the previous layer, ints
+    @param m: number of samples, ints
+    @return: number of operations, ints
+    """
+    if phase == 'forward':
+        return 2 * n * n_prev * m + 2 * n * m
+    if phase == 'backward':
+        return 4 * n * n_prev * m + 3 * n * m
+    return 0
+
+
+class Profiler:
+    """
+    Profiler class collects timings, FLOP estimates and bytes allocated by training spans.
+
+    spans are recorded by the thread that created the profiler; the trainer
+    does not nest them, so bytes allocated by a span are not counted twice.
+    """
+
+    def __init__(self, callbacks=None, track_memory=False, max_events=100000):
+        """
+        Constructor of Profiler
+
+        @param callbacks: functions called with every span, as a dictionary of
+                          name, phase, layer, start, seconds, flops and alloc_bytes, lists
+        @param track_memory: whether trace net bytes allocated by spans with tracemalloc, slowing
+                             every allocation down while profiling, booleans
+        @param max_events: number of spans kept for the trace; totals keep counting after it, ints
+        """
+        self.callbacks = list(callbacks or [])
+        self.track_memory = track_memory
+        self.max_events = max_events
+        self.events = []
+        self.totals = {}
+        self.dropped_events = 0
+        self._origin = time.perf_counter()
+        self._thread = threading.get_ident()
+        self._tracing = False
+
+    def reset(self):
+        """
+        clear recorded spans and totals.
+        """
+        self.events = []
+        self.totals = {}
+        self.dropped_events = 0
+        self._origin = time.perf_counter()
+
+    def close(self):
+        """
+        stop tracing memory, if started by this profiler.
+        """
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def layer_span(self, phase, layer, m):
+        """
+        span of the forward or backward propagation of a layer.
+
+        @param phase: 'forward' or 'backward', strings
+        @param layer: layer, ml.common.network.Layer
+        @param m: number of samples, ints
+        @return: context manager recording the span
+        """
+        n, n_prev = layer.w.shape
+        return self.span(phase, layer.index, layer_flops(phase, n, n_prev, m))
+
+    @contextlib.contextmanager
+    def span(self, phase, layer=None, flops=0):
+        """
+        record a span of work.
+
+        @param phase: kind of work, e.g. 'forward', 'backward', 'cost' or 'update', strings
+        @param layer: 1-based index of the layer, None for work on the whole network, ints
+        @param flops: estimated floating point operations of the span, ints
+        @return: context manager recording the span
+        """
+        if self.track_memory and not self._tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        tracing = self.track_memory and tracemalloc.is_tracing()
+        # difference of traced memory between entry and exit: bytes allocated and not freed by the span
+        base = tracemalloc.get_traced_memory()[0] if tracing else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            alloc_bytes = max(0, tracemalloc.get_traced_memory()[0] - base) if tracing else 0
+            self._record(phase, layer, start - self._origin, seconds, flops, alloc_bytes)
+
+    def _record(self, phase, layer, start, seconds, flops, alloc_bytes):
+        name = phase if layer is None else 'L{} {}'.format(layer, phase)
+        total = self.totals.get(name)
+        if total is None:
+            total = self.totals[name] = {
+                'phase': phase, 'layer': layer, 'calls': 0, 'seconds': 0., 'flops': 0, 'alloc_bytes': 0}
+        total['calls'] += 1
+        total['seconds'] += seconds
+        total['flops'] += flops
+        total['alloc_bytes'] += alloc_bytes
+
+        event = {
+            'name': name, 'phase': phase, 'layer': layer, 'start': start, 'seconds': seconds,
+            'flops': flops, 'alloc_bytes': alloc_bytes}
+        if len(self.events) < self.max_events:
+            self.events.append(event)
+        else:
+            self.dropped_events += 1
+        for callback in self.callbacks:
+            callback(event)
+
+    def summary(self):
+        """
+        cumulative metrics of spans, in the order first recorded.
+
+        @return: metrics with name, phase, layer, calls, seconds, share of all seconds,
+                 flops, gflops_per_sec and alloc_bytes, lists of dictionaries
+        """
+        all_seconds = sum(total['seconds'] for total in self.totals.values()) or 1.
+        metrics = []
+        for name, total in self.totals.items():
+            seconds = total['seconds']
+            metrics.append(dict(
+                total, name=name, share=seconds / all_seconds,
+                gflops_per_sec=total['flops'] / seconds / 1e9 if seconds else 0.))
+        return metrics
+
+    def format_summary(self):
+        """
+        format cumulative metrics as a text table.
+
+        @return: table, strings
+        """
+        lines = ['{:<14} {:>8} {:>12} {:>7} {:>10} {:>14}'.format(
+            'span', 'calls', 'ms', 'share', 'GFLOP/s', 'net alloc KiB')]
+        for metric in self.summary():
+            lines.append('{:<14} {:>8} {:>12.3f} {:>7.1%} {:>10.2f} {:>14.1f}'.format(
+                metric['name'], metric['calls'], metric['seconds'] * 1000, metric['share'],
+                metric['gflops_per_sec'], metric['alloc_bytes'] / 1024.))
+        return '\n'.join(lines)
+
+    def save_metrics(self, file_path):
+        """
+        save cumulative metrics as JSON.
+
+        @param file_path: path of the JSON file, strings
+        """
+        with open(file_path, 'w') as json_file:
+            json.dump({'spans': self.summary(), 'dropped_events': self.dropped_events}, json_file, indent=2)
+        LOGGER.info('saved profiling metrics: %s', file_path)
+
+    def chrome_trace(self):
+        """
+        recorded spans in the Chrome trace event format, as complete ('X') events in microseconds.
+
+        @return: trace, dictionaries
+        """
+        pid = os.getpid()
+        trace_events = [{
+            'name': event['name'], 'cat': event['phase'], 'ph': 'X', 'pid': pid, 'tid': self._thread,
+            'ts': event['start'] * 1e6, 'dur': event['seconds'] * 1e6,
+            'args': {'flops': event['flops'], 'alloc_bytes': event['alloc_bytes']},
+        } for event in self.events]
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, file_path):
+        """
+        save recorded spans as a Chrome trace file.
+
+        @param file_path: path of the JSON file, strings
+        """
+        with open(file_path, 'w') as json_file:
+            json.dump(self.chrome_trace(), json_file)
+        LOGGER.info('saved chrome trace of %s spans: %s', len(self.events), file_path)
@@ -0,0 +1,221 @@
+"""
+common.quantization.py
+
+Post-training int8 quantization of weights, as a storage format: saved
+models take a quarter of the float32 size, to ship and keep on disk.
+
+Every row of W (the weights of one unit) is scaled by its own maximum
+magnitude into [-127, 127] and kept as int8. A quantized model is widened
+back to float32 (int8 W times the row scales) by dequantize() when loaded,
+so inference runs on float32 weights, with the memory and the speed of a
+float32 model and the accuracy of the int8 weights, which is checked
+before saving. NumPy has no int8 matrix product, and widening blocks of
+int8 weights inside the product measured slower than float32.
+
+Quantized models are saved as non-pickle .npz files, next to the float model.
+"""
+import json
+import numpy as np
+
+from ml.common.evaluation import Evaluation
+from ml.common.network import Network
+from ml.common.param_file import atomic_write
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+QUANTIZED_FORMAT = 'int8-per-row'
+INT8_MAX = 127
+
+
+def quantize_rows(w):
+    """
+    quantize a matrix to int8 with one scale per row.
+
+    @param w: parameter W, numpy arrays (n, n_prev)
+    @return: int8 W, numpy arrays (n, n_prev); and float32 scales, numpy arrays (n, 1)
+    """
+    w = np.asarray(w, dtype=np.float32)
+    scale = np.max(np.abs(w), axis=1, keepdims=True) / INT8_MAX
+    scale[scale == 0] = 1.  # rows of zeros
+    q = np.rint(w / scale)
+    np.clip(q, -INT8_MAX, INT8_MAX, out=q)
+    return q.astype(np.int8), scale.astype(np.float32)
+
+
+class QuantizedLayer:
+    """
+    QuantizedLayer class is one [LINEAR -> ACTIVATION] step with int8 weights.
+    """
+    __slots__ = ('index', 'q', 'scale', 'b', 'activation')
+
+    def __init__(self, index, q, scale, b, activation):
+        """
+        Constructor of QuantizedLayer
+
+        @param index: 1-based index of the layer in the network, ints
+        @param q: int8 W, numpy arrays (n, n_prev)
+        @param scale: scales of rows of W, numpy arrays (n, 1)
+        @param b: parameter b, numpy arrays (n, 1)
+        @param activation: activation name, e.g. 'leaky_relu', strings
+        """
+        self.index = index
+        self.q = q
+        self.scale = scale
+        self.b = b
+        self.activation = activation
+
+
+class QuantizedNetwork:
+    """
+    QuantizedNetwork class keeps int8 weights of a network, to save and to dequantize for inference.
+    """
+
+    def __init__(self, layers):
+        """
+        Constructor of QuantizedNetwork
+
+        @param layers: quantized layers 1..L, lists of QuantizedLayer
+        """
+        self.layers = list(layers)
+        self.layer_dims = [self.layers[0].q.shape[1]] + [layer.q.shape[0] for layer in self.layers]
+        self.activations = [layer.activation for layer in self.layers]
+
+    @classmethod
+    def from_network(cls, network):
+        """
+        quantize the weights of a network.
+
+        @param network: float network, ml.common.network.Network
+        @return: quantized network, QuantizedNetwork
+        """
+        layers = []
+        for layer in network.layers:
+            q, scale = quantize_rows(layer.w)
+            layers.append(QuantizedLayer(layer.index, q, scale, layer.b.astype(np.float32), layer.activation))
+        return cls(layers)
+
+    @classmethod
+    def from_parameters(cls, parameters, activations=None):
+        """
+        quantize parameters in dict format.
+
+        @param parameters: parameters keyed 'W1', 'b1', ..., dictionaries
+        @param activations: activation names of layers 1..L, None for the default of Network, lists
+        @return: quantized network, QuantizedNetwork
+        """
+        return cls.from_network(Network.from_parameters(parameters, activations))
+
+    @property
+    def nbytes(self):
+        """
+        @return: bytes of int8 weights, scales and biases, as saved, ints
+        """
+        return sum(layer.q.nbytes + layer.scale.nbytes + layer.b.nbytes for layer in self.layers)
+
+    def dequantize(self):
+        """
+        widen the int8 weights times the row scales, e.g. to predict with the quantized weights.
+
+        @return: float32 network with the quantized weights, ml.common.network.Network
+        """
+        network = Network(self.layer_dims, self.activations, dtype=np.float32)
+        for layer, quantized in zip(network.layers, self.layers):
+            np.multiply(quantized.q, quantized.scale, out=layer.w)
+            layer.b[...] = quantized.b
+        return network
+
+
+def save_quantized(file_path, network):
+    """
+    save a quantized network atomically, as a non-pickle .npz file.
+
+    @param file_path: path of the file, strings
+    @param network: quantized network, QuantizedNetwork
+    """
+    meta = {'format': QUANTIZED_FORMAT, 'layer_dims': network.layer_dims, 'activations': network.activations}
+    arrays = {'meta': np.array(json.dumps(meta))}
+    for layer in network.layers:
+        arrays['Q' + str(layer.index)] = layer.q
+        arrays['scale' + str(layer.index)] = layer.scale
+        arrays['b' + str(layer.index)] = layer.b
+
+    with atomic_write(file_path, suffix='.npz') as quantized_file:
+        np.savez(quantized_file, **arrays)
+    LOGGER.info('saved quantized parameters: %s', file_path)
+
+
+def load_quantized(file_path):
+    """
+    load a quantized network.
+
+    @param file_path: path of the file, strings
+    @return: quantized network, QuantizedNetwork
+    """
+    with np.load(file_path) as data:
+        meta = json.loads(str(data['meta']))
+        if meta.get('format') != QUANTIZED_FORMAT:
+            LOGGER.error('unsupported quantization format %s: %s', meta.get('format'), file_path)
+            raise ValueError('unsupported quantization format {}: {}'.format(meta.get('format'), file_path))
+        layers = [
+            QuantizedLayer(l, data['Q' + str(l)], data['scale' + str(l)], data['b' + str(l)], activation)
+            for l, activation in enumerate(meta['activations'], 1)]
+    return QuantizedNetwork(layers)
+
+
+def compare_accuracy(network, quantized, x, y, batch_size=4096):
+    """
+    compare accuracy of a float network and its quantized network, in chunks of batch_size.
+
+    @param network: float network, ml.common.network.Network
+    @param quantized: quantized network, QuantizedNetwork
+    @param x: input X, numpy arrays (features, m)
+    @param y: integer labels (1, m), or one-hot answers (classes, m), numpy arrays
+    @param batch_size: number of samples per forward propagation, ints
+    @return: float and int8 accuracy, the drop of accuracy, and the fraction of
+             samples predicted the same by both networks, dictionaries
+    """
+    num_classes = max(2, network.layer_dims[-1])
+    float_metrics, int8_metrics = Evaluation(num_classes), Evaluation(num_classes)
+    dequantized = quantized.dequantize()
+    y = np.asarray(y)
+    y = y.reshape(1, -1) if y.ndim == 1 else y
+    m, agreed = x.shape[1], 0
+    for start in range(0, m, batch_size):
+        x_batch, y_batch = x[:, start:start + batch_size], y[:, start:start + batch_size]
+        al_float = network.predict(np.asarray(x_batch, dtype=network.dtype))
+        al_int8 = dequantized.predict(np.asarray(x_batch, dtype=dequantized.dtype))
+        float_metrics.update(al_float, y_batch)
+        int8_metrics.update(al_int8, y_batch)
+        if al_float.shape[0] == 1:
+            agreed += int(np.count_nonzero((al_float > 0.5) == (al_int8 > 0.5)))
+        else:
+            agreed += int(np.count_nonzero(np.argmax(al_float, axis=0) == np.argmax(al_int8, axis=0)))
+
+    return {
+        'float_accuracy': float_metrics.accuracy(),
+        'int8_accuracy': int8_metrics.accuracy(),
+        'accuracy_drop': float_metrics.accuracy() - int8_metrics.accuracy(),
+        'agreement': agreed / m if m else 0.,
+    }
+
+
+def check_accuracy(network, quantized, x, y, max_drop=0.01, batch_size=4096):
+    """
+    fail when quantization loses more than max_drop of accuracy on held-out data.
+
+    @param network: float network, ml.common.network.Network
+    @param quantized: quantized network, QuantizedNetwork
+    @param x: held-out input X, numpy arrays (features, m)
+    @param y: held-out integer labels (1, m), or one-hot answers (classes, m), numpy arrays
+    @param max_drop: maximum allowed drop of accuracy, floats
+    @param batch_size: number of samples per forward propagation, ints
+    @return: comparison of compare_accuracy, dictionaries
+    """
+    comparison = compare_accuracy(network, quantized, x, y, batch_size)
+    if comparison['accuracy_drop'] > max_drop:
+        LOGGER.error('quantization dropped accuracy from %.4f to %.4f',
+                     comparison['float_accuracy'], comparison['int8_accuracy'])
+        raise ValueError('quantization dropped accuracy by {:.4f}, more than {:.4f}'.format(
+            comparison['accuracy_drop'], max_drop))
+    return comparison
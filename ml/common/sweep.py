@@ -0,0 +1,186 @@
+"""
+common.sweep.py
+
+Hyperparameter sweeps: grid or random search spaces, trials in a process
+pool, successive halving of bad trials, and a results table.
+
+An objective is a module-level function objective(config, budget) returning
+a score to minimize, e.g. the error rate on a dev set after training `budget`
+epochs. Data sets loaded by `prepare` in the sweep process before the pool
+forks (e.g. memory-mapped by DataSvcAbstract.load_cached_dataset) are shared
+by all trial processes instead of being loaded once per trial.
+"""
+import concurrent.futures
+import csv
+import itertools
+import math
+import multiprocessing
+import time
+import numpy as np
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+def uniform(low, high, log=False):
+    """
+    a sampler of random search drawing floats from [low, high).
+
+    @param low: lower bound, floats
+    @param high: upper bound, floats
+    @param log: whether draw uniformly in log scale, e.g. for learning rates, booleans
+    @return: sampler, callable(rng) returning floats
+    """
+    if log:
+        return lambda rng: float(math.exp(rng.uniform(math.log(low), math.log(high))))
+    return lambda rng: float(rng.uniform(low, high))
+
+
+def grid_search(space):
+    """
+    all combinations of a search space.
+
+    @param space: {name: list of values}, dictionaries
+    @return: configs, lists of dictionaries
+    """
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*[space[name] for name in names])]
+
+
+def random_search(space, num_trials, seed=None):
+    """
+    random configs of a search space.
+
+    @param space: {name: list of values to choose from, or sampler from uniform()}, dictionaries
+    @param num_trials: number of configs, ints
+    @param seed: seed of the random state, ints
+    @return: configs, lists of dictionaries
+    """
+    rng = np.random.RandomState(seed)
+    configs = []
+    for _ in range(num_trials):
+        config = {}
+        for name in sorted(space):
+            values = space[name]
+            config[name] = values(rng) if callable(values) else values[rng.randint(len(values))]
+        configs.append(config)
+    return configs
+
+
+def run_trial(objective, config, budget):
+    """
+    run one trial; a failing trial gets an infinite score instead of stopping the sweep.
+
+    @param objective: objective(config, budget) returning a score to minimize
+    @param config: hyperparameters, dictionaries
+    @param budget: training budget, e.g. epochs, ints
+    @return: score, floats; seconds, floats; and error message, strings
+    """
+    start = time.time()
+    try:
+        return float(objective(config, budget)), time.time() - start, ''
+    except Exception as ex:
+        LOGGER.error('trial %s failed: %s', config, ex)
+        return float('inf'), time.time() - start, '{}: {}'.format(type(ex).__name__, ex)
+
+
+class Sweep:
+    """
+    Sweep class runs trials of configs and stops bad ones by successive halving.
+
+    every rung runs the surviving configs with the budget of the rung, keeps
+    the best 1/eta of them, and multiplies the budget by eta, until max_budget
+    or one config is left. Trials of a rung train from scratch with the larger budget.
+    """
+
+    def __init__(self, objective, configs, max_budget, min_budget=None, eta=3, max_workers=None, prepare=None):
+        """
+        Constructor of Sweep
+
+        @param objective: module-level objective(config, budget) returning a score to minimize
+        @param configs: configs to try, e.g. from grid_search or random_search, lists of dictionaries
+        @param max_budget: budget of the last rung, e.g. epochs, ints
+        @param min_budget: budget of the first rung, None for no successive halving, ints
+        @param eta: reduction factor of configs and growth factor of budgets between rungs, ints
+        @param max_workers: number of trial processes, None for all CPU cores, 0 to run in this process, ints
+        @param prepare: function run in this process before forking trials, e.g. loading data sets
+        """
+        if eta < 2:
+            LOGGER.error('invalid eta: %s', eta)
+            raise ValueError('eta must be at least 2: {}'.format(eta))
+        self.objective = objective
+        self.configs = list(configs)
+        self.max_budget = max_budget
+        self.min_budget = min(min_budget or max_budget, max_budget)
+        self.eta = eta
+        self.max_workers = max_workers
+        self.prepare = prepare
+        self.results = []
+
+    def _run_rung(self, trials, budget, executor):
+        if executor is None:
+            return [run_trial(self.objective, self.configs[trial], budget) for trial in trials]
+        futures = [executor.submit(run_trial, self.objective, self.configs[trial], budget) for trial in trials]
+        return [future.result() for future in futures]
+
+    def run(self):
+        """
+        run the sweep.
+
+        @return: results sorted by budget (largest first) then score, lists of dictionaries
+        """
+        if self.prepare is not None:
+            self.prepare()
+
+        executor = None
+        if self.max_workers != 0:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                self.max_workers, mp_context=multiprocessing.get_context('fork'))
+
+        self.results = []
+        trials, budget, rung = list(range(len(self.configs))), self.min_budget, 0
+        try:
+            while trials:
+                LOGGER.info('sweep rung %s: %s trials with budget %s', rung, len(trials), budget)
+                scores = {}
+                for trial, (score, seconds, error) in zip(trials, self._run_rung(trials, budget, executor)):
+                    scores[trial] = score
+                    self.results.append({
+                        'trial': trial, 'rung': rung, 'budget': budget, 'config': self.configs[trial],
+                        'score': score, 'seconds': seconds, 'error': error})
+
+                if budget >= self.max_budget or len(trials) == 1:
+                    break
+                survivors = max(1, len(trials) // self.eta)
+                trials = sorted((t for t in trials if math.isfinite(scores[t])), key=scores.get)[:survivors]
+                budget, rung = min(budget * self.eta, self.max_budget), rung + 1
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.results.sort(key=lambda result: (-result['budget'], result['score']))
+        return self.results
+
+    def best(self):
+        """
+        @return: config of the best trial with the largest budget, None before run(), dictionaries
+        """
+        return self.results[0]['config'] if self.results else None
+
+    def save(self, file_path):
+        """
+        write the results table as CSV, one row per trial and rung.
+
+        @param file_path: path of the CSV file, strings
+        """
+        names = sorted({name for result in self.results for name in result['config']})
+        with open(file_path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['trial', 'rung', 'budget'] + names + ['score', 'seconds', 'error'])
+            for result in self.results:
+                config = result['config']
+                writer.writerow(
+                    [result['trial'], result['rung'], result['budget']] + [config.get(name, '') for name in names] +
+                    [result['score'], '{:.3f}'.format(result['seconds']), result['error']])
+        LOGGER.info('saved sweep results: %s', file_path)
@@ -0,0 +1,182 @@
+"""
+common.trainer.py
+
+Mini-batch and epoch engine for training deep learning models.
+"""
+import numpy as np
+
+from ml.common.profiler import NO_SPAN, UPDATE_FLOPS
+from ml.common.workspace import Workspace
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+def random_mini_batches(x, y, mini_batch_size=64, shuffle=True, seed=None):
+    """
+    generate (x, y) mini-batches, one sample per column.
+
+    only the current batch is copied out of x and y, so peak memory is
+    bounded by mini_batch_size instead of the size of the whole data set.
+
+    @param x: input X, numpy arrays (features, m)
+    @param y: actual answers Y, numpy arrays (labels, m)
+    @param mini_batch_size: size of every mini-batch; None or 0 for full batch, ints
+    @param shuffle: whether shuffle samples before batching, booleans
+    @param seed: seed of the shuffle, None to use the global random state, ints
+    @return: generator of (x, y) mini-batches, numpy arrays
+    """
+    m = x.shape[1]
+
+    if not mini_batch_size or mini_batch_size >= m:
+        # full batch: no copy, and shuffling would not change the gradients
+        yield x, y
+        return
+
+    if not shuffle:
+        for start in range(0, m, mini_batch_size):
+            yield x[:, start:start + mini_batch_size], y[:, start:start + mini_batch_size]
+        return
+
+    rng = np.random if seed is None else np.random.RandomState(seed)
+    permutation = rng.permutation(m)
+
+    for start in range(0, m, mini_batch_size):
+        # sorting indexes within a batch keeps the gather cache-friendly
+        # and does not change the gradients of the batch
+        index = np.sort(permutation[start:start + mini_batch_size])
+        yield x[:, index], y[:, index]
+
+
+def mini_batches(x, y, mini_batch_size=64, shuffle=True, seed=None):
+    """
+    create a mini-batch data source over in-memory x and y.
+
+    @param x: input X, numpy arrays (features, m)
+    @param y: actual answers Y, numpy arrays (labels, m)
+    @param mini_batch_size: size of every mini-batch; None or 0 for full batch, ints
+    @param shuffle: whether shuffle samples in every epoch, booleans
+    @param seed: base seed of the shuffle, changed per epoch, ints
+    @return: data source, callable(epoch) returning a generator of (x, y)
+    """
+    def _data_source(epoch):
+        epoch_seed = None if seed is None else seed + epoch
+        return random_mini_batches(x, y, mini_batch_size, shuffle, epoch_seed)
+
+    return _data_source
+
+
+class Trainer:
+    """
+    Trainer class runs mini-batch gradient decent over epochs of a data source.
+    """
+
+    def __init__(
+            self, parameters, learning_rate=0.009, lambd=0.7, print_cost=False, print_every=100,
+            use_workspace=False, callbacks=None, activations=None, profiler=None):
+        """
+        Constructor of Trainer
+
+        @param parameters: initialized parameters, ml.common.parameters.Parameters
+        @param learning_rate: hyper-parameter alpha, floats
+        @param lambd: regularization hyper-parameter lambda, floats
+        @param print_cost: whether print cost to system, booleans
+        @param print_every: number of epochs between printing and keeping costs, ints
+        @param use_workspace: whether propagate in preallocated per-layer buffers, booleans
+        @param callbacks: objects with on_epoch_end(trainer, cost) and on_train_end(trainer)
+                          methods, e.g. ml.common.checkpoint.Checkpointer; a callback may set
+                          stop_training to end training after the epoch, lists
+        @param activations: activation names of layers 1..L, e.g. with 'softmax' output for
+                            integer labels; None for the default of ml.common.network.Network, lists
+        @param profiler: profiler recording forward and backward propagation of every layer,
+                         cost and update, None for no profiling, ml.common.profiler.Profiler
+        """
+        self.parameters = parameters
+        self.learning_rate = learning_rate
+        self.lambd = lambd
+        self.print_cost = print_cost
+        self.print_every = max(1, print_every)
+        self.costs = []  # keep track of cost
+        self.epoch = 0
+        self.iteration = 0
+        self.use_workspace = use_workspace
+        self.workspace = None
+        self.callbacks = list(callbacks or [])
+        self.stop_training = False
+        self.activations = activations
+        self.profiler = profiler
+
+    def step(self, x, y):
+        """
+        one step of gradient decent on a mini-batch.
+
+        @param x: input X of the mini-batch, numpy arrays
+        @param y: actual answers Y of the mini-batch, numpy arrays
+        @return: cost of the mini-batch before the update, floats
+        """
+        network = self.parameters.get_network(self.activations)
+        if self.use_workspace and self.workspace is None:
+            self.workspace = Workspace.from_parameters(self.parameters.get(), x.shape[1])
+
+        profiler = self.profiler
+
+        # Forward propagation: [LINEAR -> RELU]*(L-1) -> LINEAR -> SIGMOID.
+        al, caches = network.forward(x, self.workspace, profiler)
+
+        # Compute costs
+        with NO_SPAN if profiler is None else profiler.span('cost', flops=5 * al.size + 2 * network.weights.size):
+            cost = network.compute_cost_with_l2_regularization(al, y, self.lambd, caches)
+
+        # Backward propagation.
+        grads = network.backward(al, y, caches, self.lambd, self.workspace, profiler)
+
+        # Update parameters.
+        with NO_SPAN if profiler is None else profiler.span('update', flops=self._update_flops(network)):
+            self.parameters.update(grads, self.learning_rate)
+        self.iteration += 1
+
+        return cost
+
+    def _update_flops(self, network):
+        """
+        @return: estimated floating point operations of one update of the network, ints
+        """
+        return UPDATE_FLOPS.get(getattr(self.parameters.optimizer, 'name', None), 2) * network.buffer.size
+
+    def train(self, data_source, num_epochs=1):
+        """
+        training over a data source for a number of epochs.
+
+        @param data_source: callable(epoch) returning an iterable of (x, y) mini-batches,
+                            or a re-iterable of (x, y) mini-batches
+        @param num_epochs: number of full passes over the data source, ints
+        @return: trained parameters, ml.common.parameters.Parameters
+        """
+        self.stop_training = False
+        try:
+            for _ in range(num_epochs):
+                batches = data_source(self.epoch) if callable(data_source) else data_source
+                epoch_cost, m_total = 0., 0
+
+                for x_batch, y_batch in batches:
+                    m = x_batch.shape[1]
+                    epoch_cost += self.step(x_batch, y_batch) * m
+                    m_total += m
+
+                epoch_cost = epoch_cost / m_total if m_total else epoch_cost
+
+                # Print the cost every `print_every` epochs
+                if self.print_cost and self.epoch % self.print_every == 0:
+                    print("Cost after epoch %i: %f" % (self.epoch, epoch_cost))
+                    self.costs.append(epoch_cost)
+                self.epoch += 1
+
+                for callback in self.callbacks:
+                    callback.on_epoch_end(self, epoch_cost)
+                if self.stop_training:
+                    break
+        finally:
+            for callback in self.callbacks:
+                callback.on_train_end(self)
+
+        return self.parameters
@@ -0,0 +1,127 @@
+"""
+common.weight_store.py
+
+Read-only model weights in memory shared by forked worker processes.
+
+The master process (e.g. in gunicorn `on_starting` hook) loads every model
+once into an anonymous shared memory map; workers forked afterwards map the
+same physical pages, so resident memory per worker does not grow with the
+size of the models.
+"""
+import mmap
+import numpy as np
+
+from ml.common.network import Network
+from ml.common.precision import INFERENCE_DTYPE
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class WeightStore:
+    """
+    WeightStore class keeps compiled networks of models over shared, read-only buffers.
+    """
+
+    def __init__(self):
+        """
+        Constructor of WeightStore
+        """
+        self._networks = {}
+
+    def __contains__(self, name):
+        return name in self._networks
+
+    def names(self):
+        """
+        @return: names of loaded models, lists
+        """
+        return sorted(self._networks)
+
+    def get(self, name):
+        """
+        get the network of a model.
+
+        @param name: model name, strings
+        @return: read-only network, ml.common.network.Network; None if not loaded
+        """
+        return self._networks.get(name)
+
+    def load(self, name, parameters, activations=None, dtype=INFERENCE_DTYPE):
+        """
+        load a model into shared memory, replacing a previously loaded one.
+
+        @param name: model name, strings
+        @param parameters: trained parameters keyed 'W1', 'b1', ..., dictionaries
+        @param activations: activation names of layers 1..L, None for the default, lists
+        @param dtype: data type of the weights, numpy dtypes
+        @return: read-only network, ml.common.network.Network
+        """
+        network = Network.from_parameters(parameters, activations, dtype)
+        # MAP_SHARED anonymous memory is inherited, not copied, by forked processes
+        memory = mmap.mmap(-1, network.buffer.nbytes)
+        buffer = np.frombuffer(memory, dtype=network.buffer.dtype)
+        buffer[...] = network.buffer
+        buffer.flags.writeable = False
+
+        shared = Network(network.layer_dims, network.activations, buffer=buffer)
+        self._networks[name] = shared
+        LOGGER.info('loaded shared weights of %s: %s bytes', name, buffer.nbytes)
+        return shared
+
+    def add(self, name, network):
+        """
+        add a network whose buffer is already shareable, e.g. a read-only memory map of a parameter file.
+
+        @param name: model name, strings
+        @param network: network, ml.common.network.Network
+        @return: network, ml.common.network.Network
+        """
+        self._networks[name] = network
+        LOGGER.info('added shared weights of %s: %s bytes', name, network.buffer.nbytes)
+        return network
+
+    def unload(self, name):
+        """
+        remove a model; its memory is released once no network refers to it.
+
+        @param name: model name, strings
+        """
+        self._networks.pop(name, None)
+
+
+STORE = WeightStore()  # weight store of the process, inherited by forked workers
+
+
+def load_models(models=None, store=STORE):
+    """
+    load saved parameters of models into a weight store, e.g. in the master process before forking.
+
+    a model failing to load is logged and skipped, so workers fall back to loading it on demand.
+
+    @param models: {model name: base path of saved parameters}, None for the digit recognizer and the classifier
+    @param store: weight store, WeightStore
+    @return: names of loaded models, lists
+    """
+    from ml.common.parameters import Parameters
+
+    if models is None:
+        from ml.classifier import inference as cat_inference
+        from ml.digit_recognizer import inference as digit_inference
+        models = {'digit': digit_inference.PWD, 'cat': cat_inference.PWD}
+
+    loaded = []
+    for name, base_path in models.items():
+        try:
+            parameters = Parameters(base_path)
+            parameters.load(mmap_mode='r')
+            network = parameters.get_network()
+            if isinstance(network.buffer, np.memmap) and network.buffer.dtype == INFERENCE_DTYPE:
+                # pages of a mapped file are shared by all processes through the page cache
+                store.add(name, network)
+            else:
+                store.load(name, parameters.get(), network.activations)
+            loaded.append(name)
+        except Exception as ex:
+            LOGGER.error('failed to load shared weights of %s: %s', name, ex)
+    return loaded
@@ -0,0 +1,207 @@
+"""
+common.workspace.py
+
+Preallocated per-layer buffers for allocation-free forward and backward propagation.
+"""
+import numpy as np
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class Workspace:
+    """
+    Workspace class holds Z, A, dZ, dA, dW and db buffers of every layer.
+
+    Buffers are allocated once for a maximum batch size; a smaller batch uses
+    the leading part of a buffer, which is still a contiguous (rows, m) array.
+    Arrays returned by propagation in workspace mode are views into these
+    buffers and are overwritten by the next propagation.
+    """
+
+    def __init__(self, layer_dims, max_batch_size, dtype=np.float64):
+        """
+        Constructor of Workspace
+
+        @param layer_dims: dimensions of layers, including the input layer, lists
+        @param max_batch_size: maximum number of samples per propagation, ints
+        @param dtype: data type of all buffers, numpy dtypes
+        """
+        self.layer_dims = list(layer_dims)
+        self.dtype = np.dtype(dtype)
+        self.max_batch_size = 0
+        self._z, self._a, self._dz, self._da = [], [], [], []
+
+        dims = self.layer_dims
+        layers = range(1, len(dims))
+        self._dw = [np.empty((dims[l], dims[l - 1]), dtype=self.dtype) for l in layers]
+        self._dw_l2 = [np.empty((dims[l], dims[l - 1]), dtype=self.dtype) for l in layers]
+        self._db = [np.empty((dims[l], 1), dtype=self.dtype) for l in layers]
+        self.reserve(max_batch_size)
+
+    @classmethod
+    def from_parameters(cls, parameters, max_batch_size, dtype=None):
+        """
+        create a workspace matching the shapes of parameters.
+
+        @param parameters: parameters keyed 'W1', 'b1', ..., dictionaries
+        @param max_batch_size: maximum number of samples per propagation, ints
+        @param dtype: data type of buffers, None for the data type of W1
+        @return: workspace, Workspace
+        """
+        layers = len(parameters) // 2
+        layer_dims = [parameters['W1'].shape[1]]
+        layer_dims += [parameters['W{}'.format(l)].shape[0] for l in range(1, layers + 1)]
+        return cls(layer_dims, max_batch_size, dtype or parameters['W1'].dtype)
+
+    def reserve(self, batch_size):
+        """
+        grow the activation buffers to hold at least batch_size samples.
+
+        @param batch_size: number of samples, ints
+        """
+        if batch_size <= self.max_batch_size:
+            return
+        if self.max_batch_size:
+            LOGGER.info('growing workspace from %s to %s samples', self.max_batch_size, batch_size)
+        self.max_batch_size = batch_size
+        sizes = [n * batch_size for n in self.layer_dims[1:]]
+        self._z = [np.empty(size, dtype=self.dtype) for size in sizes]
+        self._a = [np.empty(size, dtype=self.dtype) for size in sizes]
+        self._dz = [np.empty(size, dtype=self.dtype) for size in sizes]
+        self._da = [np.empty(size, dtype=self.dtype) for size in sizes]
+
+    def input(self, x):
+        """
+        prepare input x for propagation, casting it to the workspace data type.
+
+        @param x: input X, numpy arrays (features, m)
+        @return: input X of the workspace data type, numpy arrays
+        """
+        self.reserve(x.shape[1])
+        return np.asarray(x, dtype=self.dtype)
+
+    def _view(self, buffers, l, m):
+        return buffers[l - 1][:self.layer_dims[l] * m].reshape(self.layer_dims[l], m)
+
+    def z(self, l, m):
+        """
+        @return: Z buffer of layer l for m samples, numpy arrays
+        """
+        return self._view(self._z, l, m)
+
+    def a(self, l, m):
+        """
+        @return: A buffer of layer l for m samples, numpy arrays
+        """
+        return self._view(self._a, l, m)
+
+    def dz(self, l, m):
+        """
+        @return: dZ buffer of layer l for m samples, numpy arrays
+        """
+        return self._view(self._dz, l, m)
+
+    def da(self, l, m):
+        """
+        @return: dA buffer of layer l (output of layer l) for m samples, numpy arrays
+        """
+        return self._view(self._da, l, m)
+
+    def grads(self, l):
+        """
+        @return: dW, db and the L2 scratch buffers of layer l, numpy arrays
+        """
+        return self._dw[l - 1], self._db[l - 1], self._dw_l2[l - 1]
+
+    def forward_buffers(self, l, m):
+        """
+        @return: (Z, A) buffers of layer l for m samples, tuples
+        """
+        return self.z(l, m), self.a(l, m)
+
+    def backward_buffers(self, l, m):
+        """
+        @return: (dZ, dA_prev, dW, db, L2 scratch) buffers of layer l for m samples;
+                 dA_prev of the first layer is None, as the gradient of the input is not needed, tuples
+        """
+        dw, db, dw_l2 = self.grads(l)
+        da_prev = self.da(l - 1, m) if l > 1 else None
+        return self.dz(l, m), da_prev, dw, db, dw_l2
+
+
+class PingPongBuffers:
+    """
+    PingPongBuffers class holds two activation buffers for inference without caches.
+
+    layer l writes its output into buffer l % 2 while reading the output of
+    layer l - 1 from the other buffer, which is free again, as scratch, once
+    W·A_prev is computed. Memory stays at two activations of the widest layer
+    regardless of depth. The output of a propagation is a view into a buffer,
+    overwritten by the next propagation.
+    """
+
+    def __init__(self, layer_dims, max_batch_size, dtype=np.float64):
+        """
+        Constructor of PingPongBuffers
+
+        @param layer_dims: dimensions of layers, including the input layer, lists
+        @param max_batch_size: maximum number of samples per propagation, ints
+        @param dtype: data type of both buffers, numpy dtypes
+        """
+        self.layer_dims = list(layer_dims)
+        self.dtype = np.dtype(dtype)
+        self.max_batch_size = 0
+        self._width = max(self.layer_dims[1:])
+        self._buffers = [np.empty(0, dtype=self.dtype), np.empty(0, dtype=self.dtype)]
+        self.reserve(max_batch_size)
+
+    @classmethod
+    def from_parameters(cls, parameters, max_batch_size, dtype=None):
+        """
+        create ping-pong buffers matching the shapes of parameters.
+
+        @param parameters: parameters keyed 'W1', 'b1', ..., dictionaries
+        @param max_batch_size: maximum number of samples per propagation, ints
+        @param dtype: data type of buffers, None for the data type of W1
+        @return: buffers, PingPongBuffers
+        """
+        layers = len(parameters) // 2
+        layer_dims = [parameters['W1'].shape[1]]
+        layer_dims += [parameters['W{}'.format(l)].shape[0] for l in range(1, layers + 1)]
+        return cls(layer_dims, max_batch_size, dtype or parameters['W1'].dtype)
+
+    def reserve(self, batch_size):
+        """
+        grow the buffers to hold at least batch_size samples.
+
+        @param batch_size: number of samples, ints
+        """
+        if batch_size <= self.max_batch_size:
+            return
+        self.max_batch_size = batch_size
+        self._buffers = [np.empty(self._width * batch_size, dtype=self.dtype) for _ in range(2)]
+
+    def input(self, x):
+        """
+        prepare input x for propagation, casting it to the buffer data type.
+
+        @param x: input X, numpy arrays (features, m)
+        @return: input X of the buffer data type, numpy arrays
+        """
+        self.reserve(x.shape[1])
+        return np.asarray(x, dtype=self.dtype)
+
+    def out(self, l, m):
+        """
+        @return: output buffer of layer l for m samples, numpy arrays
+        """
+        return self._buffers[l % 2][:self.layer_dims[l] * m].reshape(self.layer_dims[l], m)
+
+    def scratch(self, l, m):
+        """
+        @return: scratch buffer of layer l for m samples, holding the input of layer l
+                 until W·A_prev is computed, numpy arrays
+        """
+        return self._buffers[1 - l % 2][:self.layer_dims[l] * m].reshape(self.layer_dims[l], m)
@@ -338,8 +338,12 @@ def on_starting(server):
     Called just before the master process is initialized.
 
     The callable needs to accept a single instance variable for the Arbiter.
+
+    Model weights are loaded here, once, into shared memory inherited by
+    every forked worker (see ml.common.weight_store).
     """
-    pass
+    from ml.common.weight_store import load_models
+    load_models()
 
 
 def on_reload(server):
@@ -347,8 +351,11 @@ def on_reload(server):
     Called to recycle workers during a reload via SIGHUP.
 
     The callable needs to accept a single instance variable for the Arbiter.
+
+    Reloaded model weights are shared by the recycled workers.
     """
-    pass
+    from ml.common.weight_store import load_models
+    load_models()
 
 
 def when_ready(server):
@@ -357,7 +364,8 @@ def when_ready(server):
 
     The callable needs to accept a single instance variable for the Arbiter.
     """
-    pass
+    from ml.common.weight_store import STORE
+    server.log.info('shared model weights: %s', STORE.names())
 
 
 def pre_fork(server, worker):
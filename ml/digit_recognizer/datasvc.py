@@ -7,13 +7,17 @@
 Services for loading data and pamrameters
 """
 
+import numpy as np
 import os
 
 from ml.utils.logger import get_logger
 from ml.common.datasvc_abstract import DataSvcAbstract
+from ml.common.datastream import CsvStream
 
 LOGGER = get_logger(__name__)
 PWD = os.path.dirname(os.path.realpath(__file__))
+# data rows (header excluded) of training and test sets, same as DataSvc.load
+SPLIT_RANGES = ((1, 39999), (40000, None))
 
 
 class DataSvc(DataSvcAbstract):
@@ -21,25 +25,29 @@ class DataSvc(DataSvcAbstract):
     Class DataSvc for digit-recogonizer
     """
 
-    def __init__(self, base_path=PWD):
+    def __init__(self, base_path=PWD, dtype=None):
         """
         Constructor of DataSvc
 
         :param base_path: base path, string
+        :param dtype: data type of batches of stream(), None for the training default, string;
+                      load() keeps the raw cached pixels, to standardize with ml.common.precision.standardize
         """
         path = base_path if os.path.isdir(base_path) else PWD
-        super().__init__(path)
+        super().__init__(path, dtype)
 
     def load(self, data_name='train'):
         """
         load datas from os
         for training, 39,998 pictures as train data, 2000 as test data
 
+        pixels are views into the memory-mapped cache, in its narrow integer type (uint8),
+        whatever the dtype of the service; standardize them to a float type for training.
+
         @return: train and tests sets for training and analyzing, numpy arrays
         """
         LOGGER.info('Loading data sets ...')
-        data = super().load_dataset(data_name)
-        data_modified = data[1:, :]
+        data_modified = super().load_cached_dataset(data_name)  # without the header row
         train_set_x_orig = data_modified[1:39999, 1:]
         train_set_y_orig = data_modified[1:39999, 0]
         test_set_x_orig = data_modified[40000:, 1:]
@@ -49,8 +57,9 @@ def load(self, data_name='train'):
         train_set_x_orig = train_set_x_orig.T
         test_set_x_orig = test_set_x_orig.T
 
-        train_set_y_orig = train_set_y_orig.reshape((1, train_set_y_orig.shape[0]))
-        test_set_y_orig = test_set_y_orig.reshape((1, test_set_y_orig.shape[0]))
+        # labels are small; int64 copies keep them usable as class indexes
+        train_set_y_orig = train_set_y_orig.astype(np.int64).reshape((1, train_set_y_orig.shape[0]))
+        test_set_y_orig = test_set_y_orig.astype(np.int64).reshape((1, test_set_y_orig.shape[0]))
         self.trainings = {
             'x': train_set_x_orig,
             'y': train_set_y_orig,
@@ -60,3 +69,20 @@ def load(self, data_name='train'):
             'y': test_set_y_orig,
         }
         LOGGER.info('Loading data sets - DONE')
+
+    def stream(self, data_name='train', batch_size=256, ratio=None, ranges=SPLIT_RANGES, num_classes=None):
+        """
+        stream batches from os without loading the whole data set, for data sets larger than memory.
+
+        @param data_name: data name, string
+        @param batch_size: number of samples per batch, ints
+        @param ratio: share of rows for training, overriding ranges, floats
+        @param ranges: ((start, stop), (start, stop)) data rows of training and test, tuples
+        @param num_classes: number of classes to one-hot labels into, None for (1, m) labels, ints
+        @return: re-iterable training and test streams of standardized (x, y) batches, CsvStream
+        """
+        data_path = os.path.join(self.base_path, 'datasets', '{}.csv'.format(data_name))
+        data_stream = CsvStream(data_path, batch_size, num_classes=num_classes, scale=255., dtype=self.dtype)
+        if ratio is not None:
+            return data_stream.split(ratio=ratio)
+        return data_stream.split(ranges=ranges)
@@ -0,0 +1,219 @@
+"""
+inference.py
+
+Batched inference on pictures of digits, with parameters loaded once.
+"""
+import io
+import itertools
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from ml.common.mathEx import l_model_predict
+from ml.common.parameters import Parameters
+from ml.common.precision import INFERENCE_DTYPE, as_dtype
+from ml.common.quantization import load_quantized
+from ml.common.workspace import PingPongBuffers
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+PWD = os.path.dirname(os.path.realpath(__file__))
+IMAGE_SIZE = 28
+MICRO_BATCH_SIZE = 256
+QUANTIZED_PARAM_FILE = os.path.join(PWD, 'datasets', 'saved_parameters.q8.npz')  # written by quantize.py
+
+
+def read_pixels(image):
+    """
+    decode an image into raw grayscale pixels, resized to IMAGE_SIZE x IMAGE_SIZE.
+
+    @param image: image file path, bytes, file object or PIL image
+    @return: pixels in [0, 255], numpy uint8 arrays (IMAGE_SIZE * IMAGE_SIZE,)
+    """
+    if isinstance(image, bytes):
+        image = io.BytesIO(image)
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    return np.asarray(image.convert('L').resize((IMAGE_SIZE, IMAGE_SIZE)), dtype=np.uint8).reshape(-1)
+
+
+def normalize_pixels(x, image_type=1):
+    """
+    scale raw pixels into [0, 1] in place, inverting white based images, so the digit is bright on dark.
+
+    @param x: pixels in [0, 255], float numpy arrays
+    @param image_type: 1: white based, 2: black based, ints
+    @return: x, numpy arrays
+    """
+    x /= 255.
+    if image_type == 1:
+        np.subtract(1, x, out=x)
+    return x
+
+
+def decode_image(image, image_type=1, dtype=INFERENCE_DTYPE):
+    """
+    decode an image into a standardized column of pixels.
+
+    @param image: image file path, bytes, file object or PIL image
+    @param image_type: 1: white based, 2: black based, ints
+    @param dtype: data type of the column, numpy dtypes
+    @return: pixels in [0, 1] with the digit bright on dark, numpy arrays (IMAGE_SIZE * IMAGE_SIZE,)
+    """
+    return normalize_pixels(read_pixels(image).astype(dtype), image_type)
+
+
+def preprocess_images(images, image_type=1, executor=None, out=None, dtype=INFERENCE_DTYPE):
+    """
+    decode images into the columns of one matrix, and standardize it in one vectorized pass.
+
+    raw pixels are written straight into the matrix by the decoding threads;
+    normalization and inversion then run once over the whole matrix.
+
+    @param images: image file paths, bytes, file objects or PIL images, lists
+    @param image_type: 1: white based, 2: black based, ints
+    @param executor: thread pool decoding images (PIL releases the GIL), None to decode in this thread
+    @param out: preallocated matrix of at least len(images) columns, None to allocate,
+                numpy arrays (IMAGE_SIZE * IMAGE_SIZE, n)
+    @param dtype: data type of an allocated matrix, numpy dtypes
+    @return: input X, a view into out if given, numpy arrays (IMAGE_SIZE * IMAGE_SIZE, len(images))
+    """
+    n = len(images)
+    if out is None:
+        # pixels of an image are contiguous, so decoding threads do not write to the same cache lines
+        out = np.empty((n, IMAGE_SIZE * IMAGE_SIZE), dtype=dtype).T
+    if out.shape[0] != IMAGE_SIZE * IMAGE_SIZE or out.shape[1] < n:
+        LOGGER.error('invalid output matrix %s for %s images', out.shape, n)
+        raise ValueError('output matrix must be ({}, >={}): {}'.format(IMAGE_SIZE * IMAGE_SIZE, n, out.shape))
+    x = out[:, :n]
+
+    def _read(i):
+        x[:, i] = read_pixels(images[i])
+
+    if executor is None:
+        for i in range(n):
+            _read(i)
+    else:
+        for _ in executor.map(_read, range(n)):
+            pass  # raises the first error of decoding
+    return normalize_pixels(x, image_type)
+
+
+class InferenceEngine:
+    """
+    InferenceEngine class predicts digits of many images in vectorized micro-batches.
+
+    images are decoded and resized in a thread pool (PIL releases the GIL while
+    decoding) into the columns of one preallocated matrix, standardized in one
+    vectorized pass, and each micro-batch is one forward propagation.
+    """
+
+    def __init__(
+            self, parameters=None, micro_batch_size=MICRO_BATCH_SIZE, max_workers=None, dtype=INFERENCE_DTYPE,
+            activations=None, quantized_file=None):
+        """
+        Constructor of InferenceEngine
+
+        @param parameters: trained parameters, dictionaries or ml.common.parameters.Parameters;
+                           None to load saved parameters of the digit recognizer
+        @param micro_batch_size: number of images per forward propagation, ints
+        @param max_workers: number of threads decoding images, None for the default of the executor, ints
+        @param dtype: data type of inference, numpy dtypes
+        @param activations: activation names of layers 1..L, None for the saved ones of
+                            ml.common.parameters.Parameters, or the default with dictionaries, lists
+        @param quantized_file: path of int8 weights saved and checked for accuracy by
+                               ml.digit_recognizer.quantize (make dr-quantize), e.g. QUANTIZED_PARAM_FILE,
+                               loaded instead of parameters; a storage format, widened to float32 when
+                               loaded, so inference is neither faster nor smaller, strings
+        """
+        if micro_batch_size <= 0:
+            LOGGER.error('invalid micro batch size: %s', micro_batch_size)
+            raise ValueError('micro batch size must be positive: {}'.format(micro_batch_size))
+        if quantized_file is not None:
+            network = load_quantized(quantized_file).dequantize()
+            parameters, activations, dtype = network.to_parameters(), network.activations, network.dtype
+        elif parameters is None:
+            parameters = Parameters(PWD)
+            parameters.load()
+        if not isinstance(parameters, dict):
+            activations = activations or parameters.get_network().activations
+            parameters = parameters.get()
+        self.dtype = np.dtype(dtype)
+        self.parameters = as_dtype(parameters, self.dtype)
+        layers = len(self.parameters) // 2
+        self.num_classes = self.parameters['W' + str(layers)].shape[0]
+        self.activations = list(activations or []) or ['leaky_relu'] * (layers - 1) + ['sigmoid']
+        self.output_activation = self.activations[-1]
+        self.micro_batch_size = micro_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._local = threading.local()  # ping-pong buffers of every predicting thread
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        shut down the decoding threads.
+        """
+        self._executor.shutdown(wait=True)
+
+    def _buffers(self):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = PingPongBuffers.from_parameters(
+                self.parameters, self.micro_batch_size, self.dtype)
+        return buffers
+
+    def predict(self, x):
+        """
+        predict digits of standardized inputs.
+
+        @param x: input X, numpy arrays (IMAGE_SIZE * IMAGE_SIZE, m)
+        @return: labels, numpy arrays (m,); and probabilities of every digit, numpy arrays (10, m)
+        """
+        probas = l_model_predict(x, self.parameters, self._buffers(), self.activations)
+        return np.argmax(probas, axis=0), probas.copy()
+
+    def preprocess_images(self, images, image_type=1):
+        """
+        decode images in the thread pool into one standardized matrix.
+
+        @param images: image file paths, bytes, file objects or PIL images, lists
+        @param image_type: 1: white based, 2: black based, ints
+        @return: input X, numpy arrays (IMAGE_SIZE * IMAGE_SIZE, len(images))
+        """
+        return preprocess_images(images, image_type, self._executor, dtype=self.dtype)
+
+    def predict_stream(self, images, image_type=1):
+        """
+        predict digits of a stream of images, one micro-batch at a time.
+
+        @param images: iterable of image file paths, bytes, file objects or PIL images
+        @param image_type: 1: white based, 2: black based, ints
+        @return: generator of labels and probabilities of every micro-batch, numpy arrays
+        """
+        images = iter(images)
+        x = np.empty((self.micro_batch_size, IMAGE_SIZE * IMAGE_SIZE), dtype=self.dtype).T
+        while True:
+            batch = list(itertools.islice(images, self.micro_batch_size))
+            if not batch:
+                break
+            yield self.predict(preprocess_images(batch, image_type, self._executor, x))
+
+    def predict_images(self, images, image_type=1):
+        """
+        predict digits of images.
+
+        @param images: iterable of image file paths, bytes, file objects or PIL images
+        @param image_type: 1: white based, 2: black based, ints
+        @return: labels, numpy arrays (n,); and probabilities of every digit, numpy arrays (10, n)
+        """
+        results = list(self.predict_stream(images, image_type))
+        if not results:
+            return np.empty((0,), dtype=np.int64), np.empty((self.num_classes, 0), dtype=self.dtype)
+        return np.concatenate([labels for labels, _ in results]), np.hstack([probas for _, probas in results])
@@ -5,9 +5,11 @@
 import os
 import numpy as np
 
-from ml.common.mathEx import one_vs_all_prediction, l_model_forward
+from ml.common.evaluation import evaluate
+from ml.common.mathEx import one_vs_all_prediction, l_model_predict
 from ml.digit_recognizer.datasvc import DataSvc
 from ml.common.parameters import Parameters
+from ml.common.precision import INFERENCE_DTYPE, standardize
 
 PWD = os.path.dirname(os.path.realpath(__file__))
 
@@ -24,8 +26,8 @@ def predict(x, y, parameters):
     # m = x.shape[1]
     # n = len(parameters) // 2  # number of layers in the neural network
 
-    # Forward propagation
-    probas, caches = l_model_forward(x, parameters)
+    # Forward propagation, without caches
+    probas = l_model_predict(x, parameters)
 
     # changing probabilities to predictions using one vs. all method
     prediction = one_vs_all_prediction(probas)
@@ -46,22 +48,21 @@ def run():
     data_svc.load()
     train_x_orig, train_y_orig = data_svc.trainings['x'], data_svc.trainings['y']
     test_x_orig, test_y_orig = data_svc.tests_set['x'], data_svc.tests_set['y']
-    m_train = train_x_orig.shape[1]
-    m_test = test_x_orig.shape[1]
 
     # standardization
-    train_x = train_x_orig / 255.
-    test_x = test_x_orig / 255.
+    train_x = standardize(train_x_orig, dtype=INFERENCE_DTYPE)
+    test_x = standardize(test_x_orig, dtype=INFERENCE_DTYPE)
 
     # load parameters
     parameters = Parameters(PWD)
-    parameters.load()
-
-    # predict on training set and test set
-    pred_train = predict(train_x, train_y_orig, parameters.get())
-    pred_test = predict(test_x, test_y_orig, parameters.get())
-    print('Accuracy on training set: ', str(np.sum((pred_train == train_y_orig) / m_train)))
-    print('Accuracy on test set: ', str(np.sum((pred_test == test_y_orig) / m_test)))
+    parameters.load(dtype=INFERENCE_DTYPE)
+
+    # evaluate on training set and test set
+    train_metrics = evaluate(parameters, train_x, train_y_orig)
+    test_metrics = evaluate(parameters, test_x, test_y_orig, top_k=(1, 2, 3))
+    print('Accuracy on training set: ', str(train_metrics.accuracy()))
+    print('Accuracy on test set: ', str(test_metrics.accuracy()))
+    print(test_metrics.report())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,51 @@
+"""
+quantize.py
+
+Post-training int8 quantization of the saved digit recognizer, to store and
+ship it in a quarter of the size, with an accuracy-regression check against
+the float model on the test split.
+"""
+import argparse
+import os
+
+from ml.common.parameters import Parameters
+from ml.common.precision import INFERENCE_DTYPE, standardize
+from ml.common.quantization import QuantizedNetwork, check_accuracy, save_quantized
+from ml.digit_recognizer.datasvc import DataSvc
+from ml.digit_recognizer.inference import QUANTIZED_PARAM_FILE
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+MAX_ACCURACY_DROP = 0.005  # of test accuracy, before the quantized model is rejected
+
+
+def run(max_drop=MAX_ACCURACY_DROP, file_path=QUANTIZED_PARAM_FILE):
+    """
+    quantize saved parameters, check accuracy on DataSvc.tests_set, and save the quantized model.
+
+    @param max_drop: maximum allowed drop of test accuracy, floats
+    @param file_path: path to save the quantized model to, strings
+    @return: float and int8 accuracy, accuracy drop and agreement, dictionaries
+    """
+    data_svc = DataSvc()
+    data_svc.load()
+    test_x = standardize(data_svc.tests_set['x'], dtype=INFERENCE_DTYPE)
+    test_y = data_svc.tests_set['y']
+
+    parameters = Parameters(PWD)
+    parameters.load(dtype=INFERENCE_DTYPE)
+    network = parameters.get_network()
+    quantized = QuantizedNetwork.from_network(network)
+
+    comparison = check_accuracy(network, quantized, test_x, test_y, max_drop)
+    print('Accuracy on test set: float32 {float_accuracy:.4f}, int8 {int8_accuracy:.4f}, '
+          'agreement {agreement:.4f}'.format(**comparison))
+    print('Size of saved weights: float32 {} bytes, int8 {} bytes'.format(network.buffer.nbytes, quantized.nbytes))
+    save_quantized(file_path, quantized)
+    return comparison
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Quantize the digit recognizer to int8.')
+    parser.add_argument('--max-drop', type=float, default=MAX_ACCURACY_DROP, help='maximum drop of test accuracy')
+    args = parser.parse_args()
+    run(max_drop=args.max_drop)
@@ -3,55 +3,69 @@
 @author: Jinchi Zhang, Yunhan Li
 @email: jizjiz148148@gmail.com, kpr.sajuuk@gmail.com
 
-Predict on single pictures of digits for experiments.
+Predict on single pictures, or folders of pictures, of digits for experiments.
 """
 
 import os
-import numpy as np
 from PIL import Image
 from matplotlib import pyplot as plt
 
-from ml.digit_recognizer.prediction import predict
-from ml.common.parameters import Parameters
+from ml.digit_recognizer.inference import IMAGE_SIZE, InferenceEngine
 
-IMAGE_SIZE = 28
 IMAGE_NAME = '3.jpg'
+IMAGE_EXTENSIONS = ('.bmp', '.gif', '.jpeg', '.jpg', '.png')
 TRUE_ANSWER = 3
 IMAGE_TYPE = 1  # 1 as white based, 2 as black based
 SHOW_IMAGE = False
 PWD = os.path.dirname(os.path.realpath(__file__))
 
 
-def predict_image(image_name, my_label_y, image_type):
+def predict_image(image_name, my_label_y, image_type, engine=None):
     """
     predict images using one step of forward propagation.
 
     @param image_name: name of the image, strings
     @param my_label_y: actual answer y, numbers or numpy arrays
     @param image_type: 1: white based, 2: black based, ints
+    @param engine: inference engine with loaded parameters, None to load saved parameters,
+                   ml.digit_recognizer.inference.InferenceEngine
     """
-
-    # load parameters
-    parameters = Parameters(PWD)
-    parameters.load()
-
     fname = os.path.join(PWD, 'images', image_name)
 
-    my_image = Image.open(fname).convert('L').resize((IMAGE_SIZE, IMAGE_SIZE))
-    my_image_x = np.array(my_image).reshape([IMAGE_SIZE*IMAGE_SIZE, 1])
-
-    # standardization with type
-    if image_type == 1:
-        my_image_x = 1 - my_image_x / 255.
+    if engine is None:
+        with InferenceEngine() as engine:
+            labels, _ = engine.predict_images([fname], image_type)
     else:
-        my_image_x = my_image_x / 255.
+        labels, _ = engine.predict_images([fname], image_type)
 
-    my_predicted_image = predict(my_image_x, my_label_y, parameters.get())
-    plt.imshow(my_image)
+    my_predicted_image = labels.reshape((1, 1))
+    plt.imshow(Image.open(fname).convert('L').resize((IMAGE_SIZE, IMAGE_SIZE)))
     plt.show(block=SHOW_IMAGE)
     print('My model predicted this images as: ', str(my_predicted_image), '\nThis image is actually: ', str(my_label_y))
 
 
+def predict_folder(folder=None, image_type=IMAGE_TYPE, engine=None):
+    """
+    predict all images of a folder, decoded in parallel and predicted in micro-batches.
+
+    @param folder: path of the folder, None for the sample images, strings
+    @param image_type: 1: white based, 2: black based, ints
+    @param engine: inference engine with loaded parameters, None to load saved parameters,
+                   ml.digit_recognizer.inference.InferenceEngine
+    @return: {image file name: predicted digit}, dictionaries
+    """
+    folder = os.path.join(PWD, 'images') if folder is None else folder
+    names = sorted(name for name in os.listdir(folder) if name.lower().endswith(IMAGE_EXTENSIONS))
+    paths = [os.path.join(folder, name) for name in names]
+
+    if engine is None:
+        with InferenceEngine() as engine:
+            labels, _ = engine.predict_images(paths, image_type)
+    else:
+        labels, _ = engine.predict_images(paths, image_type)
+    return dict(zip(names, labels.tolist()))
+
+
 def run():
     predict_image(IMAGE_NAME, TRUE_ANSWER, IMAGE_TYPE)
 
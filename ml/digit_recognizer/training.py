@@ -6,31 +6,61 @@
 Training using gradient decent.
 """
 
+import argparse
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 
 from ml.digit_recognizer.datasvc import DataSvc
-from ml.common.mathEx import \
-    change_to_multi_class, \
-    compute_cost_with_l2_regularization, \
-    l_model_backward_with_l2, \
-    l_model_forward
+from ml.common.mathEx import change_to_multi_class, l_model_predict
+from ml.common.checkpoint import Checkpointer
+from ml.common.early_stopping import EarlyStopping
+from ml.common.parallel import ParallelTrainer
 from ml.common.parameters import Parameters
+from ml.common.precision import get_dtype, standardize
+from ml.common.profiler import Profiler
+from ml.common.sweep import Sweep, random_search, uniform
+from ml.common.trainer import Trainer, mini_batches
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
 
 # hyper-parameters
 PWD = os.path.dirname(os.path.realpath(__file__))
 LAYERS_DIMENSIONS = [784, 50, 35, 20, 15, 10]  # 5-layer model
 NUMBER_OF_LABELS = 10
-LEARNING_RATE = 0.009
-NUMBER_OF_ITERATIONS = 8000
+OUTPUT_ACTIVATION = 'softmax'  # softmax trains on integer labels; sigmoid on one-hot answers
+LEARNING_RATE = 0.001  # for Adam; gradient decent used 0.009
 LAMBDA = 0.9
+MINI_BATCH_SIZE = 256
+NUMBER_OF_EPOCHS = 30
+OPTIMIZER = 'adam'
+USE_WORKSPACE = True
+STREAMING = False  # stream batches from disk for data sets larger than memory
+CHECKPOINT_DIR = os.path.join(PWD, 'datasets', 'checkpoints')
+CHECKPOINT_EVERY = 5  # epochs (iterations with full batch) between checkpoints
+PATIENCE = 3  # validations without improvement of accuracy before stopping, None to always train all epochs
+VALIDATE_EVERY = 1  # epochs (iterations with full batch) between validations
+VALIDATION_SPLIT = 0.05  # share of training rows held out for early stopping and sweeps; tests_set is for reports
+NUM_WORKERS = 1  # processes of data-parallel training, None for all CPU cores
+DTYPE = None  # None for precision.training in config.yaml; 'float32' halves memory traffic
+SWEEP_SPACE = {
+    'hidden_layers': [[50, 35, 20, 15], [100, 50, 25], [64, 32]],
+    'learning_rate': uniform(0.0001, 0.01, log=True),
+    'lambd': uniform(0., 2.),
+    'mini_batch_size': [128, 256, 512],
+}
+SWEEP_RESULTS = os.path.join(PWD, 'datasets', 'sweep_results.csv')
+_SWEEP_DATA = {}  # standardized train and validation sets, loaded before forking trials
 
 
 def l_layer_model(
     x, y, layers_dims,
     learning_rate=0.009, num_iterations=2000,
-        print_cost=False, lambd=0.7):
+        print_cost=False, lambd=0.7, mini_batch_size=None, optimizer=None, use_workspace=False,
+        dtype=None, data_source=None, checkpoint_dir=None, checkpoint_every=CHECKPOINT_EVERY, resume=False,
+        num_workers=1, validation=None, patience=PATIENCE, validate_every=VALIDATE_EVERY,
+        output_activation='sigmoid', profiler=None):
     """
     training using gradient decent
 
@@ -38,72 +68,207 @@ def l_layer_model(
     @param y: actual answers Y, numpy arrays
     @param layers_dims: dimensions of layers, lists
     @param learning_rate: hyper-parameter alpha, floats
-    @param num_iterations: hyper-parameter number of iterations, ints
+    @param num_iterations: hyper-parameter number of iterations (epochs with mini-batches), ints
     @param print_cost: whether print cost to system, booleans
     @param lambd: regularization hyper-parameter lambda, floats
+    @param mini_batch_size: size of mini-batches, None for full batch gradient decent, ints
+    @param optimizer: optimizer to update parameters, e.g. 'adam'; None for gradient decent, strings
+    @param use_workspace: whether propagate in preallocated per-layer buffers, booleans
+    @param dtype: data type of parameters, None for the training default, strings
+    @param data_source: mini-batches to train on instead of x and y, e.g. ml.common.datastream.CsvStream
+    @param checkpoint_dir: folder to write checkpoints into, in background, None for no checkpoints, strings
+    @param checkpoint_every: number of epochs (iterations with full batch) between checkpoints, ints
+    @param resume: whether resume from the latest checkpoint in checkpoint_dir, booleans
+    @param num_workers: number of processes sharing every batch, 1 for single process,
+                        None for all CPU cores, ints
+    @param validation: held-out (x, y) to stop training on a plateau of accuracy, None to train all iterations,
+                       tuples of numpy arrays
+    @param patience: number of validations without improvement before stopping, None to never stop, ints
+    @param validate_every: number of epochs (iterations with full batch) between validations, ints
+    @param output_activation: activation of the output layer, 'sigmoid' for one-hot answers Y,
+                              or 'softmax' for integer labels Y (1, m), strings
+    @param profiler: profiler recording timings of every layer, cost and update,
+                     None for no profiling, ml.common.profiler.Profiler
     @return: trained parameters, dictionaries
     """
 
-    costs = []  # keep track of cost
-
-    parameters = Parameters(PWD)
-    parameters.initialize_parameters_deep_he(layers_dims)
-
-    for i in range(0, num_iterations):
-
-        # Forward propagation: [LINEAR -> RELU]*(L-1) -> LINEAR -> SIGMOID.
-        al, caches = l_model_forward(x, parameters.get())
-        # print(AL)
-        # print(y)
-        # Compute costs
-        cost = compute_cost_with_l2_regularization(al, y, parameters.get(), lambd)
-
-        # Backward propagation.
-        grads = l_model_backward_with_l2(al, y, caches, lambd)
+    parameters = Parameters(PWD, optimizer=optimizer)
+    parameters.initialize_parameters_deep_he(layers_dims, dtype=dtype)
 
-        # Update parameters.
-        parameters.update(grads, learning_rate)
+    callbacks = []
+    if checkpoint_dir is not None:
+        callbacks.append(Checkpointer(checkpoint_dir, checkpoint_every))
+    if validation is not None and patience:
+        val_x, val_y = validation
+        callbacks.append(EarlyStopping(val_x, val_y, validate_every, patience, print_metrics=print_cost))
 
-        # Print the cost every 100 training example
-        if print_cost and i % 100 == 0:
-            print("Cost after iteration %i: %f" % (i, cost))
-        if print_cost and i % 100 == 0:
-            costs.append(cost)
+    # full batch prints every 100 iterations, mini-batch prints every epoch
+    trainer_class, kwargs = (Trainer, {}) if num_workers == 1 else (ParallelTrainer, {'num_workers': num_workers})
+    trainer = trainer_class(
+        parameters, learning_rate=learning_rate, lambd=lambd,
+        print_cost=print_cost, print_every=1 if mini_batch_size else 100, use_workspace=use_workspace,
+        callbacks=callbacks, activations=['leaky_relu'] * (len(layers_dims) - 2) + [output_activation],
+        profiler=profiler, **kwargs)
+    if resume and checkpoint_dir is not None:
+        callbacks[0].resume(trainer)
+    if data_source is None:
+        data_source = mini_batches(x, y, mini_batch_size, seed=1)
+    trainer.train(data_source, num_epochs=max(0, num_iterations - trainer.epoch))
 
     # plot the cost
-    plt.plot(np.squeeze(costs))
+    plt.plot(np.squeeze(trainer.costs))
     plt.ylabel('cost')
-    plt.xlabel('iterations (per tens)')
+    plt.xlabel('epochs' if mini_batch_size else 'iterations (per hundreds)')
     plt.title("Learning rate =" + str(learning_rate))
     # plt.show()
 
     return parameters
 
 
-def run():
+def training_answers(y, dtype):
+    """
+    answers Y to train the output layer on.
+
+    @param y: integer labels, numpy arrays (1, m)
+    @param dtype: data type of one-hot answers, numpy dtypes
+    @return: labels for a softmax output layer, or one-hot answers (NUMBER_OF_LABELS, m), numpy arrays
+    """
+    if OUTPUT_ACTIVATION == 'softmax':
+        return y
+    return change_to_multi_class(y, NUMBER_OF_LABELS, dtype)
+
+
+def split_validation(x, y, ratio=VALIDATION_SPLIT):
+    """
+    split the last columns of a training set off as a validation set.
+
+    @param x: input X, numpy arrays (features, m)
+    @param y: labels or answers Y, numpy arrays (classes, m)
+    @param ratio: share of columns for validation, floats
+    @return: (x, y) of training and (x, y) of validation, views of x and y, tuples
+    """
+    if not 0 <= ratio < 1:
+        LOGGER.error('invalid validation split: %s', ratio)
+        raise ValueError('validation split must be within [0, 1): {}'.format(ratio))
+    middle = x.shape[1] - int(round(x.shape[1] * ratio))
+    return (x[:, :middle], y[:, :middle]), (x[:, middle:], y[:, middle:])
+
+
+def run(resume=False, profile=None, profile_memory=False):
+    """
+    train the digit recognizer and save parameters.
+
+    @param resume: whether resume from the latest checkpoint, booleans
+    @param profile: path of a Chrome trace file to profile training into, None for no profiling, strings
+    @param profile_memory: whether profiling also traces net bytes allocated by every span, booleans
+    """
 
     print('Start training ...')
     np.random.seed(1)
-    data_svc = DataSvc()
-    data_svc.load()
-    train_x_orig, train_y_orig, = data_svc.trainings['x'], data_svc.trainings['y']
+    dtype = get_dtype(DTYPE)
+    data_svc = DataSvc(dtype=dtype)
+    layers_dims = LAYERS_DIMENSIONS
+    train_x, train_y, train_stream = None, None, None
+    profiler = None if profile is None else Profiler(track_memory=profile_memory)
 
-    # make multi-class ys
-    train_y = change_to_multi_class(train_y_orig)
+    if STREAMING:
+        num_classes = None if OUTPUT_ACTIVATION == 'softmax' else NUMBER_OF_LABELS
+        train_stream, _ = data_svc.stream(batch_size=MINI_BATCH_SIZE, num_classes=num_classes)
+        train_stream, val_stream = train_stream.split(ratio=1 - VALIDATION_SPLIT)
+        val_x, val_y = (np.hstack(batches) for batches in zip(*val_stream))
+    else:
+        data_svc.load()
+        (train_x_orig, train_y_orig), (val_x_orig, val_y) = split_validation(
+            data_svc.trainings['x'], data_svc.trainings['y'])
 
-    # standardization
-    train_x = train_x_orig/255.
+        train_y = training_answers(train_y_orig, dtype)
 
-    layers_dims = LAYERS_DIMENSIONS
+        # standardization
+        train_x = standardize(train_x_orig, dtype=dtype)
+        val_x = standardize(val_x_orig, dtype=dtype)
 
     # train parameters
     parameters = l_layer_model(
         train_x, train_y, layers_dims,
-        learning_rate=LEARNING_RATE, num_iterations=NUMBER_OF_ITERATIONS, print_cost=True, lambd=LAMBDA)
+        learning_rate=LEARNING_RATE, num_iterations=NUMBER_OF_EPOCHS, print_cost=True, lambd=LAMBDA,
+        mini_batch_size=MINI_BATCH_SIZE, optimizer=OPTIMIZER, use_workspace=USE_WORKSPACE,
+        dtype=dtype, data_source=train_stream, checkpoint_dir=CHECKPOINT_DIR, resume=resume,
+        num_workers=NUM_WORKERS, validation=(val_x, val_y), output_activation=OUTPUT_ACTIVATION,
+        profiler=profiler)
+
+    if profiler is not None:
+        print(profiler.format_summary())
+        profiler.save_chrome_trace(profile)
 
     # save parameters
     parameters.save()
 
 
+def prepare_sweep():
+    """
+    load and standardize the train and validation sets once, to be shared by forked trials.
+    """
+    if _SWEEP_DATA:
+        return
+    dtype = get_dtype(DTYPE)
+    data_svc = DataSvc(dtype=dtype)
+    data_svc.load()
+    (train_x, train_y), (dev_x, dev_y) = split_validation(data_svc.trainings['x'], data_svc.trainings['y'])
+    _SWEEP_DATA['train_x'] = standardize(train_x, dtype=dtype)
+    _SWEEP_DATA['train_y'] = training_answers(train_y, dtype)
+    _SWEEP_DATA['dev_x'] = standardize(dev_x, dtype=dtype)
+    _SWEEP_DATA['dev_y'] = dev_y
+
+
+def sweep_objective(config, budget):
+    """
+    objective of hyperparameter sweeps: error rate on the validation rows split off the training set.
+
+    @param config: hyperparameters, e.g. from SWEEP_SPACE, dictionaries
+    @param budget: number of epochs, ints
+    @return: error rate on the dev set, floats
+    """
+    prepare_sweep()
+    layers_dims = [LAYERS_DIMENSIONS[0]] + list(config.get('hidden_layers', LAYERS_DIMENSIONS[1:-1]))
+    parameters = l_layer_model(
+        _SWEEP_DATA['train_x'], _SWEEP_DATA['train_y'], layers_dims + [NUMBER_OF_LABELS],
+        learning_rate=config.get('learning_rate', LEARNING_RATE), num_iterations=budget,
+        lambd=config.get('lambd', LAMBDA), mini_batch_size=config.get('mini_batch_size', MINI_BATCH_SIZE),
+        optimizer=config.get('optimizer', OPTIMIZER), use_workspace=USE_WORKSPACE, dtype=get_dtype(DTYPE),
+        output_activation=OUTPUT_ACTIVATION)
+    al = l_model_predict(_SWEEP_DATA['dev_x'], parameters.get())
+    return float(np.mean(np.argmax(al, axis=0) != _SWEEP_DATA['dev_y'][0]))
+
+
+def sweep(num_trials=27, min_budget=3, max_budget=NUMBER_OF_EPOCHS, max_workers=None, seed=1):
+    """
+    random search of SWEEP_SPACE with successive halving; results are saved to SWEEP_RESULTS.
+
+    @param num_trials: number of random configs, ints
+    @param min_budget: epochs of the first rung, ints
+    @param max_budget: epochs of the last rung, ints
+    @param max_workers: number of trial processes, None for all CPU cores, ints
+    @param seed: seed of the random search, ints
+    @return: best config, dictionaries
+    """
+    trials = Sweep(
+        sweep_objective, random_search(SWEEP_SPACE, num_trials, seed), max_budget, min_budget,
+        max_workers=max_workers, prepare=prepare_sweep)
+    trials.run()
+    trials.save(SWEEP_RESULTS)
+    print('Best config: {}'.format(trials.best()))
+    return trials.best()
+
+
 if __name__ == '__main__':
-        run()
+    parser = argparse.ArgumentParser(description='Train the digit recognizer.')
+    parser.add_argument('--resume', action='store_true', help='resume from the latest checkpoint')
+    parser.add_argument('--sweep', type=int, metavar='TRIALS', help='run a hyperparameter sweep of TRIALS configs')
+    parser.add_argument('--profile', metavar='TRACE', help='profile training into a Chrome trace file')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='with --profile, also trace net bytes allocated by every span (slower)')
+    args = parser.parse_args()
+    if args.sweep:
+        sweep(num_trials=args.sweep)
+    else:
+        run(resume=args.resume, profile=args.profile, profile_memory=args.profile_memory)
@@ -0,0 +1,165 @@
+"""
+# test_api_predict.py
+
+"""
+import base64
+import io
+import logging
+import os
+import unittest
+import numpy
+
+from mock import patch
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class ApiPredictTests(unittest.TestCase):
+    """
+    ApiPredictTests includes all unit tests for ml.api.__predict module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.test_path = os.path.dirname(os.path.realpath(__file__))
+        self.repo_path = os.path.dirname(self.test_path)
+        image_path = os.path.join(self.repo_path, "ml", "digit_recognizer", "images")
+        self.images = []
+        for name in sorted(os.listdir(image_path))[:3]:
+            with open(os.path.join(image_path, name), 'rb') as image_file:
+                self.images.append(base64.b64encode(image_file.read()).decode('ascii'))
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        from ml.api.__predict import BATCHERS, REGISTRY
+        BATCHERS.clear()
+        REGISTRY.close()
+        pass
+
+    def _engines(self):
+        from ml.classifier import inference as cat_inference
+        from ml.common.parameters import Parameters
+        from ml.digit_recognizer import inference as digit_inference
+
+        numpy.random.seed(1)
+        digit, cat = Parameters(), Parameters()
+        digit.initialize_parameters_deep_he([784, 12, 10])
+        cat.initialize_parameters_deep_he([64 * 64 * 3, 5, 1])
+        return {
+            'digit': digit_inference.InferenceEngine(digit, max_workers=1),
+            'cat': cat_inference.InferenceEngine(cat),
+        }
+
+    def test_predict(self):
+        """
+        test ml.api.__predict :: predict_digit, predict_cat
+        """
+        from starlette.testclient import TestClient
+        from ml.app_fastapi import app
+
+        engines = self._engines()
+        client = TestClient(app)
+        with patch('ml.api.__predict.load_model', side_effect=lambda name: engines[name]) as mock_load:
+            res = client.post('/api/predict/digit', json={'images': self.images})
+            self.assertEqual(res.status_code, 200)
+            result = res.json()
+            labels, probas = engines['digit'].predict_images(
+                [io.BytesIO(base64.b64decode(image)) for image in self.images])
+            self.assertListEqual(result['labels'], labels.tolist())
+            self.assertTrue(numpy.allclose(result['probabilities'], probas.T, atol=1e-6))
+
+            res = client.post('/api/predict/cat', json={'images': self.images[:2]})
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(len(res.json()['labels']), 2)
+            self.assertEqual(len(res.json()['probabilities'][0]), 1)
+
+            res = client.post('/api/predict/digit', json={'images': self.images[:1], 'imageType': 2})
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(mock_load.call_count, 2)
+
+            res = client.post('/api/predict/digit', json={'images': ['not an image']})
+            self.assertEqual(res.status_code, 400)
+            res = client.post('/api/predict/cat', json={'images': []})
+            self.assertEqual(res.status_code, 400)
+
+    def test_load_model_shared(self):
+        """
+        test ml.api.__predict :: load_model, with weights shared by the master process
+        """
+        from ml.api.__predict import load_model
+        from ml.common.weight_store import STORE
+
+        engines = self._engines()
+        network = STORE.load('digit', engines['digit'].parameters)
+        try:
+            engine = load_model('digit')
+            self.assertTrue(numpy.shares_memory(engine.parameters['W1'], network.buffer))
+            engine.close()
+        finally:
+            STORE.unload('digit')
+
+    def test_reload(self):
+        """
+        test ml.api.__predict :: get_batcher, predict_batch, with a replaced parameter file
+        """
+        import tempfile
+        from ml.api.__predict import REGISTRY, get_batcher, predict_batch
+        from ml.common.network import Network
+        from ml.common.param_file import save_network
+
+        numpy.random.seed(1)
+        x = numpy.random.rand(784, 3).astype(numpy.float32)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            param_file = os.path.join(temp_dir, 'saved_parameters.params')
+            network = Network([784, 12, 10], ['leaky_relu', 'softmax'])
+            network.buffer[...] = numpy.random.randn(network.buffer.size) * 0.1
+            save_network(param_file, network)
+            with patch('ml.api.__predict.model_file', return_value=param_file):
+                get_batcher('digit')
+            self.assertEqual(REGISTRY.versions(), {'digit': 1})
+
+            network.buffer[...] = numpy.random.randn(network.buffer.size) * 0.1
+            save_network(param_file, network)
+            self.assertListEqual(REGISTRY.check(), ['digit'])
+            self.assertEqual(REGISTRY.versions(), {'digit': 2})
+            labels, probas = predict_batch('digit', x)
+            self.assertTrue(numpy.allclose(probas, network.predict(x), atol=1e-5))
+            self.assertListEqual(labels.tolist(), numpy.argmax(probas, axis=0).tolist())
+
+    def test_reload_saved(self):
+        """
+        test ml.api.__predict :: get_batcher, with parameters saved over a legacy parameter file
+        """
+        import shutil
+        import tempfile
+        from ml.api.__predict import BATCHERS, REGISTRY, get_batcher, predict_batch
+        from ml.common.parameters import LEGACY_PARAM_FILE, Parameters
+
+        numpy.random.seed(1)
+        x = numpy.random.rand(784, 3).astype(numpy.float32)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(temp_dir, 'datasets'))
+            parameters = Parameters(temp_dir)
+            parameters.initialize_parameters_deep_he([784, 12, 10])
+            numpy.save(os.path.join(temp_dir, 'datasets', LEGACY_PARAM_FILE), parameters.get())
+            with patch.dict('ml.api.__predict.PACKAGES', {'digit': temp_dir}):
+                self.assertIs(get_batcher('digit'), get_batcher('digit'))
+                self.assertEqual(len(BATCHERS), 1)
+                self.assertListEqual(REGISTRY.changed(), [])
+
+                parameters.load()
+                parameters.initialize_parameters_deep_he([784, 12, 10])
+                parameters.save()
+                self.assertListEqual(REGISTRY.check(), ['digit'])
+                self.assertEqual(REGISTRY.versions(), {'digit': 2})
+                _, probas = predict_batch('digit', x)
+                self.assertTrue(numpy.allclose(probas, parameters.get_network().predict(x), atol=1e-5))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
@@ -55,3 +55,22 @@ def test_load(self):
         self.assertIsInstance(x_testing, numpy.ndarray)
         self.assertIsInstance(y_testing, numpy.ndarray)
         pass
+
+    def test_views(self):
+        """
+        test ml.classifier.data_svc :: DataSvc :: views
+        """
+        from ml.classifier.datasvc import DataSvc
+        svc = DataSvc()
+        svc.load()
+
+        with svc.views() as (trainings, tests_set):
+            h5_file = trainings['x'].data.file
+            self.assertTupleEqual(trainings['x'].shape, (64 * 64 * 3, 209))
+            self.assertTupleEqual(tests_set['x'].shape[1:], (tests_set['y'].shape[1],))
+            x = trainings['x'].columns(slice(0, 5))
+            expected = svc.trainings['x'][:5].reshape(5, -1).T / 255.
+            self.assertTrue(numpy.allclose(x, expected))
+            self.assertListEqual(trainings['y'].tolist(), svc.trainings['y'].tolist())
+        self.assertFalse(h5_file)
+
@@ -0,0 +1,101 @@
+"""
+# test_common_batcher.py
+
+"""
+import asyncio
+import logging
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class BatcherTests(unittest.TestCase):
+    """
+    BatcherTests includes all unit tests for ml.common.batcher module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.batches = []
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def _predict(self, x):
+        self.batches.append(x.shape[1])
+        return x[0].astype(int), x * 2
+
+    def test_submit(self):
+        """
+        test ml.common.batcher :: MicroBatcher :: submit
+        """
+        from ml.common.batcher import MicroBatcher
+
+        batcher = MicroBatcher(self._predict, max_batch_size=4, max_wait=0.05)
+
+        async def _requests():
+            requests = [numpy.array([[i], [i + 10]]) for i in range(6)]
+            requests.append(numpy.array([[6, 7], [16, 17]]))
+            return await asyncio.gather(*[batcher.submit(x) for x in requests])
+
+        results = asyncio.run(_requests())
+        self.assertListEqual(self.batches, [4, 4])
+        for i, (labels, probas) in enumerate(results[:6]):
+            self.assertListEqual(labels.tolist(), [i])
+            self.assertListEqual(probas.tolist(), [[2 * i], [2 * i + 20]])
+        self.assertListEqual(results[6][0].tolist(), [6, 7])
+
+        # a new event loop gets a new queue and worker
+        labels, _ = asyncio.run(batcher.submit(numpy.array([[9], [19]])))
+        self.assertListEqual(labels.tolist(), [9])
+        self.assertListEqual(self.batches, [4, 4, 1])
+
+        with self.assertRaises(ValueError):
+            MicroBatcher(self._predict, max_batch_size=0)
+
+    def test_submit_failure(self):
+        """
+        test ml.common.batcher :: MicroBatcher :: submit, with a failing prediction
+        """
+        from ml.common.batcher import MicroBatcher
+
+        def _predict(x):
+            raise ValueError('bad batch')
+
+        batcher = MicroBatcher(_predict, max_batch_size=4, max_wait=0.01)
+
+        async def _requests():
+            return await asyncio.gather(
+                batcher.submit(numpy.zeros((2, 1))), batcher.submit(numpy.zeros((2, 1))), return_exceptions=True)
+
+        results = asyncio.run(_requests())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_submit_mismatched(self):
+        """
+        test ml.common.batcher :: MicroBatcher :: submit, with inputs that cannot be batched together
+        """
+        from ml.common.batcher import MicroBatcher
+
+        batcher = MicroBatcher(self._predict, max_batch_size=4, max_wait=0.05)
+
+        async def _requests():
+            results = await asyncio.wait_for(asyncio.gather(
+                batcher.submit(numpy.zeros((2, 1))), batcher.submit(numpy.zeros((3, 1))),
+                return_exceptions=True), timeout=5)
+            # the worker keeps serving later requests
+            return results, await asyncio.wait_for(batcher.submit(numpy.array([[1], [2]])), timeout=5)
+
+        results, (labels, _) = asyncio.run(_requests())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertListEqual(labels.tolist(), [1])
+        with self.assertRaises(ValueError):
+            asyncio.run(batcher.submit(numpy.zeros(2)))
@@ -0,0 +1,104 @@
+"""
+# test_common_benchmark.py
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+TINY_CONFIGS = {'tiny': ([8, 4, 3], 16, 32)}
+
+
+class BenchmarkTests(unittest.TestCase):
+    """
+    BenchmarkTests includes all unit tests for ml.common.benchmark module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.temp_dir = tempfile.mkdtemp()
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        pass
+
+    def test_synthetic_data(self):
+        """test ml.common.benchmark.synthetic_data"""
+        import numpy as np
+        from ml.common.benchmark import synthetic_data
+
+        x, y = synthetic_data([8, 4, 3], 10, dtype=np.float32)
+        self.assertEqual(x.shape, (8, 10))
+        self.assertEqual(y.shape, (3, 10))
+        self.assertEqual(x.dtype, np.float32)
+        np.testing.assert_array_equal(np.sum(y, axis=0), np.ones(10))
+
+    def test_measure(self):
+        """test ml.common.benchmark.measure"""
+        from ml.common.benchmark import measure
+
+        calls = []
+        seconds, peak = measure(lambda: calls.append(bytearray(100000)), repeat=3)
+        self.assertEqual(len(calls), 5)  # warm-up, 3 timed calls, and a traced call
+        self.assertGreater(seconds, 0)
+        self.assertGreaterEqual(peak, 100000)
+
+    def test_run_benchmarks(self):
+        """test ml.common.benchmark.run_benchmarks"""
+        from ml.common.benchmark import format_results, run_benchmarks
+
+        results = run_benchmarks(TINY_CONFIGS, repeat=1)
+        self.assertEqual(results['meta']['dtype'], 'float64')
+        kernels = results['configs']['tiny']
+        for kernel in ['l_model_forward', 'l_model_predict', 'l_model_backward_with_l2',
+                       'compute_cost_with_l2_regularization', 'parameters_update', 'trainer_step', 'train_epoch']:
+            metrics = kernels[kernel]
+            self.assertGreater(metrics['seconds'], 0)
+            self.assertGreater(metrics['samples_per_sec'], 0)
+            self.assertGreaterEqual(metrics['peak_bytes'], 0)
+        self.assertAlmostEqual(kernels['train_epoch']['samples_per_sec'] * kernels['train_epoch']['seconds'], 32)
+        self.assertIn('train_epoch', format_results(results))
+
+    def test_compare(self):
+        """test ml.common.benchmark.compare"""
+        from ml.common.benchmark import compare
+
+        baseline = {'configs': {'a': {'k': {'seconds': 1., 'peak_bytes': 100}}}}
+        results = {'configs': {
+            'a': {'k': {'seconds': 1.1, 'peak_bytes': 100}, 'new': {'seconds': 9., 'peak_bytes': 9}},
+            'b': {'k': {'seconds': 9., 'peak_bytes': 9}},
+        }}
+        self.assertEqual(compare(results, baseline, tolerance=0.2), [])
+
+        results['configs']['a']['k'] = {'seconds': 1.5, 'peak_bytes': 200}
+        regressions = compare(results, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('a/k: seconds'))
+        self.assertTrue(regressions[1].startswith('a/k: peak_bytes'))
+
+    def test_main(self):
+        """test ml.common.benchmark.main saving and comparing baselines"""
+        from unittest.mock import patch
+        from ml.common import benchmark
+
+        baseline = os.path.join(self.temp_dir, 'baseline.json')
+        with patch.object(benchmark, 'CONFIGS', TINY_CONFIGS):
+            self.assertEqual(benchmark.main(['--repeat', '1', '--save', baseline]), 0)
+            self.assertEqual(benchmark.load_results(baseline)['configs'].keys(), {'tiny'})
+
+            results = benchmark.load_results(baseline)
+            for metrics in results['configs']['tiny'].values():
+                metrics['seconds'] /= 1000.
+            benchmark.save_results(results, baseline)
+            self.assertEqual(benchmark.main(['--repeat', '1', '--compare', baseline]), 1)
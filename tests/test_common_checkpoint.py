@@ -0,0 +1,115 @@
+"""
+# test_common_checkpoint.py
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class CheckpointTests(unittest.TestCase):
+    """
+    CheckpointTests includes all unit tests for ml.common.checkpoint module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.test_path = os.path.dirname(os.path.realpath(__file__))
+        self.temp_dir = tempfile.mkdtemp()
+        self.x = numpy.arange(20).reshape((2, 10)) / 20.
+        self.y = (numpy.arange(10).reshape((1, 10)) % 2).astype(float)
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        pass
+
+    def _trainer(self, callbacks=None):
+        from ml.common.parameters import Parameters
+        from ml.common.trainer import Trainer
+
+        numpy.random.seed(1)
+        parameters = Parameters(self.test_path, optimizer='adam')
+        parameters.initialize_parameters_deep_he([2, 3, 1])
+        return Trainer(parameters, learning_rate=0.1, print_cost=True, print_every=1, callbacks=callbacks)
+
+    def test_snapshot_restore(self):
+        """
+        test ml.common.checkpoint :: snapshot, restore
+        """
+        from ml.common.checkpoint import restore, snapshot
+        from ml.common.trainer import mini_batches
+
+        trainer = self._trainer()
+        trainer.train(mini_batches(self.x, self.y, 4, seed=1), num_epochs=2)
+        arrays = snapshot(trainer)
+        self.assertIn('param/W1', arrays)
+        self.assertIn('optimizer/v/W1', arrays)
+        self.assertIsNot(arrays['param/W1'], trainer.parameters.get()['W1'])
+
+        file_path = os.path.join(self.temp_dir, 'checkpoint.npz')
+        numpy.savez(file_path, **arrays)
+        state = numpy.random.get_state()
+
+        restored = self._trainer()
+        restore(restored, file_path)
+        self.assertEqual(restored.epoch, 2)
+        self.assertEqual(restored.iteration, 6)
+        self.assertListEqual(restored.costs, [float(cost) for cost in trainer.costs])
+        self.assertEqual(restored.parameters.optimizer.t, 6)
+        numpy.testing.assert_array_equal(numpy.random.get_state()[1], state[1])
+        numpy.testing.assert_array_equal(restored.parameters.get()['W1'], trainer.parameters.get()['W1'])
+
+    def test_resume(self):
+        """
+        test ml.common.checkpoint :: Checkpointer :: resume training
+        """
+        from ml.common.checkpoint import Checkpointer
+        from ml.common.trainer import mini_batches
+
+        source = mini_batches(self.x, self.y, 4, seed=1)
+        trainer = self._trainer()
+        trainer.train(source, num_epochs=6)
+
+        checkpointer = Checkpointer(self.temp_dir, every=2, keep=2)
+        self.assertIsNone(checkpointer.latest())
+        interrupted = self._trainer(callbacks=[checkpointer])
+        self.assertFalse(checkpointer.resume(interrupted))
+        interrupted.train(source, num_epochs=4)
+        # the epoch 2 snapshot may be replaced by the epoch 4 one before being written
+        files = sorted(os.listdir(self.temp_dir))
+        self.assertEqual(files[-1], 'checkpoint-00000012.npz')
+        self.assertTrue(set(files) <= {'checkpoint-00000006.npz', 'checkpoint-00000012.npz'})
+
+        resumed = self._trainer(callbacks=[Checkpointer(self.temp_dir, every=2)])
+        self.assertTrue(resumed.callbacks[0].resume(resumed))
+        self.assertEqual(resumed.epoch, 4)
+        resumed.train(source, num_epochs=6 - resumed.epoch)
+        self.assertEqual(resumed.iteration, trainer.iteration)
+        numpy.testing.assert_allclose(resumed.parameters.get()['W1'], trainer.parameters.get()['W1'])
+        self.assertListEqual(resumed.costs, [float(cost) for cost in trainer.costs])
+
+    def test_save_drops_pending(self):
+        """
+        test ml.common.checkpoint :: Checkpointer :: save keeps only the newest pending snapshot
+        """
+        from ml.common.checkpoint import Checkpointer
+
+        trainer = self._trainer()
+        checkpointer = Checkpointer(self.temp_dir, keep=5)
+        checkpointer._queue.put_nowait((0, {}))  # occupy the queue before the writer starts
+        checkpointer.save(trainer)
+        checkpointer.flush()
+        self.assertListEqual(os.listdir(self.temp_dir), ['checkpoint-00000000.npz'])
+        self.assertIn('param/W1', numpy.load(os.path.join(self.temp_dir, 'checkpoint-00000000.npz')).files)
@@ -0,0 +1,119 @@
+"""
+# test_common_datastream.py
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class DataStreamTests(unittest.TestCase):
+    """
+    DataStreamTests includes all unit tests for ml.common.datastream module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.temp_path = tempfile.mkdtemp()
+        self.data = numpy.random.RandomState(1).randint(0, 256, (11, 5))
+        self.data[:, 0] %= 3
+        self.csv_path = os.path.join(self.temp_path, 'data.csv')
+        numpy.savetxt(self.csv_path, self.data, fmt='%d', delimiter=',', header='label,p0,p1,p2,p3', comments='')
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        shutil.rmtree(self.temp_path)
+        pass
+
+    def test_count_rows(self):
+        """
+        test ml.common.datastream :: count_rows
+        """
+        from ml.common.datastream import count_rows
+
+        self.assertEqual(count_rows(self.csv_path), 11)
+        self.assertEqual(count_rows(self.csv_path, skip_header=0), 12)
+        with open(self.csv_path, 'a') as csv_file:
+            csv_file.write('1,2,3,4,5')
+        self.assertEqual(count_rows(self.csv_path), 12)
+
+    def test_iter(self):
+        """
+        test ml.common.datastream :: CsvStream :: __iter__
+        """
+        from ml.common.datastream import CsvStream
+
+        data_stream = CsvStream(self.csv_path, batch_size=4)
+        batches = list(data_stream)
+        self.assertListEqual([x.shape for x, _ in batches], [(4, 4), (4, 4), (4, 3)])
+        self.assertListEqual(numpy.hstack([x for x, _ in batches]).tolist(), self.data[:, 1:].T.tolist())
+        self.assertListEqual(numpy.hstack([y for _, y in batches]).tolist(), [self.data[:, 0].tolist()])
+        self.assertTrue(batches[0][0].flags['C_CONTIGUOUS'])
+        # re-iterable for every epoch
+        self.assertEqual(len(list(data_stream)), 3)
+
+        x, y = next(iter(CsvStream(self.csv_path, batch_size=20, rows=(2, 5), num_classes=3, scale=255.)))
+        self.assertTrue(numpy.allclose(x, self.data[2:5, 1:].T / 255.))
+        self.assertListEqual(y.argmax(axis=0).tolist(), self.data[2:5, 0].tolist())
+        self.assertListEqual(y.sum(axis=0).tolist(), [1, 1, 1])
+
+        with self.assertRaises(ValueError):
+            CsvStream(self.csv_path, batch_size=0)
+
+    def test_split(self):
+        """
+        test ml.common.datastream :: CsvStream :: split
+        """
+        from ml.common.datastream import CsvStream
+        from ml.common.parameters import Parameters
+        from ml.common.trainer import Trainer
+
+        data_stream = CsvStream(self.csv_path, batch_size=3, num_classes=3, scale=255.)
+        train, test = data_stream.split(ratio=0.8)
+        self.assertTupleEqual(train.rows, (0, 9))
+        self.assertTupleEqual(test.rows, (9, 11))
+        self.assertEqual(sum(x.shape[1] for x, _ in train), 9)
+        self.assertEqual(sum(x.shape[1] for x, _ in test), 2)
+
+        train, test = data_stream.split(ranges=((1, 5), (6, None)))
+        self.assertEqual(sum(x.shape[1] for x, _ in train), 4)
+        self.assertEqual(sum(x.shape[1] for x, _ in test), 5)
+
+        with self.assertRaises(ValueError):
+            data_stream.split()
+
+        parameters = Parameters()
+        parameters.initialize_parameters_deep_he([4, 3, 3])
+        trainer = Trainer(parameters, print_cost=True, print_every=1)
+        trainer.train(train, num_epochs=2)
+        self.assertEqual(len(trainer.costs), 2)
+        self.assertEqual(trainer.iteration, 4)
+
+    def test_digit_stream(self):
+        """
+        test ml.digit_recognizer.datasvc :: DataSvc :: stream
+        """
+        from ml.digit_recognizer.datasvc import DataSvc
+
+        os.makedirs(os.path.join(self.temp_path, 'datasets'))
+        shutil.copy(self.csv_path, os.path.join(self.temp_path, 'datasets', 'train.csv'))
+        svc = DataSvc(self.temp_path)
+        train, test = svc.stream(batch_size=5)
+        self.assertTupleEqual(train.rows, (1, 39999))
+        self.assertTupleEqual(test.rows, (40000, None))
+        self.assertEqual(sum(x.shape[1] for x, _ in train), 10)
+        self.assertListEqual(list(test), [])
+
+        train, test = svc.stream(ratio=0.5)
+        self.assertTupleEqual(test.rows, (6, 11))
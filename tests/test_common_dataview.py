@@ -0,0 +1,74 @@
+"""
+# test_common_dataview.py
+
+"""
+import logging
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class DataViewTests(unittest.TestCase):
+    """
+    DataViewTests includes all unit tests for ml.common.dataview module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        rng = numpy.random.RandomState(1)
+        self.data = rng.randint(0, 256, (7, 2, 2, 3)).astype(numpy.uint8)
+        self.y = rng.randint(0, 2, (1, 7))
+        self.x = self.data.reshape(7, -1).T / 255.
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def test_columns(self):
+        """
+        test ml.common.dataview :: DataView :: columns
+        """
+        from ml.common.dataview import DataView
+
+        view = DataView(self.data, scale=255.)
+        self.assertEqual(view.m, 7)
+        self.assertTupleEqual(view.shape, (12, 7))
+        self.assertTrue(numpy.allclose(view.columns(slice(2, 5)), self.x[:, 2:5]))
+        self.assertTrue(numpy.allclose(view.columns(numpy.array([0, 3, 6])), self.x[:, [0, 3, 6]]))
+
+        view = DataView(self.data, dtype='float32')
+        columns = view.columns(slice(0, 2))
+        self.assertEqual(columns.dtype, numpy.float32)
+        self.assertListEqual(columns.tolist(), self.data[:2].reshape(2, -1).T.tolist())
+
+    def test_view_mini_batches(self):
+        """
+        test ml.common.dataview :: view_mini_batches
+        """
+        from ml.common.dataview import DataView, view_mini_batches
+
+        view = DataView(self.data, scale=255.)
+        batches = list(view_mini_batches(view, self.y, 3, shuffle=False)(0))
+        self.assertListEqual([x.shape[1] for x, _ in batches], [3, 3, 1])
+        self.assertTrue(numpy.allclose(numpy.hstack([x for x, _ in batches]), self.x))
+
+        data_source = view_mini_batches(view, self.y, 3, seed=1)
+        batches = list(data_source(0))
+        x = numpy.hstack([x for x, _ in batches])
+        y = numpy.hstack([y for _, y in batches])
+        order = [numpy.where(numpy.all(numpy.isclose(self.x, x[:, [i]]), axis=0))[0][0] for i in range(7)]
+        self.assertListEqual(sorted(order), list(range(7)))
+        self.assertListEqual(y.tolist(), self.y[:, order].tolist())
+        # same epoch, same batches
+        self.assertTrue(numpy.allclose(numpy.hstack([x for x, _ in data_source(0)]), x))
+
+        batches = list(view_mini_batches(view, self.y, None)(0))
+        self.assertEqual(len(batches), 1)
+        self.assertTrue(numpy.allclose(batches[0][0], self.x))
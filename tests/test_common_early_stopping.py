@@ -0,0 +1,94 @@
+"""
+# test_common_early_stopping.py
+
+"""
+import logging
+import os
+import unittest
+import numpy
+
+from mock import MagicMock
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class EarlyStoppingTests(unittest.TestCase):
+    """
+    EarlyStoppingTests includes all unit tests for ml.common.early_stopping module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.test_path = os.path.dirname(os.path.realpath(__file__))
+        rng = numpy.random.RandomState(0)
+        self.x = rng.rand(4, 60)
+        self.labels = (self.x[:1] + self.x[1:2] > 1.).astype(numpy.int64) + (self.x[2:3] > 0.5)
+        self.y = (self.labels == numpy.arange(3).reshape(-1, 1)).astype(float)
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def test_evaluate(self):
+        """
+        test ml.common.early_stopping :: EarlyStopping :: evaluate
+        """
+        from ml.common.early_stopping import EarlyStopping
+        from ml.common.network import Network
+
+        network = Network.from_parameters({
+            'W1': numpy.zeros((3, 4)), 'b1': numpy.array([[-1.], [1.], [0.]])}, ['sigmoid'])
+        al, _ = network.forward(self.x)
+        expected_cost = -numpy.sum(self.y * numpy.log(al) + (1 - self.y) * numpy.log(1 - al)) / 60
+        expected_accuracy = numpy.mean(self.labels == 1)
+
+        for y in (self.y, self.labels):
+            cost, accuracy = EarlyStopping(self.x, y, batch_size=7).evaluate(network)
+            self.assertAlmostEqual(cost, expected_cost)
+            self.assertAlmostEqual(accuracy, expected_accuracy)
+
+        # binary output
+        network = Network.from_parameters({'W1': numpy.zeros((1, 4)), 'b1': numpy.ones((1, 1))})
+        cost, accuracy = EarlyStopping(self.x, self.labels.clip(0, 1)).evaluate(network)
+        self.assertAlmostEqual(accuracy, numpy.mean(self.labels > 0))
+        with self.assertRaises(ValueError):
+            EarlyStopping(self.x, self.y, monitor='foobar')
+
+    def test_early_stopping(self):
+        """
+        test ml.common.early_stopping :: EarlyStopping :: stop on plateau and restore the best parameters
+        """
+        from ml.common.early_stopping import EarlyStopping
+        from ml.common.parameters import Parameters
+        from ml.common.trainer import Trainer
+
+        parameters = Parameters(self.test_path)
+        parameters.initialize_parameters_deep_he([4, 3])
+        early_stopping = EarlyStopping(self.x, self.y, every=2, patience=2)
+        scores = iter([(1., 0.5), (1., 0.7), (1., 0.6), (1., 0.7), (1., 0.9)])
+        early_stopping.evaluate = MagicMock(side_effect=lambda network: next(scores))
+        trainer = Trainer(parameters, learning_rate=0.5, callbacks=[early_stopping])
+        best = {}
+
+        def _keep_best(trainer, cost):
+            if trainer.epoch == 4:
+                best.update({key: val.copy() for key, val in trainer.parameters.get().items()})
+        trainer.callbacks.insert(0, MagicMock(on_epoch_end=_keep_best))
+
+        trainer.train([(self.x, self.y)], num_epochs=20)
+        self.assertEqual(trainer.epoch, 8)
+        self.assertEqual(early_stopping.best_epoch, 4)
+        self.assertListEqual([h[0] for h in early_stopping.history], [2, 4, 6, 8])
+        for key, val in best.items():
+            numpy.testing.assert_array_equal(parameters.get()[key], val)
+
+        # stop_training is reset by the next training
+        early_stopping.evaluate = MagicMock(return_value=(1., 1.))
+        trainer.train([(self.x, self.y)], num_epochs=2)
+        self.assertEqual(trainer.epoch, 10)
@@ -0,0 +1,109 @@
+"""
+# test_common_evaluation.py
+
+"""
+import logging
+import unittest
+import numpy as np
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class EvaluationTests(unittest.TestCase):
+    """
+    EvaluationTests includes all unit tests for ml.common.evaluation module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.probas = np.array([
+            [0.7, 0.1, 0.2, 0.3, 0.15],
+            [0.2, 0.6, 0.5, 0.3, 0.1],
+            [0.1, 0.3, 0.3, 0.4, 0.75],
+        ])
+        self.labels = np.array([[0, 1, 2, 0, 1]])
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def test_update(self):
+        """test ml.common.evaluation.Evaluation metrics"""
+        from ml.common.evaluation import Evaluation
+
+        evaluation = Evaluation(3, top_k=(1, 2, 5))
+        self.assertEqual(evaluation.top_k, (1, 2, 3))
+        self.assertEqual(evaluation.accuracy(), 0.)
+        evaluation.update(self.probas[:, :2], self.labels[:, :2])
+        evaluation.update(self.probas[:, 2:], np.eye(3)[:, self.labels[0, 2:]])  # one-hot answers
+
+        np.testing.assert_array_equal(evaluation.confusion, [[1, 0, 1], [0, 1, 1], [0, 1, 0]])
+        self.assertEqual(evaluation.count, 5)
+        self.assertAlmostEqual(evaluation.accuracy(), 2 / 5.)
+        self.assertAlmostEqual(evaluation.top_k_accuracy(1), 2 / 5.)
+        # ranks of true classes: 0, 0, 1, 1, 2
+        self.assertAlmostEqual(evaluation.top_k_accuracy(2), 4 / 5.)
+        self.assertAlmostEqual(evaluation.top_k_accuracy(3), 1.)
+        np.testing.assert_allclose(evaluation.precision(), [1., 0.5, 0.])
+        np.testing.assert_allclose(evaluation.recall(), [0.5, 0.5, 0.])
+        np.testing.assert_allclose(evaluation.f1(), [2 / 3., 0.5, 0.])
+
+        summary = evaluation.summary()
+        self.assertEqual(summary['support'], [2, 2, 1])
+        self.assertEqual(summary['top_k_accuracy'][2], 0.8)
+        self.assertIn('top-2 accuracy: 0.8000', evaluation.report())
+
+    def test_update_binary(self):
+        """test ml.common.evaluation.Evaluation with a single sigmoid output"""
+        from ml.common.evaluation import Evaluation
+
+        evaluation = Evaluation(2)
+        evaluation.update(np.array([[0.9, 0.2, 0.6, 0.4]]), np.array([[1, 0, 0, 0]]))
+        np.testing.assert_array_equal(evaluation.confusion, [[2, 1], [0, 1]])
+        self.assertAlmostEqual(evaluation.accuracy(), 0.75)
+
+    def test_update_errors(self):
+        """test ml.common.evaluation.Evaluation with invalid inputs"""
+        from ml.common.evaluation import Evaluation
+
+        with self.assertRaises(ValueError):
+            Evaluation(1)
+        evaluation = Evaluation(3)
+        with self.assertRaises(ValueError):
+            evaluation.update(self.probas[:2], self.labels)
+        with self.assertRaises(ValueError):
+            evaluation.update(self.probas, self.labels + 1)
+
+    def test_evaluate(self):
+        """test ml.common.evaluation.evaluate in chunks"""
+        from ml.common.evaluation import evaluate, evaluate_batches
+        from ml.common.mathEx import l_model_forward
+        from ml.common.parameters import Parameters
+
+        rng = np.random.RandomState(1)
+        x = rng.rand(6, 23)
+        y = rng.randint(4, size=(1, 23))
+        parameters = Parameters()
+        parameters.initialize_parameters_deep_he([6, 5, 4])
+
+        al, _ = l_model_forward(x, parameters.get())
+        predictions = np.argmax(al, axis=0)
+        expected = np.zeros((4, 4), dtype=np.int64)
+        np.add.at(expected, (y[0], predictions), 1)
+
+        for model in [parameters, parameters.get(), parameters.get_network()]:
+            evaluation = evaluate(model, x, y, batch_size=5, top_k=(1, 4))
+            np.testing.assert_array_equal(evaluation.confusion, expected)
+            self.assertAlmostEqual(evaluation.accuracy(), np.mean(predictions == y[0]))
+            self.assertEqual(evaluation.top_k_accuracy(4), 1.)
+
+        batches = [(x[:, :10], y[:, :10]), (x[:, 10:], y[:, 10:])]
+        np.testing.assert_array_equal(evaluate_batches(parameters, batches).confusion, expected)
+        with self.assertRaises(ValueError):
+            evaluate(parameters, x, y, batch_size=0)
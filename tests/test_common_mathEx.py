@@ -11,6 +11,7 @@
     change_to_multi_class, \
     compute_cost, \
     compute_cost_with_l2_regularization, \
+    cross_entropy_cost, \
     leaky_relu, \
     leaky_relu_backward, \
     l_model_forward, \
@@ -19,7 +20,14 @@
     relu, \
     relu_backward, \
     sigmoid, \
-    sigmoid_backward
+    sigmoid_backward, \
+    sigmoid_backward_from_activation, \
+    sigmoid_cross_entropy_backward, \
+    sigmoid_cross_entropy_with_logits, \
+    softmax, \
+    softmax_backward_from_activation, \
+    softmax_cross_entropy_backward, \
+    softmax_cross_entropy_with_logits
 from ml.utils.logger import get_logger
 
 LOGGER = get_logger(__name__)
@@ -65,6 +73,11 @@ def test_change_to_multi_class(self):
             result = change_to_multi_class(numpy.array(y))
             self.assertListEqual(result.tolist(), expected)
 
+        # integral float labels keep their classes; others go to class 0
+        result = change_to_multi_class(numpy.array([[2., 0.5, -1., 1.]]), num_classes=4, dtype=numpy.float32)
+        self.assertEqual(result.dtype, numpy.float32)
+        self.assertListEqual(result.tolist(), [[0, 1, 1, 0], [0, 0, 0, 1], [1, 0, 0, 0], [0, 0, 0, 0]])
+
     def test_compute_cost(self):
         """
         test ml.common.mathEx.compute_cost
@@ -105,7 +118,7 @@ def test_compute_cost_with_l2_regularization(self):
             "y": [[0.2, 0.3, 0.4, 0.5], [0.3, 0.4, 0.5, 0.6]],
             "parameters": {"W1": 1, "W2": 2, "W3": 3, "W4": 4},
             "lambd": 0.075,
-            "result": 3.3157189245595067,
+            "result": 1.6289262780044234,
         }, {
             "al": [[0.5]],
             "y": [[0.6]],
@@ -249,22 +262,22 @@ def test_leaky_relu_backward(self):
         tests = [{
             "da": [[1], [2], [3], [4]],
             "cache": [[1], [-1], [1], [0]],
-            "result": [[1], [0], [3], [0]],
+            "result": [[1], [0.02], [3], [0.04]],
         }, {
             "da": [[1]],
             "cache": [[-1]],
-            "result": [[0]],
+            "result": [[0.01]],
         }, {
             "da": [[1]],
             "cache": [[0]],
-            "result": [[0]],
+            "result": [[0.01]],
         }]
         for test in tests:
             da = test["da"]
             cache = test["cache"]
             expected = test["result"]
             test = leaky_relu_backward(numpy.array(da), numpy.array(cache))
-            self.assertListEqual(test.tolist(), expected)
+            self.assertTrue(numpy.allclose(test, expected))
 
     def test_sigmoid(self):
         """
@@ -433,6 +446,98 @@ def test_l_model_backward_with_l2(self):
                 result["db" + str(i + 1)] = result["db" + str(i + 1)].tolist()
             self.assertDictEqual(result, expected)
 
+    def test_sigmoid_cross_entropy(self):
+        """
+        test ml.common.mathEx.sigmoid_cross_entropy_with_logits, sigmoid_cross_entropy_backward
+        """
+        rng = numpy.random.RandomState(1)
+        z = rng.randn(3, 8)
+        y = (rng.rand(3, 8) > 0.5).astype(float)
+        al, _ = sigmoid(z)
+        expected = -numpy.sum(y * numpy.log(al) + (1 - y) * numpy.log(1 - al)) / 8
+        self.assertAlmostEqual(sigmoid_cross_entropy_with_logits(z, y), expected)
+        self.assertAlmostEqual(sigmoid_cross_entropy_with_logits(z[:1], y[:1]), compute_cost(al[:1], y[:1]))
+        self.assertAlmostEqual(cross_entropy_cost(al, y), expected)
+        self.assertAlmostEqual(cross_entropy_cost(al[:1], y[:1]), compute_cost(al[:1], y[:1]))
+
+        # no overflow at saturation: a confident wrong answer costs |z|
+        z = numpy.array([[1000., -1000., 1000.]])
+        y = numpy.array([[1., 0., 0.]])
+        self.assertAlmostEqual(sigmoid_cross_entropy_with_logits(z, y), 1000. / 3)
+        al, _ = sigmoid(z)
+        self.assertListEqual(sigmoid_cross_entropy_backward(al, y).tolist(), [[0., 0., 1.]])
+
+        # same as cross-entropy gradient through sigmoid, without divisions
+        al = numpy.array([[0.2, 0.7], [0.9, 0.4]])
+        y = numpy.array([[0., 1.], [1., 0.]])
+        dal = -(y / al - (1 - y) / (1 - al))
+        out = numpy.empty_like(al)
+        dz = sigmoid_cross_entropy_backward(al, y, out=out)
+        self.assertIs(dz, out)
+        self.assertTrue(numpy.allclose(dz, sigmoid_backward_from_activation(dal, al)))
+
+    def test_softmax(self):
+        """
+        test ml.common.mathEx.softmax, softmax_backward_from_activation
+        """
+        z = numpy.array([[1., 1000.], [2., 1000.], [3., -1000.]])
+        a, cache = softmax(z)
+        self.assertIs(cache, z)
+        self.assertTrue(numpy.allclose(a[:, 0], numpy.exp([1., 2., 3.]) / numpy.sum(numpy.exp([1., 2., 3.]))))
+        self.assertListEqual(a[:, 1].tolist(), [0.5, 0.5, 0.])
+
+        # gradient through the jacobian diag(a) - a a.T of every sample
+        rng = numpy.random.RandomState(1)
+        z, da = rng.randn(3, 4), rng.randn(3, 4)
+        a, _ = softmax(z)
+        dz = softmax_backward_from_activation(da, a)
+        for i in range(4):
+            jacobian = numpy.diag(a[:, i]) - numpy.outer(a[:, i], a[:, i])
+            self.assertTrue(numpy.allclose(dz[:, i], jacobian.dot(da[:, i])))
+
+    def test_softmax_cross_entropy(self):
+        """
+        test ml.common.mathEx.softmax_cross_entropy_with_logits, softmax_cross_entropy_backward
+        """
+        rng = numpy.random.RandomState(1)
+        z = rng.randn(4, 6)
+        labels = numpy.array([[0, 3, 1, 1, 2, 0]])
+        one_hot = change_to_multi_class(labels, num_classes=4)
+        a, _ = softmax(z)
+        expected = -numpy.sum(one_hot * numpy.log(a)) / 6
+        for y in (labels, labels[0], labels.astype(float), one_hot):
+            self.assertAlmostEqual(softmax_cross_entropy_with_logits(z, y), expected)
+            self.assertTrue(numpy.allclose(softmax_cross_entropy_backward(a, y), a - one_hot))
+
+        # no overflow at saturation
+        z = numpy.array([[1000., -1000.], [-1000., 1000.]])
+        self.assertAlmostEqual(softmax_cross_entropy_with_logits(z, numpy.array([[0, 0]])), 1000.)
+        out = numpy.empty_like(z)
+        self.assertIs(softmax_cross_entropy_backward(softmax(z)[0], numpy.array([[0, 1]]), out=out), out)
+        self.assertListEqual(out.tolist(), [[0., 0.], [0., 0.]])
+
+    def test_linear_activation_predict(self):
+        """
+        test ml.common.mathEx :: linear_activation_predict
+        """
+        from ml.common.mathEx import linear_activation_forward, linear_activation_predict, softmax
+
+        rng = numpy.random.RandomState(2)
+        a_prev, w, b = rng.randn(4, 6), rng.randn(3, 4), rng.randn(3, 1)
+        for activation in ['leaky_relu', 'sigmoid']:
+            expected, _ = linear_activation_forward(a_prev, w, b, activation)
+            self.assertTrue(numpy.allclose(linear_activation_predict(a_prev, w, b, activation), expected))
+            out, scratch = numpy.empty((3, 6)), numpy.empty((3, 6))
+            a = linear_activation_predict(a_prev, w, b, activation, out=out, scratch=scratch)
+            self.assertIs(a, out)
+            self.assertTrue(numpy.allclose(a, expected))
+
+        z = w.dot(a_prev) + b
+        self.assertTrue(numpy.allclose(linear_activation_predict(a_prev, w, b, 'relu'), numpy.maximum(z, 0)))
+        self.assertTrue(numpy.allclose(linear_activation_predict(a_prev, w, b, 'softmax'), softmax(z)[0]))
+        with self.assertRaises(ValueError):
+            linear_activation_predict(a_prev, w, b, 'tanh')
+
     def test_one_vs_all_prediction(self):
         """
         test ml.common.mathEx.one_vs_all_prediction
@@ -450,3 +555,50 @@ def test_one_vs_all_prediction(self):
             expected = test["result"]
             result = one_vs_all_prediction(numpy.array(prob_matrix))
             self.assertListEqual(result.tolist(), expected)
+
+    def test_sigmoid_backward_from_activation(self):
+        """
+        test ml.common.mathEx.sigmoid_backward_from_activation
+        @return:
+        """
+        da = numpy.array([[-0.5, 0.75]])
+        z = numpy.array([[0, 0.5]])
+        a, _ = sigmoid(z)
+        expected = sigmoid_backward(da, z)
+        result = sigmoid_backward_from_activation(da, a)
+        self.assertTrue(numpy.allclose(result, expected))
+
+        out = numpy.empty_like(a)
+        result = sigmoid_backward_from_activation(da, a, out=out)
+        self.assertIs(result, out)
+        self.assertTrue(numpy.allclose(out, expected))
+
+    def test_kernels_out(self):
+        """
+        test ml.common.mathEx kernels writing into `out` buffers
+        @return:
+        """
+        from ml.common.mathEx import linear_forward
+
+        z = numpy.array([[-2., -0.5, 0., 0.5, 2.]])
+        da = numpy.array([[1., 2., 3., 4., 5.]])
+        out = numpy.empty_like(z)
+
+        tests = [
+            (lambda o: leaky_relu(z, out=o)[0], leaky_relu(z)[0]),
+            (lambda o: sigmoid(z, out=o)[0], sigmoid(z)[0]),
+            (lambda o: leaky_relu_backward(da, z, out=o), leaky_relu_backward(da, z)),
+        ]
+        for func, expected in tests:
+            result = func(out)
+            self.assertIs(result, out)
+            self.assertTrue(numpy.allclose(result, expected))
+
+        a = numpy.array([[1., 2.], [3., 4.]])
+        w = numpy.array([[1., -1.]])
+        b = numpy.array([[0.5]])
+        out = numpy.empty((1, 2))
+        result, cache = linear_forward(a, w, b, out=out)
+        self.assertIs(result, out)
+        self.assertListEqual(result.tolist(), [[-1.5, -1.5]])
+        self.assertIs(cache[0], a)
@@ -0,0 +1,175 @@
+"""
+# test_common_model_registry.py
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class _Engine:
+    def __init__(self, network):
+        self.network = network
+        self.closed = False
+
+    def predict(self, x):
+        return self.network.predict(x).copy()
+
+    def close(self):
+        self.closed = True
+
+
+class ModelRegistryTests(unittest.TestCase):
+    """
+    ModelRegistryTests includes all unit tests for ml.common.model_registry module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        from ml.common.network import Network
+
+        numpy.random.seed(1)
+        self.temp_dir = tempfile.mkdtemp()
+        self.param_file = os.path.join(self.temp_dir, 'saved_parameters.params')
+        self.network = Network([6, 5, 3], ['leaky_relu', 'softmax'])
+        self.x = numpy.random.rand(6, 4)
+        self._save()
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        pass
+
+    def _save(self):
+        from ml.common.param_file import save_network
+        self.network.buffer[...] = numpy.random.randn(self.network.buffer.size)
+        save_network(self.param_file, self.network)
+
+    @staticmethod
+    def _load(path):
+        from ml.common.param_file import load_network
+        return _Engine(load_network(path))
+
+    def test_file_signature(self):
+        """
+        test ml.common.model_registry :: file_signature
+        """
+        from ml.common.model_registry import file_signature
+
+        signature = file_signature(self.param_file)
+        self.assertEqual(signature, file_signature(self.param_file))
+        self._save()
+        self.assertNotEqual(signature, file_signature(self.param_file))
+        self.assertIsNone(file_signature(os.path.join(self.temp_dir, 'missing')))
+
+    def test_register(self):
+        """
+        test ml.common.model_registry :: ModelRegistry :: register, get, use, unregister
+        """
+        from ml.common.model_registry import ModelRegistry
+
+        with ModelRegistry() as registry:
+            version = registry.register('test', self.param_file, self._load)
+            self.assertIn('test', registry)
+            self.assertListEqual(registry.names(), ['test'])
+            self.assertIs(registry.get('test'), version)
+            self.assertEqual(version.version, 1)
+            with registry.use('test') as engine:
+                self.assertTrue(numpy.allclose(engine.predict(self.x), self.network.predict(self.x)))
+            self.assertEqual(version.readers, 0)
+            registry.unregister('test')
+            self.assertTrue(version.model.closed)
+            self.assertIsNone(registry.get('test'))
+            with self.assertRaises(KeyError):
+                registry.acquire('test')
+            with self.assertRaises(KeyError):
+                registry.reload('test')
+
+    def test_reload(self):
+        """
+        test ml.common.model_registry :: ModelRegistry :: check, reload, history
+        """
+        from ml.common.model_registry import ModelRegistry
+
+        swaps = []
+        registry = ModelRegistry(callbacks=[lambda old, new: swaps.append((old, new))], max_history=2)
+        first = registry.register('test', self.param_file, self._load)
+        self.assertListEqual(registry.check(), [])
+
+        # a request in flight keeps the first version while it is swapped
+        reader = registry.acquire('test')
+        self._save()
+        self.assertListEqual(registry.changed(), ['test'])
+        self.assertListEqual(registry.check(), ['test'])
+        second = registry.get('test')
+        self.assertEqual(registry.versions(), {'test': 2})
+        self.assertIs(reader, first)
+        self.assertTrue(first.retired)
+        self.assertFalse(first.model.closed)
+        self.assertFalse(numpy.allclose(first.model.predict(self.x), second.model.predict(self.x)))
+        self.assertTrue(numpy.allclose(second.model.predict(self.x), self.network.predict(self.x)))
+        reader.release()
+        self.assertTrue(first.model.closed)
+        self.assertFalse(first.acquire())
+        self.assertEqual(swaps, [(None, first), (first, second)])
+
+        # a broken file keeps the current version, and is not retried until changed again
+        with open(self.param_file, 'wb') as param_file:
+            param_file.write(b'broken')
+        self.assertListEqual(registry.check(), [])
+        self.assertListEqual(registry.changed(), [])
+        self.assertIs(registry.get('test'), second)
+
+        self._save()
+        self.assertListEqual(registry.check(), ['test'])
+        self.assertListEqual([info['version'] for info in registry.history('test')], [2, 3])
+        registry.close()
+        self.assertListEqual(registry.names(), [])
+        self.assertTrue(second.model.closed)
+
+    def test_created(self):
+        """
+        test ml.common.model_registry :: ModelRegistry :: check, with a file created after registering
+        """
+        from ml.common.model_registry import ModelRegistry
+
+        path = os.path.join(self.temp_dir, 'new.params')
+        with ModelRegistry() as registry:
+            first = registry.register('test', path, self._load, model=_Engine(self.network))
+            self.assertIsNone(first.signature)
+            self.assertListEqual(registry.check(), [])
+            os.replace(self.param_file, path)
+            self.assertListEqual(registry.check(), ['test'])
+            self.assertEqual(registry.versions(), {'test': 2})
+
+    def test_watch(self):
+        """
+        test ml.common.model_registry :: ModelRegistry :: start, stop
+        """
+        from ml.common.model_registry import ModelRegistry
+
+        reloaded = threading.Event()
+        registry = ModelRegistry(callbacks=[lambda old, new: old is not None and reloaded.set()])
+        registry.register('test', self.param_file, self._load)
+        with self.assertRaises(ValueError):
+            registry.start(0)
+        registry.start(0.01)
+        registry.start(0.01)  # already running
+        try:
+            self._save()
+            self.assertTrue(reloaded.wait(5))
+            self.assertEqual(registry.versions(), {'test': 2})
+        finally:
+            registry.close()
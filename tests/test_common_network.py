@@ -0,0 +1,166 @@
+"""
+# test_common_network.py
+
+"""
+import logging
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class NetworkTests(unittest.TestCase):
+    """
+    NetworkTests includes all unit tests for ml.common.network module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        from ml.common.parameters import Parameters
+
+        obj = Parameters()
+        obj.initialize_parameters_deep_he([6, 5, 4, 3])
+        self.parameters = obj.get()
+        rng = numpy.random.RandomState(1)
+        for key in self.parameters:
+            if key.startswith('b'):
+                self.parameters[key] = rng.randn(*self.parameters[key].shape)
+        self.x = rng.rand(6, 20)
+        self.y = (rng.rand(3, 20) > 0.5).astype(float)
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def test_from_parameters(self):
+        """
+        test ml.common.network :: Network :: from_parameters, to_parameters
+        """
+        from ml.common.network import Network
+
+        network = Network.from_parameters(self.parameters)
+        self.assertListEqual(network.layer_dims, [6, 5, 4, 3])
+        self.assertListEqual(network.activations, ['leaky_relu', 'leaky_relu', 'sigmoid'])
+        self.assertEqual(network.buffer.shape, (6 * 5 + 5 * 4 + 4 * 3 + 5 + 4 + 3,))
+
+        parameters = network.to_parameters()
+        self.assertListEqual(list(parameters), ['W1', 'b1', 'W2', 'b2', 'W3', 'b3'])
+        for key in parameters:
+            self.assertListEqual(parameters[key].tolist(), self.parameters[key].tolist())
+            self.assertTrue(numpy.shares_memory(parameters[key], network.buffer))
+
+        # in-place update of the dict views is seen by the network
+        parameters['W2'] -= 1
+        self.assertListEqual(network.layers[1].w.tolist(), (self.parameters['W2'] - 1).tolist())
+
+        self.assertAlmostEqual(
+            network.l2_square_sum(),
+            sum(numpy.sum(numpy.square(parameters['W' + str(l)])) for l in range(1, 4)))
+
+        with self.assertRaises(ValueError):
+            Network([2, 1], buffer=numpy.zeros(5))
+        with self.assertRaises(ValueError):
+            Network([2, 1], activations=['tanh'])
+
+    def test_propagation(self):
+        """
+        test ml.common.network :: Network :: forward, backward
+        """
+        from ml.common.mathEx import \
+            compute_cost_with_l2_regularization, \
+            l_model_backward_with_l2, \
+            l_model_forward
+        from ml.common.network import Network
+        from ml.common.workspace import Workspace
+
+        al, caches = l_model_forward(self.x, self.parameters)
+        grads = l_model_backward_with_l2(al, self.y, caches, 0.3)
+        cost = compute_cost_with_l2_regularization(al, self.y, self.parameters, 0.3)
+
+        network = Network.from_parameters(self.parameters)
+        workspace = Workspace.from_parameters(self.parameters, 20)
+        for ws in (None, workspace):
+            al_net, caches_net = network.forward(self.x, ws)
+            grads_net = network.backward(al_net, self.y, caches_net, 0.3, ws)
+            self.assertTrue(numpy.allclose(al, al_net))
+            for key in grads_net:
+                self.assertTrue(numpy.allclose(grads[key], grads_net[key]), key)
+            self.assertAlmostEqual(network.compute_cost_with_l2_regularization(al_net, self.y, 0.3), cost)
+            self.assertAlmostEqual(network.compute_cost_with_l2_regularization(al_net, self.y, 0.3, caches_net), cost)
+        self.assertIn('dA0', network.backward(al, self.y, caches, 0.3))
+
+    def test_softmax_network(self):
+        """
+        test ml.common.network :: Network :: softmax output with integer labels
+        """
+        from ml.common.network import Network
+        from ml.common.workspace import Workspace
+
+        network = Network.from_parameters(self.parameters, ['leaky_relu', 'leaky_relu', 'softmax'])
+        labels = numpy.argmax(self.y, axis=0).reshape(1, -1)
+        al, caches = network.forward(self.x)
+        self.assertTrue(numpy.allclose(numpy.sum(al, axis=0), 1.))
+        cost = network.compute_cost_with_l2_regularization(al, labels, 0.3, caches)
+        self.assertAlmostEqual(network.compute_cost_with_l2_regularization(al, labels, 0.3), cost)
+
+        # gradients match finite differences of the cost
+        grads = network.backward(al, labels, caches, 0.3)
+        workspace = Workspace.from_parameters(self.parameters, 20)
+        al_ws, caches_ws = network.forward(self.x, workspace)
+        grads_ws = network.backward(al_ws, labels, caches_ws, 0.3, workspace)
+        w = network.layers[0].w
+        for index in ((0, 0), (3, 5), (4, 2)):
+            original = w[index]
+            w[index] = original + 1e-6
+            cost_plus = network.compute_cost_with_l2_regularization(*network.forward(self.x)[:1], labels, 0.3)
+            w[index] = original - 1e-6
+            cost_minus = network.compute_cost_with_l2_regularization(*network.forward(self.x)[:1], labels, 0.3)
+            w[index] = original
+            self.assertAlmostEqual(grads['dW1'][index], (cost_plus - cost_minus) / 2e-6, places=6)
+            self.assertAlmostEqual(grads_ws['dW1'][index], grads['dW1'][index])
+
+    def test_predict(self):
+        """
+        test ml.common.network :: Network :: predict
+        """
+        from ml.common.network import Network
+        from ml.common.workspace import PingPongBuffers
+
+        for activations in [None, ['leaky_relu', 'leaky_relu', 'softmax']]:
+            network = Network.from_parameters(self.parameters, activations)
+            al, _ = network.forward(self.x)
+            buffers = PingPongBuffers(network.layer_dims, 4)
+            self.assertTrue(numpy.allclose(network.predict(self.x), al))
+            self.assertTrue(numpy.allclose(network.predict(self.x, buffers), al))
+            self.assertEqual(buffers.max_batch_size, self.x.shape[1])
+
+    def test_parameters_network(self):
+        """
+        test ml.common.parameters :: Parameters :: get_network
+        """
+        from ml.common.parameters import Parameters
+        from ml.digit_recognizer.prediction import predict
+
+        obj = Parameters()
+        obj.initialize_parameters_deep_he([6, 5, 3])
+        expected = predict(self.x, None, obj.get())
+
+        network = obj.get_network()
+        self.assertIs(obj.get_network(), network)
+        self.assertIs(obj.get()['W1'], network.layers[0].w)
+        # dict format keeps working for prediction
+        self.assertListEqual(predict(self.x, None, obj.get()).tolist(), expected.tolist())
+
+        obj.update({'dW1': numpy.ones((5, 6)), 'db1': numpy.ones((5, 1)),
+                    'dW2': numpy.ones((3, 5)), 'db2': numpy.ones((3, 1))}, 0.1)
+        self.assertTrue(numpy.shares_memory(obj.get()['W1'], network.buffer))
+
+        self.assertIsNot(obj.get_network(['relu', 'sigmoid']), network)
+        obj.initialize_parameters_deep_he([6, 5, 3])
+        self.assertIsNot(obj.get_network(), network)
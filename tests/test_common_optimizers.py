@@ -0,0 +1,166 @@
+"""
+# test_common_optimizers.py
+
+"""
+import logging
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class OptimizersTests(unittest.TestCase):
+    """
+    OptimizersTests includes all unit tests for ml.common.optimizers module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        rng = numpy.random.RandomState(1)
+        self.parameters = {"W1": rng.randn(3, 2), "b1": rng.randn(3, 1)}
+        self.grads = [{"dW1": rng.randn(3, 2), "db1": rng.randn(3, 1)} for _ in range(3)]
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def _run(self, optimizer, learning_rate=0.01):
+        parameters = {key: val.copy() for key, val in self.parameters.items()}
+        arrays = {key: val for key, val in parameters.items()}
+        for grads in self.grads:
+            optimizer.update(parameters, grads, learning_rate)
+        for key in parameters:
+            # updated in place
+            self.assertIs(parameters[key], arrays[key])
+        return parameters
+
+    def _assert_close(self, result, expected):
+        for key in expected:
+            self.assertTrue(numpy.allclose(result[key], expected[key]), key)
+
+    def test_gradient_descent(self):
+        """
+        test ml.common.optimizers :: GradientDescent :: update
+        """
+        from ml.common.optimizers import GradientDescent
+
+        expected = {key: val.copy() for key, val in self.parameters.items()}
+        for grads in self.grads:
+            for key in expected:
+                expected[key] = expected[key] - 0.01 * grads['d' + key]
+        self._assert_close(self._run(GradientDescent()), expected)
+
+    def test_momentum(self):
+        """
+        test ml.common.optimizers :: Momentum :: update
+        """
+        from ml.common.optimizers import Momentum
+
+        expected = {key: val.copy() for key, val in self.parameters.items()}
+        v = {key: numpy.zeros_like(val) for key, val in expected.items()}
+        for grads in self.grads:
+            for key in expected:
+                v[key] = 0.9 * v[key] + 0.1 * grads['d' + key]
+                expected[key] = expected[key] - 0.01 * v[key]
+        self._assert_close(self._run(Momentum(beta=0.9)), expected)
+
+    def test_rmsprop(self):
+        """
+        test ml.common.optimizers :: RMSProp :: update
+        """
+        from ml.common.optimizers import RMSProp
+
+        expected = {key: val.copy() for key, val in self.parameters.items()}
+        s = {key: numpy.zeros_like(val) for key, val in expected.items()}
+        for grads in self.grads:
+            for key in expected:
+                s[key] = 0.99 * s[key] + 0.01 * grads['d' + key] ** 2
+                expected[key] = expected[key] - 0.01 * grads['d' + key] / (numpy.sqrt(s[key]) + 1e-8)
+        self._assert_close(self._run(RMSProp(beta=0.99)), expected)
+
+    def test_adam(self):
+        """
+        test ml.common.optimizers :: Adam :: update
+        """
+        from ml.common.optimizers import Adam
+
+        expected = {key: val.copy() for key, val in self.parameters.items()}
+        v = {key: numpy.zeros_like(val) for key, val in expected.items()}
+        s = {key: numpy.zeros_like(val) for key, val in expected.items()}
+        for t, grads in enumerate(self.grads, 1):
+            for key in expected:
+                v[key] = 0.9 * v[key] + 0.1 * grads['d' + key]
+                s[key] = 0.999 * s[key] + 0.001 * grads['d' + key] ** 2
+                v_hat = v[key] / (1 - 0.9 ** t)
+                s_hat = s[key] / (1 - 0.999 ** t)
+                expected[key] = expected[key] - 0.01 * v_hat / (numpy.sqrt(s_hat) + 1e-8)
+        optimizer = Adam()
+        self._assert_close(self._run(optimizer), expected)
+        self.assertEqual(optimizer.t, 3)
+
+        optimizer.reset()
+        self.assertEqual(optimizer.t, 0)
+        self._assert_close(self._run(optimizer), expected)
+
+    def test_get_optimizer(self):
+        """
+        test ml.common.optimizers.get_optimizer
+        """
+        from ml.common.optimizers import Adam, GradientDescent, get_optimizer
+
+        self.assertIsInstance(get_optimizer(), GradientDescent)
+        self.assertIsInstance(get_optimizer('Adam'), Adam)
+        self.assertEqual(get_optimizer('adam', beta1=0.5).beta1, 0.5)
+        optimizer = Adam()
+        self.assertIs(get_optimizer(optimizer), optimizer)
+        with self.assertRaises(ValueError):
+            get_optimizer('foobar')
+
+    def test_parameters_optimizer(self):
+        """
+        test ml.common.parameters :: Parameters :: set_optimizer
+        """
+        from ml.common.optimizers import Adam
+        from ml.common.parameters import Parameters
+
+        obj = Parameters(optimizer='adam')
+        self.assertIsInstance(obj.optimizer, Adam)
+        obj.initialize_parameters_deep_he([2, 3])
+        obj.update({"dW1": numpy.ones((3, 2)), "db1": numpy.ones((3, 1))}, 0.1)
+        self.assertEqual(obj.optimizer.t, 1)
+        obj.initialize_parameters_deep_he([2, 3])
+        self.assertEqual(obj.optimizer.t, 0)
+        obj.set_optimizer('momentum')
+        self.assertEqual(obj.optimizer.name, 'momentum')
+
+    def test_state_dict(self):
+        """
+        test ml.common.optimizers :: GradientDescent :: state_dict, load_state_dict
+        """
+        from ml.common.optimizers import Adam, Momentum
+
+        parameters = {"W1": numpy.ones((3, 2)), "b1": numpy.zeros((3, 1))}
+        grads = {"dW1": numpy.ones((3, 2)), "db1": numpy.ones((3, 1))}
+        optimizer = Adam()
+        optimizer.update(parameters, grads, 0.1)
+        state = optimizer.state_dict()
+        self.assertEqual(state['name'], 'adam')
+        self.assertEqual(state['t'], 1)
+        self.assertSetEqual(set(state['arrays']), {'v/W1', 'v/b1', 's/W1', 's/b1'})
+
+        restored = Adam()
+        restored.load_state_dict(state, parameters)
+        self.assertEqual(restored.t, 1)
+        clone = {key: val.copy() for key, val in parameters.items()}
+        optimizer.update(parameters, grads, 0.1)
+        restored.update(clone, grads, 0.1)
+        numpy.testing.assert_array_equal(parameters['W1'], clone['W1'])
+
+        with self.assertRaises(ValueError):
+            Momentum().load_state_dict(state, parameters)
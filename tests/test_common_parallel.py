@@ -0,0 +1,94 @@
+"""
+# test_common_parallel.py
+
+"""
+import logging
+import os
+import unittest
+import numpy
+
+from mock import patch
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class ParallelTests(unittest.TestCase):
+    """
+    ParallelTests includes all unit tests for ml.common.parallel module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.test_path = os.path.dirname(os.path.realpath(__file__))
+        rng = numpy.random.RandomState(0)
+        self.x = rng.rand(6, 40)
+        self.y = numpy.eye(3)[rng.randint(0, 3, 40)].T
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def _train(self, trainer_class, mini_batch_size, **kwargs):
+        from ml.common.parameters import Parameters
+        from ml.common.trainer import mini_batches
+
+        parameters = Parameters(self.test_path, optimizer='adam')
+        parameters.initialize_parameters_deep_he([6, 5, 4, 3])
+        trainer = trainer_class(parameters, learning_rate=0.01, lambd=0.7, print_cost=True, print_every=1, **kwargs)
+        trainer.train(mini_batches(self.x, self.y, mini_batch_size, seed=1), num_epochs=3)
+        return trainer
+
+    def test_parallel_trainer(self):
+        """
+        test ml.common.parallel :: ParallelTrainer :: train, same as single process
+        """
+        from ml.common.parallel import ParallelTrainer
+        from ml.common.trainer import Trainer
+
+        expected = self._train(Trainer, 16)
+        for kwargs in ({'num_workers': 3}, {'num_workers': 2, 'use_workspace': True}):
+            trainer = self._train(ParallelTrainer, 16, **kwargs)
+            self.assertEqual(trainer.iteration, expected.iteration)
+            self.assertListEqual(trainer._workers, [])
+            numpy.testing.assert_allclose(trainer.costs, expected.costs)
+            for key, val in expected.parameters.get().items():
+                numpy.testing.assert_allclose(trainer.parameters.get()[key], val, atol=1e-12)
+
+        # softmax output with integer labels
+        self.y = numpy.argmax(self.y, axis=0).reshape(1, -1)
+        kwargs = {'activations': ['leaky_relu', 'leaky_relu', 'softmax']}
+        expected_softmax = self._train(Trainer, 16, **kwargs)
+        trainer = self._train(ParallelTrainer, 16, num_workers=3, **kwargs)
+        numpy.testing.assert_allclose(trainer.costs, expected_softmax.costs)
+        numpy.testing.assert_allclose(trainer.parameters.get()['W1'], expected_softmax.parameters.get()['W1'])
+        self.assertEqual(trainer.parameters.get_network().activations[-1], 'softmax')
+        self.y = numpy.eye(3)[self.y[0]].T
+
+        # more workers than samples in the last batch of 40 % 16 = 8
+        trainer = self._train(ParallelTrainer, 16, num_workers=10)
+        numpy.testing.assert_allclose(trainer.costs, expected.costs)
+
+    def test_parallel_trainer_errors(self):
+        """
+        test ml.common.parallel :: ParallelTrainer :: errors
+        """
+        from ml.common.parallel import ParallelTrainer
+        from ml.common.parameters import Parameters
+
+        parameters = Parameters(self.test_path)
+        parameters.initialize_parameters_deep_he([6, 5, 3])
+        with self.assertRaises(ValueError):
+            ParallelTrainer(parameters, num_workers=-1)
+
+        # workers are forked with the patched cost function
+        with patch('ml.common.network.Network.compute_cost', side_effect=ValueError('bad cost')):
+            with ParallelTrainer(parameters, num_workers=2) as trainer:
+                with self.assertRaises(RuntimeError):
+                    trainer.step(self.x, self.y)
+        self.assertListEqual(trainer._workers, [])
@@ -0,0 +1,115 @@
+"""
+# test_common_param_file.py
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class ParamFileTests(unittest.TestCase):
+    """
+    ParamFileTests includes all unit tests for ml.common.param_file module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        from ml.common.network import Network
+
+        self.temp_path = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_path, 'test.params')
+        self.network = Network([5, 4, 2], ['relu', 'sigmoid'])
+        self.network.buffer[...] = numpy.arange(self.network.buffer.size)
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        shutil.rmtree(self.temp_path)
+        pass
+
+    def test_atomic_write(self):
+        """
+        test ml.common.param_file :: atomic_write
+        """
+        from ml.common.param_file import atomic_write
+
+        file_path = os.path.join(self.temp_path, 'test.bin')
+        with atomic_write(file_path) as temp_file:
+            temp_file.write(b'old')
+            self.assertFalse(os.path.exists(file_path))
+
+        with self.assertRaises(IOError):
+            with atomic_write(file_path, suffix='.npz') as temp_file:
+                temp_file.write(b'partial')
+                raise IOError('disk full')
+        self.assertListEqual(os.listdir(self.temp_path), ['test.bin'])
+        with open(file_path, 'rb') as test_file:
+            self.assertEqual(test_file.read(), b'old')
+
+    def test_save_and_load(self):
+        """
+        test ml.common.param_file :: save_network, load_network, read_header
+        """
+        from ml.common.param_file import \
+            ALIGNMENT, FORMAT_VERSION, is_param_file, load_network, read_header, save_network
+
+        self.assertFalse(is_param_file(self.file_path))
+        save_network(self.file_path, self.network)
+        self.assertTrue(is_param_file(self.file_path))
+        self.assertListEqual(os.listdir(self.temp_path), ['test.params'])
+
+        header = read_header(self.file_path)
+        self.assertEqual(header['format_version'], FORMAT_VERSION)
+        self.assertListEqual(header['layer_dims'], [5, 4, 2])
+        self.assertListEqual(header['activations'], ['relu', 'sigmoid'])
+        self.assertEqual(header['offset'] % ALIGNMENT, 0)
+
+        network = load_network(self.file_path)
+        self.assertListEqual(network.activations, ['relu', 'sigmoid'])
+        self.assertListEqual(network.buffer.tolist(), self.network.buffer.tolist())
+
+        network = load_network(self.file_path, mmap_mode='r')
+        self.assertIsInstance(network.buffer, numpy.memmap)
+        self.assertListEqual(network.to_parameters()['W2'].tolist(), self.network.to_parameters()['W2'].tolist())
+        with self.assertRaises(ValueError):
+            network.layers[0].w[...] = 0
+
+        # copy-on-write mapping does not change the file
+        network = load_network(self.file_path, mmap_mode='c')
+        network.layers[0].w[...] = 0
+        self.assertListEqual(load_network(self.file_path).buffer.tolist(), self.network.buffer.tolist())
+
+    def test_invalid(self):
+        """
+        test ml.common.param_file :: load_network, invalid files
+        """
+        from ml.common.param_file import FORMAT_VERSION, load_network, save_network
+
+        with open(self.file_path, 'wb') as param_file:
+            param_file.write(b'not a parameter file')
+        with self.assertRaises(ValueError):
+            load_network(self.file_path)
+
+        save_network(self.file_path, self.network)
+        with open(self.file_path, 'rb') as param_file:
+            content = param_file.read()
+        with open(self.file_path, 'wb') as param_file:
+            param_file.write(content[:-8])
+        with self.assertRaises(ValueError):
+            load_network(self.file_path)
+
+        version = '"format_version": {}'.format(FORMAT_VERSION).encode('utf-8')
+        with open(self.file_path, 'wb') as param_file:
+            param_file.write(content.replace(version, version[:-1] + b'9', 1))
+        with self.assertRaises(ValueError):
+            load_network(self.file_path)
@@ -55,27 +55,96 @@ def test_load(self, mock_np):
 
         obj.load()
         param_file = os.path.join(self.test_path, 'datasets', 'file name')
-        mock_np.load.assert_called_with(param_file)
+        mock_np.load.assert_called_with(param_file, allow_pickle=True)
         self.assertEqual(obj._parameters, 'np load')
         pass
 
-    @patch('ml.common.parameters.np')
-    def test_save(self, mock_np):
+    def test_save(self):
         """
         test ml.common.parameters :: Parameters :: save
         """
+        import shutil
+        import tempfile
+        from ml.common.param_file import is_param_file
         from ml.common.parameters import Parameters
 
         obj = Parameters('does not exist')
         self.assertEqual(obj.base_path, self.base_path)
 
-        obj = Parameters(self.test_path, 'file name')
-        self.assertEqual(obj.base_path, self.test_path)
+        temp_path = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(temp_path, 'datasets'))
+            obj = Parameters(temp_path)
+            self.assertEqual(obj.base_path, temp_path)
+            obj.initialize_parameters_deep_he([4, 3, 2])
+            expected = {key: val.copy() for key, val in obj.get().items()}
+
+            obj.save()
+            param_file = os.path.join(temp_path, 'datasets', 'saved_parameters.params')
+            self.assertTrue(is_param_file(param_file))
+            self.assertListEqual(os.listdir(os.path.join(temp_path, 'datasets')), ['saved_parameters.params'])
+
+            for mmap_mode in (None, 'r'):
+                loaded = Parameters(temp_path).load(mmap_mode=mmap_mode)
+                self.assertListEqual(list(loaded), list(expected))
+                for key in expected:
+                    self.assertEqual(loaded[key].dtype, numpy.float64)
+                    self.assertListEqual(loaded[key].tolist(), expected[key].tolist())
+
+            obj.save(dtype='float32')
+            loaded = Parameters(temp_path).load()
+            self.assertEqual(loaded['W1'].dtype, numpy.float32)
+            self.assertTrue(numpy.allclose(loaded['W2'], expected['W2']))
+        finally:
+            shutil.rmtree(temp_path)
+
+    def test_load_dtype_activations(self):
+        """
+        test ml.common.parameters :: Parameters :: load, casting keeps saved activations
+        """
+        import shutil
+        import tempfile
+        from ml.common.parameters import Parameters
 
-        obj.save()
-        # param_file = os.path.join(self.test_path, 'datasets', 'file name')
-        mock_np.save.assert_called_once()
-        pass
+        temp_path = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(temp_path, 'datasets'))
+            obj = Parameters(temp_path)
+            obj.initialize_parameters_deep_he([4, 3, 2])
+            obj.get_network(['leaky_relu', 'softmax'])
+            obj.save()
+
+            for dtype in ('float32', numpy.float64):
+                loaded = Parameters(temp_path)
+                loaded.load(dtype=dtype)
+                network = loaded.get_network()
+                self.assertEqual(network.dtype, numpy.dtype(dtype))
+                self.assertListEqual(network.activations, ['leaky_relu', 'softmax'])
+                self.assertTrue(numpy.allclose(loaded.get()['W2'], obj.get()['W2']))
+        finally:
+            shutil.rmtree(temp_path)
+
+    def test_load_legacy(self):
+        """
+        test ml.common.parameters :: Parameters :: load, legacy pickled format
+        """
+        import shutil
+        import tempfile
+        from ml.common.parameters import Parameters
+
+        temp_path = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(temp_path, 'datasets'))
+            expected = {'W1': numpy.ones((2, 3)), 'b1': numpy.zeros((2, 1))}
+            numpy.save(os.path.join(temp_path, 'datasets', 'saved_parameters.npy'), expected, allow_pickle=True)
+
+            loaded = Parameters(temp_path).load(dtype=numpy.float32)
+            self.assertEqual(loaded['W1'].dtype, numpy.float32)
+            self.assertListEqual(loaded['W1'].tolist(), expected['W1'].tolist())
+            loaded = Parameters(temp_path, 'saved_parameters.npy').load()
+            self.assertListEqual(loaded['b1'].tolist(), expected['b1'].tolist())
+        finally:
+            shutil.rmtree(temp_path)
 
     def test_update(self):
         """
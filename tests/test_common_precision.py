@@ -0,0 +1,79 @@
+"""
+# test_common_precision.py
+
+"""
+import logging
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class PrecisionTests(unittest.TestCase):
+    """
+    PrecisionTests includes all unit tests for ml.common.precision module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def test_get_dtype(self):
+        """
+        test ml.common.precision :: get_dtype
+        """
+        from ml.common.precision import get_dtype, INFERENCE_DTYPE, TRAINING_DTYPE
+
+        self.assertEqual(TRAINING_DTYPE, numpy.float64)
+        self.assertEqual(INFERENCE_DTYPE, numpy.float32)
+        self.assertEqual(get_dtype(), TRAINING_DTYPE)
+        self.assertEqual(get_dtype(inference=True), INFERENCE_DTYPE)
+        self.assertEqual(get_dtype('float32'), numpy.float32)
+
+    def test_as_dtype_and_standardize(self):
+        """
+        test ml.common.precision :: as_dtype, standardize
+        """
+        from ml.common.precision import as_dtype, standardize
+
+        parameters = {'W1': numpy.ones((2, 3)), 'b1': numpy.zeros((2, 1), dtype=numpy.float32)}
+        result = as_dtype(parameters, numpy.float32)
+        self.assertEqual(result['W1'].dtype, numpy.float32)
+        self.assertIs(result['b1'], parameters['b1'])
+
+        x = numpy.array([[0, 51, 255]], dtype=numpy.uint8)
+        self.assertEqual(standardize(x).dtype, numpy.float64)
+        result = standardize(x, dtype='float32')
+        self.assertEqual(result.dtype, numpy.float32)
+        self.assertTrue(numpy.allclose(result, [[0, 0.2, 1]]))
+
+    def test_float32_training(self):
+        """
+        test float32 parameters stay float32 through training and prediction
+        """
+        from ml.common.parameters import Parameters
+        from ml.common.trainer import Trainer
+        from ml.digit_recognizer.prediction import predict
+
+        obj = Parameters()
+        obj.initialize_parameters_deep_he([6, 5, 3], dtype='float32')
+        for val in obj.get().values():
+            self.assertEqual(val.dtype, numpy.float32)
+
+        rng = numpy.random.RandomState(1)
+        x = rng.rand(6, 20).astype(numpy.float32)
+        y = (rng.rand(3, 20) > 0.5).astype(numpy.uint8)
+        for use_workspace in (False, True):
+            Trainer(obj, use_workspace=use_workspace).train([(x, y)], num_epochs=3)
+            for val in obj.get().values():
+                self.assertEqual(val.dtype, numpy.float32)
+        self.assertEqual(predict(x, None, obj.get()).shape, (1, 20))
@@ -0,0 +1,160 @@
+"""
+# test_common_profiler.py
+
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from mock import patch
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class ProfilerTests(unittest.TestCase):
+    """
+    ProfilerTests includes all unit tests for ml.common.profiler module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(1)
+        self.x = rng.rand(4, 12)
+        self.y = (rng.rand(1, 12) > 0.5).astype(float)
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        pass
+
+    def _parameters(self, optimizer='adam'):
+        from ml.common.parameters import Parameters
+        parameters = Parameters(optimizer=optimizer)
+        parameters.initialize_parameters_deep_he([4, 3, 1])
+        return parameters
+
+    def test_layer_flops(self):
+        """test ml.common.profiler.layer_flops"""
+        from ml.common.profiler import layer_flops
+
+        self.assertEqual(layer_flops('forward', 3, 4, 10), 2 * 3 * 4 * 10 + 2 * 3 * 10)
+        self.assertEqual(layer_flops('backward', 3, 4, 10), 4 * 3 * 4 * 10 + 3 * 3 * 10)
+        self.assertEqual(layer_flops('cost', 3, 4, 10), 0)
+
+    def test_span(self):
+        """test ml.common.profiler.Profiler.span"""
+        from ml.common.profiler import Profiler
+
+        seen = []
+        profiler = Profiler(callbacks=[seen.append], max_events=2)
+        for _ in range(3):
+            with profiler.span('update', flops=100):
+                pass
+        with self.assertRaises(KeyError):
+            with profiler.span('forward', layer=2, flops=10):
+                raise KeyError('spans are recorded on errors')
+
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(seen[-1]['name'], 'L2 forward')
+        self.assertEqual(len(profiler.events), 2)
+        self.assertEqual(profiler.dropped_events, 2)
+
+        summary = profiler.summary()
+        self.assertEqual([metric['name'] for metric in summary], ['update', 'L2 forward'])
+        self.assertEqual(summary[0]['calls'], 3)
+        self.assertEqual(summary[0]['flops'], 300)
+        self.assertEqual(summary[1]['layer'], 2)
+        self.assertAlmostEqual(sum(metric['share'] for metric in summary), 1.)
+        self.assertIn('L2 forward', profiler.format_summary())
+
+        profiler.reset()
+        self.assertEqual(profiler.summary(), [])
+        self.assertEqual(profiler.events, [])
+
+    def test_track_memory(self):
+        """test ml.common.profiler.Profiler with track_memory"""
+        import tracemalloc
+        from ml.common.profiler import Profiler
+
+        profiler = Profiler(track_memory=True)
+        # tracemalloc.reset_peak is not available before python 3.9
+        with patch('tracemalloc.reset_peak', side_effect=AttributeError):
+            try:
+                with profiler.span('forward', layer=1):
+                    buffer = np.ones(100000)
+                with profiler.span('backward', layer=1):
+                    np.ones(100000).sum()
+                self.assertTrue(tracemalloc.is_tracing())
+            finally:
+                profiler.close()
+        self.assertFalse(tracemalloc.is_tracing())
+        forward, backward = profiler.summary()
+        self.assertGreaterEqual(forward['alloc_bytes'], buffer.nbytes)
+        self.assertLess(backward['alloc_bytes'], buffer.nbytes)
+
+    def test_trainer(self):
+        """test ml.common.trainer.Trainer with a profiler"""
+        from ml.common.profiler import Profiler
+        from ml.common.trainer import Trainer
+
+        profiler = Profiler()
+        trainer = Trainer(self._parameters(), learning_rate=0.01, profiler=profiler)
+        expected = Trainer(self._parameters(), learning_rate=0.01)
+        for _ in range(2):
+            self.assertEqual(trainer.step(self.x, self.y), expected.step(self.x, self.y))
+        np.testing.assert_array_equal(trainer.parameters.get()['W1'], expected.parameters.get()['W1'])
+
+        metrics = {metric['name']: metric for metric in profiler.summary()}
+        self.assertEqual(list(metrics), ['L1 forward', 'L2 forward', 'cost', 'L2 backward', 'L1 backward', 'update'])
+        for metric in metrics.values():
+            self.assertEqual(metric['calls'], 2)
+            self.assertGreater(metric['flops'], 0)
+        self.assertEqual(metrics['L1 forward']['flops'], 2 * (2 * 3 * 4 * 12 + 2 * 3 * 12))
+        self.assertEqual(metrics['update']['flops'], 2 * 13 * (3 * 4 + 3 + 1 * 3 + 1))
+
+    def test_parallel_trainer(self):
+        """test ml.common.parallel.ParallelTrainer with a profiler"""
+        from ml.common.parallel import ParallelTrainer
+        from ml.common.profiler import Profiler
+
+        profiler = Profiler()
+        with ParallelTrainer(self._parameters(), num_workers=2, profiler=profiler) as trainer:
+            trainer.step(self.x, self.y)
+        names = [metric['name'] for metric in profiler.summary()]
+        self.assertEqual(names, ['workers', 'update'])
+
+    def test_chrome_trace(self):
+        """test ml.common.profiler.Profiler.save_chrome_trace and save_metrics"""
+        from ml.common.profiler import Profiler
+        from ml.common.trainer import Trainer
+
+        profiler = Profiler()
+        Trainer(self._parameters(), profiler=profiler).step(self.x, self.y)
+        trace_file = os.path.join(self.temp_dir, 'trace.json')
+        profiler.save_chrome_trace(trace_file)
+        with open(trace_file) as json_file:
+            trace = json.load(json_file)
+        events = trace['traceEvents']
+        self.assertEqual(len(events), 6)
+        for event in events:
+            self.assertEqual(event['ph'], 'X')
+            self.assertGreaterEqual(event['dur'], 0)
+            self.assertIn('flops', event['args'])
+        starts = [event['ts'] for event in events]
+        self.assertEqual(starts, sorted(starts))
+
+        metrics_file = os.path.join(self.temp_dir, 'metrics.json')
+        profiler.save_metrics(metrics_file)
+        with open(metrics_file) as json_file:
+            self.assertEqual(len(json.load(json_file)['spans']), 6)
@@ -0,0 +1,116 @@
+"""
+# test_common_quantization.py
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class QuantizationTests(unittest.TestCase):
+    """
+    QuantizationTests includes all unit tests for ml.common.quantization module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        from ml.common.parameters import Parameters
+
+        self.temp_dir = tempfile.mkdtemp()
+        parameters = Parameters()
+        parameters.initialize_parameters_deep_he([20, 16, 8, 4], dtype='float32')
+        self.network = parameters.get_network(['leaky_relu', 'leaky_relu', 'softmax'])
+        rng = np.random.RandomState(1)
+        self.x = rng.rand(20, 50).astype(np.float32)
+        self.y = np.argmax(self.network.predict(self.x), axis=0).reshape(1, -1)
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        pass
+
+    def test_quantize_rows(self):
+        """test ml.common.quantization.quantize_rows"""
+        from ml.common.quantization import quantize_rows
+
+        w = np.array([[0.5, -1., 0.25], [0., 0., 0.], [3., 2., -0.01]])
+        q, scale = quantize_rows(w)
+        self.assertEqual(q.dtype, np.int8)
+        self.assertEqual(scale.dtype, np.float32)
+        self.assertEqual(scale.shape, (3, 1))
+        np.testing.assert_array_equal(q[0], [64, -127, 32])
+        np.testing.assert_array_equal(q[1], [0, 0, 0])
+        self.assertEqual(q[2, 0], 127)
+        self.assertTrue(np.all(np.abs(q * scale - w) <= scale / 2 + 1e-7))
+
+    def test_dequantize(self):
+        """test ml.common.quantization.QuantizedNetwork.dequantize"""
+        from ml.common.quantization import QuantizedNetwork
+        from ml.common.workspace import PingPongBuffers
+
+        quantized = QuantizedNetwork.from_network(self.network)
+        self.assertEqual(quantized.layer_dims, [20, 16, 8, 4])
+        self.assertEqual(quantized.activations, ['leaky_relu', 'leaky_relu', 'softmax'])
+        self.assertLess(quantized.nbytes, self.network.buffer.nbytes / 2)
+
+        network = quantized.dequantize()
+        self.assertEqual(network.dtype, np.float32)
+        self.assertEqual(network.activations, quantized.activations)
+        for layer, expected in zip(network.layers, quantized.layers):
+            np.testing.assert_allclose(layer.w, expected.q * expected.scale, rtol=1e-6)
+        al = network.predict(self.x)
+        self.assertEqual(al.dtype, np.float32)
+        np.testing.assert_allclose(al, self.network.predict(self.x), atol=0.02)
+
+        buffers = PingPongBuffers(quantized.layer_dims, 8, np.float32)
+        np.testing.assert_allclose(network.predict(self.x, buffers), al, rtol=1e-5, atol=1e-7)
+
+    def test_save_load(self):
+        """test ml.common.quantization.save_quantized and load_quantized"""
+        from ml.common.quantization import QuantizedNetwork, load_quantized, save_quantized
+
+        quantized = QuantizedNetwork.from_network(self.network)
+        file_path = os.path.join(self.temp_dir, 'quantized.npz')
+        save_quantized(file_path, quantized)
+        self.assertEqual(os.listdir(self.temp_dir), ['quantized.npz'])
+
+        loaded = load_quantized(file_path)
+        self.assertEqual(loaded.activations, quantized.activations)
+        for layer, expected in zip(loaded.layers, quantized.layers):
+            self.assertEqual(layer.q.dtype, np.int8)
+            np.testing.assert_array_equal(layer.q, expected.q)
+            np.testing.assert_array_equal(layer.scale, expected.scale)
+        np.testing.assert_array_equal(loaded.dequantize().predict(self.x), quantized.dequantize().predict(self.x))
+
+        np.savez(file_path, meta=np.array('{"format": "int4"}'))
+        with self.assertRaises(ValueError):
+            load_quantized(file_path)
+
+    def test_check_accuracy(self):
+        """test ml.common.quantization.check_accuracy"""
+        from ml.common.evaluation import evaluate
+        from ml.common.quantization import QuantizedNetwork, check_accuracy, compare_accuracy
+
+        quantized = QuantizedNetwork.from_network(self.network)
+        comparison = check_accuracy(self.network, quantized, self.x, self.y, max_drop=0.1, batch_size=16)
+        self.assertEqual(comparison['float_accuracy'], 1.)
+        self.assertGreaterEqual(comparison['int8_accuracy'], 0.9)
+        self.assertAlmostEqual(comparison['agreement'], comparison['int8_accuracy'])
+        self.assertEqual(evaluate(quantized, self.x, self.y).accuracy(), comparison['int8_accuracy'])
+
+        worse = QuantizedNetwork.from_network(self.network)
+        worse.layers[-1].b[...] = np.array([[100.], [0.], [0.], [0.]], dtype=np.float32)
+        self.assertGreater(compare_accuracy(self.network, worse, self.x, self.y)['accuracy_drop'], 0.5)
+        with self.assertRaises(ValueError):
+            check_accuracy(self.network, worse, self.x, self.y, max_drop=0.01)
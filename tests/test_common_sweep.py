@@ -0,0 +1,101 @@
+"""
+# test_common_sweep.py
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+def objective(config, budget):
+    """objective of tests: lower x is better, larger budgets are better"""
+    if config['x'] < 0:
+        raise ValueError('negative x')
+    return config['x'] + 1. / budget
+
+
+class SweepTests(unittest.TestCase):
+    """
+    SweepTests includes all unit tests for ml.common.sweep module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.temp_dir = tempfile.mkdtemp()
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        pass
+
+    def test_search_spaces(self):
+        """
+        test ml.common.sweep :: grid_search, random_search, uniform
+        """
+        from ml.common.sweep import grid_search, random_search, uniform
+
+        configs = grid_search({'b': [1, 2], 'a': ['x', 'y', 'z']})
+        self.assertEqual(len(configs), 6)
+        self.assertDictEqual(configs[0], {'a': 'x', 'b': 1})
+
+        space = {'layers': [[4, 3], [8]], 'rate': uniform(0.001, 0.1, log=True), 'lambd': uniform(0., 1.)}
+        configs = random_search(space, 20, seed=1)
+        self.assertEqual(len(configs), 20)
+        self.assertListEqual(configs, random_search(space, 20, seed=1))
+        for config in configs:
+            self.assertIn(config['layers'], space['layers'])
+            self.assertTrue(0.001 <= config['rate'] < 0.1)
+            self.assertTrue(0. <= config['lambd'] < 1.)
+
+    def test_sweep(self):
+        """
+        test ml.common.sweep :: Sweep :: run with successive halving
+        """
+        from ml.common.sweep import Sweep
+
+        configs = [{'x': x} for x in (5, 3, -1, 0, 8, 2, 7, 1, 6)]
+        for max_workers in (0, 2):
+            sweep = Sweep(objective, configs, max_budget=9, min_budget=1, eta=3, max_workers=max_workers)
+            results = sweep.run()
+            self.assertListEqual([r['budget'] for r in results], [9] + [3] * 3 + [1] * 9)
+            self.assertDictEqual(sweep.best(), {'x': 0})
+            self.assertListEqual(sorted(r['config']['x'] for r in results if r['budget'] == 3), [0, 1, 2])
+            failed = [r for r in results if r['error']]
+            self.assertEqual(len(failed), 1)
+            self.assertIn('negative x', failed[0]['error'])
+
+        # no successive halving without min_budget
+        sweep = Sweep(objective, configs[:3], max_budget=4, max_workers=0)
+        self.assertListEqual([r['budget'] for r in sweep.run()], [4, 4, 4])
+        with self.assertRaises(ValueError):
+            Sweep(objective, configs, max_budget=4, eta=1)
+
+    def test_save(self):
+        """
+        test ml.common.sweep :: Sweep :: save
+        """
+        import csv
+        from ml.common.sweep import Sweep
+
+        prepared = []
+        sweep = Sweep(objective, [{'x': 1}, {'x': 2, 'y': 'a'}], max_budget=2, max_workers=0,
+                      prepare=lambda: prepared.append(True))
+        sweep.run()
+        self.assertListEqual(prepared, [True])
+        file_path = os.path.join(self.temp_dir, 'results.csv')
+        sweep.save(file_path)
+        with open(file_path) as csv_file:
+            rows = list(csv.reader(csv_file))
+        self.assertListEqual(rows[0], ['trial', 'rung', 'budget', 'x', 'y', 'score', 'seconds', 'error'])
+        self.assertListEqual(rows[1][:6], ['0', '0', '2', '1', '', '1.5'])
+        self.assertListEqual(rows[2][:6], ['1', '0', '2', '2', 'a', '2.5'])
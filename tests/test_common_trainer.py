@@ -0,0 +1,118 @@
+"""
+# test_common_trainer.py
+
+"""
+import logging
+import os
+import unittest
+import numpy
+
+from mock import MagicMock
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class TrainerTests(unittest.TestCase):
+    """
+    TrainerTests includes all unit tests for ml.common.trainer module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        self.test_path = os.path.dirname(os.path.realpath(__file__))
+        self.repo_path = os.path.dirname(self.test_path)
+        self.proj_path = os.path.join(self.repo_path, "ml")
+        self.base_path = os.path.join(self.repo_path, "ml", "common")
+        self.x = numpy.arange(20).reshape((2, 10)) / 20.
+        self.y = (numpy.arange(10).reshape((1, 10)) % 2).astype(float)
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def test_random_mini_batches(self):
+        """
+        test ml.common.trainer.random_mini_batches
+        """
+        from ml.common.trainer import random_mini_batches
+
+        batches = list(random_mini_batches(self.x, self.y, None))
+        self.assertEqual(len(batches), 1)
+        self.assertIs(batches[0][0], self.x)
+        self.assertIs(batches[0][1], self.y)
+
+        batches = list(random_mini_batches(self.x, self.y, 4, shuffle=False))
+        self.assertListEqual([b[0].shape[1] for b in batches], [4, 4, 2])
+        self.assertListEqual(numpy.hstack([b[1] for b in batches]).tolist(), self.y.tolist())
+
+        batches = list(random_mini_batches(self.x, self.y, 3, seed=1))
+        self.assertListEqual([b[0].shape[1] for b in batches], [3, 3, 3, 1])
+        x_seen = numpy.hstack([b[0] for b in batches])
+        self.assertListEqual(sorted(x_seen[0].tolist()), self.x[0].tolist())
+        for x_batch, y_batch in batches:
+            # columns of x and y stay paired
+            index = numpy.rint(x_batch[0] * 20).astype(int)
+            self.assertListEqual(y_batch[0].tolist(), self.y[0, index].tolist())
+
+    def test_mini_batches(self):
+        """
+        test ml.common.trainer.mini_batches
+        """
+        from ml.common.trainer import mini_batches
+
+        source = mini_batches(self.x, self.y, 4, seed=1)
+        epoch_0 = [b[0].tolist() for b in source(0)]
+        self.assertListEqual(epoch_0, [b[0].tolist() for b in source(0)])
+        self.assertNotEqual(epoch_0, [b[0].tolist() for b in source(1)])
+
+    def test_trainer(self):
+        """
+        test ml.common.trainer :: Trainer :: train
+        """
+        from ml.common.parameters import Parameters
+        from ml.common.trainer import Trainer, mini_batches
+
+        parameters = Parameters(self.test_path)
+        parameters.initialize_parameters_deep_he([2, 3, 1])
+        trainer = Trainer(parameters, learning_rate=0.1, lambd=0.1, print_cost=True, print_every=5)
+        result = trainer.train(mini_batches(self.x, self.y, 4, seed=1), num_epochs=10)
+
+        self.assertIs(result, parameters)
+        self.assertEqual(trainer.epoch, 10)
+        self.assertEqual(trainer.iteration, 30)
+        self.assertEqual(len(trainer.costs), 2)
+
+        # a re-iterable data source works as well as a callable one
+        mock_update = MagicMock()
+        parameters.update = mock_update
+        trainer = Trainer(parameters)
+        trainer.train([(self.x, self.y)], num_epochs=3)
+        self.assertEqual(mock_update.call_count, 3)
+        self.assertListEqual(trainer.costs, [])
+
+    def test_trainer_callbacks(self):
+        """
+        test ml.common.trainer :: Trainer :: train with callbacks
+        """
+        from ml.common.parameters import Parameters
+        from ml.common.trainer import Trainer
+
+        parameters = Parameters(self.test_path)
+        parameters.initialize_parameters_deep_he([2, 3, 1])
+        callback = MagicMock()
+        trainer = Trainer(parameters, callbacks=[callback])
+        trainer.train([(self.x, self.y)], num_epochs=3)
+        self.assertEqual(callback.on_epoch_end.call_count, 3)
+        callback.on_train_end.assert_called_once_with(trainer)
+
+        # callbacks finish even if training fails
+        callback.reset_mock()
+        with self.assertRaises(ValueError):
+            trainer.train(MagicMock(side_effect=ValueError('bad data')), num_epochs=3)
+        callback.on_train_end.assert_called_once_with(trainer)
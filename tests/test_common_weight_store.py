@@ -0,0 +1,142 @@
+"""
+# test_common_weight_store.py
+
+"""
+import logging
+import multiprocessing
+import unittest
+import numpy
+
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+def _child_sum(queue):
+    from ml.common.weight_store import STORE
+    queue.put(float(STORE.get('test').buffer.sum()))
+
+
+class WeightStoreTests(unittest.TestCase):
+    """
+    WeightStoreTests includes all unit tests for ml.common.weight_store module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        from ml.common.parameters import Parameters
+
+        numpy.random.seed(1)
+        obj = Parameters()
+        obj.initialize_parameters_deep_he([6, 5, 3])
+        self.parameters = obj.get()
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        from ml.common.weight_store import STORE
+        STORE.unload('test')
+        pass
+
+    def test_load(self):
+        """
+        test ml.common.weight_store :: WeightStore :: load, get, unload
+        """
+        from ml.common.weight_store import WeightStore
+
+        store = WeightStore()
+        network = store.load('test', self.parameters)
+        self.assertIn('test', store)
+        self.assertIs(store.get('test'), network)
+        self.assertListEqual(store.names(), ['test'])
+        self.assertEqual(network.buffer.dtype, numpy.float32)
+
+        parameters = network.to_parameters()
+        for key in self.parameters:
+            self.assertTrue(numpy.allclose(parameters[key], self.parameters[key]))
+            with self.assertRaises(ValueError):
+                parameters[key][...] = 0
+
+        store.unload('test')
+        self.assertIsNone(store.get('test'))
+
+    def test_shared_with_forked_process(self):
+        """
+        test ml.common.weight_store :: STORE is inherited by forked processes
+        """
+        from ml.common.weight_store import STORE
+
+        network = STORE.load('test', self.parameters)
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        process = context.Process(target=_child_sum, args=(queue,))
+        process.start()
+        result = queue.get(timeout=10)
+        process.join()
+        self.assertAlmostEqual(result, float(network.buffer.sum()), places=4)
+
+    def test_load_models_activations(self):
+        """
+        test ml.common.weight_store :: load_models, keeping a softmax output layer
+        """
+        import os
+        import shutil
+        import tempfile
+        from ml.common.parameters import Parameters
+        from ml.common.weight_store import WeightStore, load_models
+
+        temp_path = tempfile.mkdtemp()
+        try:
+            models = {}
+            for name, dtype in (('float32', 'float32'), ('float64', 'float64')):
+                models[name] = os.path.join(temp_path, name)
+                os.makedirs(os.path.join(models[name], 'datasets'))
+                obj = Parameters(models[name])
+                obj.initialize_parameters_deep_he([6, 5, 3])
+                obj.get_network(['leaky_relu', 'softmax'])
+                obj.save(dtype=dtype)
+
+            store = WeightStore()
+            self.assertListEqual(load_models(models, store), ['float32', 'float64'])
+            x = numpy.random.rand(6, 4).astype(numpy.float32)
+            for name in models:
+                network = store.get(name)
+                self.assertListEqual(network.activations, ['leaky_relu', 'softmax'])
+                self.assertTrue(numpy.allclose(network.predict(x).sum(axis=0), 1.))
+        finally:
+            shutil.rmtree(temp_path)
+
+    def test_load_models(self):
+        """
+        test ml.common.weight_store :: load_models
+        """
+        import os
+        import shutil
+        import tempfile
+        from ml.common.parameters import Parameters
+        from ml.common.weight_store import WeightStore, load_models
+
+        temp_path = tempfile.mkdtemp()
+        try:
+            for name in ('mapped', 'legacy', 'missing'):
+                os.makedirs(os.path.join(temp_path, name, 'datasets'))
+            obj = Parameters(os.path.join(temp_path, 'mapped'))
+            obj.initialize_parameters_deep_he([6, 5, 3])
+            obj.save(dtype='float32')
+            legacy_file = os.path.join(temp_path, 'legacy', 'datasets', 'saved_parameters.npy')
+            numpy.save(legacy_file, self.parameters, allow_pickle=True)
+
+            store = WeightStore()
+            models = {name: os.path.join(temp_path, name) for name in ('mapped', 'legacy', 'missing')}
+            self.assertListEqual(load_models(models, store), ['mapped', 'legacy'])
+            self.assertListEqual(store.names(), ['legacy', 'mapped'])
+            self.assertIsInstance(store.get('mapped').buffer, numpy.memmap)
+            self.assertNotIsInstance(store.get('legacy').buffer, numpy.memmap)
+            self.assertEqual(store.get('legacy').buffer.dtype, numpy.float32)
+            self.assertFalse(store.get('legacy').buffer.flags.writeable)
+        finally:
+            shutil.rmtree(temp_path)
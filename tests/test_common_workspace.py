@@ -0,0 +1,130 @@
+"""
+# test_common_workspace.py
+
+"""
+import logging
+import unittest
+import numpy
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class WorkspaceTests(unittest.TestCase):
+    """
+    WorkspaceTests includes all unit tests for ml.common.workspace module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        from ml.common.parameters import Parameters
+
+        obj = Parameters()
+        obj.initialize_parameters_deep_he([6, 5, 4, 3])
+        self.parameters = obj.get()
+        rng = numpy.random.RandomState(1)
+        self.x = rng.rand(6, 20)
+        self.y = (rng.rand(3, 20) > 0.5).astype(float)
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def test_workspace(self):
+        """
+        test ml.common.workspace :: Workspace
+        """
+        from ml.common.workspace import Workspace
+
+        workspace = Workspace.from_parameters(self.parameters, 8)
+        self.assertListEqual(workspace.layer_dims, [6, 5, 4, 3])
+        self.assertEqual(workspace.dtype, numpy.float64)
+
+        z = workspace.z(2, 5)
+        self.assertEqual(z.shape, (4, 5))
+        self.assertTrue(z.flags['C_CONTIGUOUS'])
+        # views share the preallocated buffer
+        self.assertTrue(numpy.shares_memory(z, workspace.z(2, 8)))
+
+        x = workspace.input(self.x)
+        self.assertEqual(workspace.max_batch_size, 20)
+        self.assertIs(x, self.x)
+        self.assertEqual(workspace.input(numpy.ones((6, 2), dtype=int)).dtype, numpy.float64)
+
+    def test_propagation(self):
+        """
+        test ml.common.mathEx propagation in workspace mode
+        """
+        from ml.common.mathEx import l_model_backward_with_l2, l_model_forward
+        from ml.common.workspace import Workspace
+
+        al, caches = l_model_forward(self.x, self.parameters)
+        grads = l_model_backward_with_l2(al, self.y, caches, 0.3)
+
+        workspace = Workspace.from_parameters(self.parameters, 20)
+        for _ in range(2):
+            al_ws, caches_ws = l_model_forward(self.x, self.parameters, workspace)
+            grads_ws = l_model_backward_with_l2(al_ws, self.y, caches_ws, 0.3, workspace)
+
+        self.assertTrue(numpy.allclose(al, al_ws))
+        self.assertTrue(numpy.shares_memory(al_ws, workspace.a(3, 20)))
+        self.assertNotIn('dA0', grads_ws)
+        for key in grads_ws:
+            self.assertTrue(numpy.allclose(grads[key], grads_ws[key]), key)
+
+        al_ws, _ = l_model_forward(self.x[:, :7], self.parameters, workspace)
+        self.assertTrue(numpy.allclose(al[:, :7], al_ws))
+
+    def test_ping_pong_buffers(self):
+        """
+        test ml.common.workspace :: PingPongBuffers
+        """
+        from ml.common.workspace import PingPongBuffers
+
+        buffers = PingPongBuffers.from_parameters(self.parameters, 8)
+        self.assertEqual(buffers.layer_dims, [6, 5, 4, 3])
+        self.assertEqual(buffers.out(1, 8).shape, (5, 8))
+        self.assertEqual(buffers.out(2, 3).shape, (4, 3))
+        # consecutive layers alternate buffers, and the scratch of a layer is the buffer of its input
+        self.assertFalse(numpy.shares_memory(buffers.out(1, 8), buffers.out(2, 8)))
+        self.assertTrue(numpy.shares_memory(buffers.out(1, 8), buffers.out(3, 8)))
+        self.assertTrue(numpy.shares_memory(buffers.scratch(2, 8), buffers.out(1, 8)))
+
+        x = buffers.input(self.x)
+        self.assertIs(x, self.x)
+        self.assertEqual(buffers.max_batch_size, 20)
+        self.assertEqual(buffers.out(1, 20).shape, (5, 20))
+
+    def test_predict(self):
+        """
+        test ml.common.mathEx :: l_model_predict with ping-pong buffers
+        """
+        import tracemalloc
+        from ml.common.mathEx import l_model_forward, l_model_predict
+        from ml.common.workspace import PingPongBuffers
+
+        al, _ = l_model_forward(self.x, self.parameters)
+        self.assertTrue(numpy.allclose(l_model_predict(self.x, self.parameters), al))
+
+        buffers = PingPongBuffers.from_parameters(self.parameters, 20)
+        al_pp = l_model_predict(self.x, self.parameters, buffers)
+        self.assertTrue(numpy.allclose(al_pp, al))
+        self.assertTrue(numpy.shares_memory(al_pp, buffers.out(3, 20)))
+        self.assertTrue(numpy.allclose(l_model_predict(self.x[:, :7], self.parameters, buffers), al[:, :7]))
+
+        m = 50000
+        x = numpy.random.RandomState(2).rand(6, m)
+        buffers.reserve(m)
+        tracemalloc.start()
+        try:
+            l_model_predict(x, self.parameters, buffers)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # no activation is allocated; broadcasting b only takes the fixed-size ufunc buffer
+        self.assertLess(peak, 3 * m * 8)
@@ -7,6 +7,8 @@
 import unittest
 import numpy
 
+from mock import patch
+
 from ml.utils.logger import get_logger
 
 LOGGER = get_logger(__name__)
@@ -56,3 +58,67 @@ def test_load(self):
         self.assertIsInstance(x_testing, numpy.ndarray)
         self.assertIsInstance(y_testing, numpy.ndarray)
         pass
+
+    def test_load_cached_dataset(self):
+        """
+        test ml.common.datasvc_abstract :: DataSvcAbstract :: load_cached_dataset
+        """
+        import shutil
+        import tempfile
+        from ml.digit_recognizer.datasvc import DataSvc
+
+        temp_path = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(temp_path, 'datasets'))
+            csv_path = os.path.join(temp_path, 'datasets', 'mini_train.csv')
+            expected = numpy.random.RandomState(1).randint(0, 256, (6, 5))
+            expected[:, 0] %= 10
+            numpy.savetxt(csv_path, expected, fmt='%d', delimiter=',', header='label,p0,p1,p2,p3', comments='')
+
+            svc = DataSvc(temp_path)
+            data = svc.load_cached_dataset('mini_train')
+            self.assertIsInstance(data, numpy.memmap)
+            self.assertEqual(data.dtype, numpy.uint8)
+            self.assertListEqual(data.tolist(), expected.tolist())
+
+            cache_root = os.path.join(temp_path, 'datasets', '.cache')
+            caches = os.listdir(cache_root)
+            self.assertEqual(len(caches), 1)
+            svc.load('mini_train')
+            self.assertListEqual(os.listdir(cache_root), caches)
+            self.assertListEqual(svc.trainings['y'].tolist(), [expected[1:, 0].astype(int).tolist()])
+            self.assertListEqual(svc.trainings['x'].tolist(), expected[1:, 1:].T.tolist())
+
+            # a changed source replaces the cache
+            with open(csv_path, 'a') as csv_file:
+                csv_file.write('7' + ',0' * (expected.shape[1] - 1) + '\n')
+            data = svc.load_cached_dataset('mini_train')
+            self.assertEqual(data.shape[0], expected.shape[0] + 1)
+            self.assertEqual(len(os.listdir(cache_root)), 1)
+            self.assertNotEqual(os.listdir(cache_root), caches)
+
+            # a cache failing to write leaves no partial files behind
+            caches = os.listdir(cache_root)
+            with open(csv_path, 'a') as csv_file:
+                csv_file.write('8' + ',0' * (expected.shape[1] - 1) + '\n')
+            with patch('ml.common.datasvc_abstract.np.save', side_effect=IOError('disk full')):
+                with self.assertRaises(IOError):
+                    svc.load_cached_dataset('mini_train')
+            self.assertListEqual(os.listdir(cache_root), caches)
+
+            with self.assertRaises(ValueError):
+                svc.load_cached_dataset('mini_train', 'txt')
+        finally:
+            shutil.rmtree(temp_path)
+
+    def test_narrow_dtype(self):
+        """
+        test ml.common.datasvc_abstract :: narrow_dtype
+        """
+        from ml.common.datasvc_abstract import narrow_dtype
+
+        self.assertEqual(narrow_dtype(numpy.array([0., 255.])).dtype, numpy.uint8)
+        self.assertEqual(narrow_dtype(numpy.array([-1., 300.])).dtype, numpy.int16)
+        self.assertEqual(narrow_dtype(numpy.array([0.5, 1.])).dtype, numpy.float64)
+        self.assertEqual(narrow_dtype(numpy.array([numpy.nan, 1.])).dtype, numpy.float64)
+        self.assertEqual(narrow_dtype(numpy.array([1, 2], dtype=numpy.int64)).dtype, numpy.int64)
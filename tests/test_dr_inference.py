@@ -0,0 +1,204 @@
+"""
+# test_dr_inference.py
+
+"""
+import logging
+import os
+import unittest
+import numpy
+
+from mock import patch
+
+from ml.utils.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class DrInferenceTests(unittest.TestCase):
+    """
+    DrInferenceTests includes all unit tests for ml.digit_recognizer.inference module
+    """
+    @classmethod
+    def teardown_class(cls):
+        logging.shutdown()
+
+    def setUp(self):
+        """setup for test"""
+        from ml.common.parameters import Parameters
+
+        self.test_path = os.path.dirname(os.path.realpath(__file__))
+        self.repo_path = os.path.dirname(self.test_path)
+        self.image_path = os.path.join(self.repo_path, "ml", "digit_recognizer", "images")
+        self.images = [os.path.join(self.image_path, name) for name in sorted(os.listdir(self.image_path))]
+        numpy.random.seed(1)
+        self.parameters = Parameters()
+        self.parameters.initialize_parameters_deep_he([784, 12, 10])
+        pass
+
+    def tearDown(self):
+        """tearing down at the end of the test"""
+        pass
+
+    def test_decode_image(self):
+        """
+        test ml.digit_recognizer.inference :: decode_image
+        """
+        from PIL import Image
+        from ml.digit_recognizer.inference import decode_image
+
+        pixels = numpy.array(Image.open(self.images[0]).convert('L').resize((28, 28))).reshape(-1)
+        column = decode_image(self.images[0], image_type=2)
+        self.assertEqual(column.dtype, numpy.float32)
+        self.assertTrue(numpy.allclose(column, pixels / 255.))
+        self.assertTrue(numpy.allclose(decode_image(self.images[0]), 1 - pixels / 255.))
+
+        with open(self.images[0], 'rb') as image_file:
+            self.assertTrue(numpy.allclose(decode_image(image_file.read()), 1 - pixels / 255.))
+        self.assertTrue(numpy.allclose(decode_image(Image.open(self.images[0])), 1 - pixels / 255.))
+
+    def test_preprocess_images(self):
+        """
+        test ml.digit_recognizer.inference :: preprocess_images
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from ml.digit_recognizer.inference import InferenceEngine, decode_image, preprocess_images, read_pixels
+
+        pixels = read_pixels(self.images[0])
+        self.assertEqual(pixels.dtype, numpy.uint8)
+        self.assertTupleEqual(pixels.shape, (784,))
+
+        expected = numpy.stack([decode_image(image) for image in self.images], axis=1)
+        x = preprocess_images(self.images)
+        self.assertEqual(x.dtype, numpy.float32)
+        self.assertTupleEqual(x.shape, (784, len(self.images)))
+        self.assertTrue(numpy.allclose(x, expected))
+
+        out = numpy.empty((784, len(self.images) + 2), dtype=numpy.float64)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            x = preprocess_images(self.images, 2, executor, out)
+            self.assertTrue(numpy.shares_memory(x, out))
+            self.assertTupleEqual(x.shape, (784, len(self.images)))
+            self.assertTrue(numpy.allclose(x, 1 - expected, atol=1e-6))
+            with self.assertRaises(IOError):
+                preprocess_images([b'not an image'], 1, executor)
+        with self.assertRaises(ValueError):
+            preprocess_images(self.images, out=out[:, :2])
+        self.assertTupleEqual(preprocess_images([]).shape, (784, 0))
+
+        with InferenceEngine(self.parameters, max_workers=2) as engine:
+            self.assertTrue(numpy.allclose(engine.preprocess_images(self.images), expected))
+
+    def test_predict_folder(self):
+        """
+        test ml.digit_recognizer.recognizer :: predict_folder
+        """
+        from ml.digit_recognizer.inference import InferenceEngine
+        from ml.digit_recognizer.recognizer import predict_folder
+
+        with InferenceEngine(self.parameters, micro_batch_size=4, max_workers=2) as engine:
+            labels, _ = engine.predict_images(self.images)
+            predictions = predict_folder(self.image_path, engine=engine)
+        self.assertListEqual(sorted(predictions), [os.path.basename(image) for image in self.images])
+        self.assertListEqual([predictions[os.path.basename(image)] for image in self.images], labels.tolist())
+
+    def test_predict_images(self):
+        """
+        test ml.digit_recognizer.inference :: InferenceEngine :: predict_images, predict_stream
+        """
+        from ml.digit_recognizer.inference import InferenceEngine, decode_image
+        from ml.digit_recognizer.prediction import predict
+
+        x = numpy.stack([decode_image(image) for image in self.images], axis=1)
+        expected = predict(x, None, self.parameters.get())[0]
+
+        with InferenceEngine(self.parameters, micro_batch_size=4, max_workers=2) as engine:
+            self.assertEqual(engine.parameters['W1'].dtype, numpy.float32)
+            labels, probas = engine.predict_images(self.images)
+            self.assertListEqual(labels.tolist(), expected.tolist())
+            self.assertTupleEqual(probas.shape, (10, len(self.images)))
+            self.assertListEqual(probas.argmax(axis=0).tolist(), expected.tolist())
+
+            batches = list(engine.predict_stream(iter(self.images)))
+            self.assertListEqual([len(labels) for labels, _ in batches], [4, 4, 4, 2])
+
+            labels, probas = engine.predict_images([])
+            self.assertTupleEqual(probas.shape, (10, 0))
+
+        # probabilities of a softmax output layer, saved with the network
+        self.parameters.get_network(['leaky_relu', 'softmax'])
+        with InferenceEngine(self.parameters, micro_batch_size=4, max_workers=2) as engine:
+            self.assertEqual(engine.output_activation, 'softmax')
+            labels, probas = engine.predict_images(self.images)
+            self.assertListEqual(labels.tolist(), expected.tolist())
+            self.assertTrue(numpy.allclose(numpy.sum(probas, axis=0), 1.))
+
+        with self.assertRaises(ValueError):
+            InferenceEngine(self.parameters, micro_batch_size=0)
+
+    def test_quantize(self):
+        """
+        test ml.digit_recognizer.inference :: InferenceEngine with int8 weights
+        """
+        import shutil
+        import tempfile
+        from ml.common.quantization import QuantizedNetwork, save_quantized
+        from ml.digit_recognizer.inference import InferenceEngine
+
+        with InferenceEngine(self.parameters, micro_batch_size=4, max_workers=2) as engine:
+            expected_labels, expected_probas = engine.predict_images(self.images)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(temp_dir, 'quantized.npz')
+            save_quantized(file_path, QuantizedNetwork.from_parameters(self.parameters.get()))
+            with InferenceEngine(micro_batch_size=4, max_workers=2, quantized_file=file_path) as engine:
+                self.assertEqual(engine.activations, self.parameters.get_network().activations)
+                labels, probas = engine.predict_images(self.images)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        self.assertEqual(probas.dtype, numpy.float32)
+        self.assertTrue(numpy.allclose(probas, expected_probas, atol=0.02))
+        self.assertGreaterEqual(numpy.mean(labels == expected_labels), 0.9)
+
+    @patch('ml.digit_recognizer.quantize.DataSvc')
+    def test_quantize_run(self, mock_data_svc):
+        """
+        test ml.digit_recognizer.quantize :: run
+        """
+        import shutil
+        import tempfile
+        from ml.common.parameters import Parameters
+        from ml.digit_recognizer.quantize import PWD, run
+        from ml.common.quantization import load_quantized
+
+        saved = Parameters(PWD)
+        saved.load()
+        x = numpy.random.RandomState(1).randint(0, 256, (784, 200))
+        al, _ = saved.get_network().forward(x / 255.)
+        mock_data_svc.return_value.tests_set = {'x': x, 'y': numpy.argmax(al, axis=0).reshape(1, -1)}
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(temp_dir, 'quantized.npz')
+            comparison = run(max_drop=0.05, file_path=file_path)
+            self.assertGreaterEqual(comparison['int8_accuracy'], 0.95)
+            self.assertEqual(load_quantized(file_path).layer_dims, saved.get_network().layer_dims)
+
+            os.unlink(file_path)
+            with self.assertRaises(ValueError):
+                run(max_drop=-1., file_path=file_path)
+            self.assertFalse(os.path.exists(file_path))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @patch('ml.digit_recognizer.inference.Parameters')
+    def test_load_once(self, mock_parameters):
+        """
+        test ml.digit_recognizer.inference :: InferenceEngine loads saved parameters once
+        """
+        from ml.digit_recognizer.inference import InferenceEngine
+
+        mock_parameters.return_value.get.return_value = self.parameters.get()
+        with InferenceEngine() as engine:
+            engine.predict_images(self.images)
+            engine.predict_images(self.images)
+        mock_parameters.return_value.load.assert_called_once()
@@ -44,10 +44,52 @@ def test_run(self, mock_func, mock_svc):
         @return:
         """
         from ml.digit_recognizer.training import run
-        mock_svc.return_value = MagicMock(trainings={'x': numpy.array([[0]]), 'y': numpy.array([[0]])})
+        mock_svc.return_value = MagicMock(
+            trainings={'x': numpy.zeros((784, 40)), 'y': numpy.arange(40).reshape(1, -1)},
+            tests_set={'x': numpy.ones((784, 10)), 'y': numpy.zeros((1, 10), dtype=int)})
         mock_save = MagicMock()
         param = MagicMock(save=mock_save)
         mock_func.return_value = param
         run()
         mock_func.assert_called_once()
         param.save.assert_called_once()
+        # early stopping validates on training rows held out, not on the test set
+        (train_x, train_y), kwargs = mock_func.call_args[0][:2], mock_func.call_args[1]
+        val_x, val_y = kwargs['validation']
+        self.assertEqual(train_x.shape[1], 38)
+        self.assertListEqual(val_y.tolist(), [[38, 39]])
+        self.assertEqual(val_x.shape, (784, 2))
+
+    def test_split_validation(self):
+        """
+        test ml.digit_recognizer.training.split_validation
+        """
+        from ml.digit_recognizer.training import split_validation
+
+        x, y = numpy.arange(40).reshape(2, 20), numpy.arange(20).reshape(1, 20)
+        (train_x, train_y), (val_x, val_y) = split_validation(x, y, ratio=0.25)
+        self.assertListEqual(train_y.tolist(), [list(range(15))])
+        self.assertListEqual(val_y.tolist(), [list(range(15, 20))])
+        self.assertListEqual(val_x.tolist(), x[:, 15:].tolist())
+        self.assertTrue(numpy.shares_memory(train_x, x))
+
+        (train_x, _), (val_x, _) = split_validation(x, y, ratio=0.)
+        self.assertEqual((train_x.shape[1], val_x.shape[1]), (20, 0))
+        with self.assertRaises(ValueError):
+            split_validation(x, y, ratio=1.)
+
+    def test_sweep_objective(self):
+        """
+        test ml.digit_recognizer.training.sweep_objective
+        """
+        from ml.digit_recognizer import training
+
+        rng = numpy.random.RandomState(0)
+        labels = rng.randint(0, 10, (1, 30))
+        data = {
+            'train_x': rng.rand(784, 30), 'train_y': training.training_answers(labels, numpy.float64),
+            'dev_x': rng.rand(784, 30), 'dev_y': labels,
+        }
+        with patch.dict(training._SWEEP_DATA, data):
+            score = training.sweep_objective({'hidden_layers': [8], 'mini_batch_size': 16}, 2)
+        self.assertTrue(0. <= score <= 1.)